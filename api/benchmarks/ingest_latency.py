@@ -0,0 +1,126 @@
+"""
+Read latency while a large bulk ingest runs.
+
+Starts uvicorn on a scratch database, seeds it, then issues
+GET /products/?limit=50 open-loop every 50 ms while POST /products/ingest/bulk
+sends 10,000 products, so reads stalled behind the ingest are all counted.
+Prints idle and during-ingest latency percentiles as JSON.
+
+    cd api
+    python benchmarks/ingest_latency.py --runs 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GET_INTERVAL_SECONDS = 0.05
+
+
+def products(prefix: str, count: int):
+    return [{"name": f"{prefix}-{index}", "description": f"Product {index} does things. " * 4,
+             "website": f"https://{prefix}-{index}.example", "category": "Software"}
+            for index in range(count)]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def timed_get(client, latencies):
+    started = time.perf_counter()
+    response = await client.get("/products/", params={"limit": 50})
+    response.raise_for_status()
+    latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def open_loop(client, done, latencies):
+    """Issue a GET every interval until done(), without waiting for earlier ones"""
+    tasks = []
+    while not done():
+        tasks.append(asyncio.create_task(timed_get(client, latencies)))
+        await asyncio.sleep(GET_INTERVAL_SECONDS)
+    await asyncio.gather(*tasks)
+
+
+async def measure(base_url: str, runs: int, ingest_size: int):
+    limits = httpx.Limits(max_connections=200, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        (await client.post("/products/ingest/bulk", json=products("seed", 1000))).raise_for_status()
+        await asyncio.sleep(5)
+
+        idle = []
+        deadline = time.monotonic() + 3
+        await open_loop(client, lambda: time.monotonic() > deadline, idle)
+        report = {"idle_p50_ms": round(percentile(idle, 50), 1),
+                  "idle_p99_ms": round(percentile(idle, 99), 1), "runs": []}
+
+        for run in range(runs):
+            body = json.dumps(products(f"run{run}", ingest_size))
+            finished = asyncio.Event()
+            during = []
+
+            async def ingest():
+                started = time.perf_counter()
+                response = await client.post("/products/ingest/bulk", content=body,
+                                             headers={"content-type": "application/json"})
+                response.raise_for_status()
+                finished.set()
+                return time.perf_counter() - started
+
+            ingest_task = asyncio.create_task(ingest())
+            await open_loop(client, finished.is_set, during)
+            ingest_seconds = await ingest_task
+            report["runs"].append({
+                "ingest_s": round(ingest_seconds, 2), "gets": len(during),
+                "p50_ms": round(percentile(during, 50), 1), "p99_ms": round(percentile(during, 99), 1),
+                "max_ms": round(max(during), 1)})
+            await asyncio.sleep(2)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GET latency during a bulk ingest.")
+    parser.add_argument("--runs", type=int, default=3, help="Ingests to measure.")
+    parser.add_argument("--products", type=int, default=10000, help="Products per ingest.")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the scratch server.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ingest-latency-") as scratch:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+            "RATE_LIMIT_STORE": os.path.join(scratch, "ratelimit.db"),
+            "RESPONSE_CACHE_VERSION_FILE": os.path.join(scratch, "response_cache.version"),
+            # Every GET must reach the database
+            "RESPONSE_CACHE": "false",
+            "AI_WORKER_EMBEDDED": "false",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+             "--log-level", "warning", "--timeout-keep-alive", "120"],
+            cwd=API_DIR, env=env)
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.2)
+            print(json.dumps(asyncio.run(measure(base_url, args.runs, args.products)), indent=2))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
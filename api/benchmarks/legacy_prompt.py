@@ -0,0 +1,50 @@
+"""
+The v1 batch prompt format, which repeated the response template per product
+and sent the instructions in every user message. Frozen here as the baseline
+for benchmarks/prompt_report.py; nothing in the API uses it.
+"""
+from typing import Dict, Any, List
+
+LEGACY_PROMPT_VERSION = "v1"
+
+LEGACY_BATCH_SYSTEM_PROMPT = "You are a software categorization expert. Analyze multiple products and categorize each one. For each product, create exactly 2 sentences for the description - no more, no less."
+
+
+def build_legacy_batch_prompt(products_data: List[Dict[str, Any]]) -> str:
+    """User prompt of a batch in the v1 format"""
+    prompt = "Please analyze the following software products and provide a JSON response with the following structure:\n\n"
+    prompt += "{\n"
+    prompt += '  "products": [\n'
+
+    for i, product in enumerate(products_data):
+        name = product.get('name', 'Unknown Product')
+
+        prompt += '    {\n'
+        prompt += f'      "name": "{name}",\n'
+        prompt += f'      "description": "EXACTLY 2 sentences - no more, no less. Make it professional and clear while preserving important context.",\n'
+        prompt += f'      "category": "Choose from: sales_marketing, devtools, data_analytics, productivity, finance, other"\n'
+        prompt += '    }'
+        if i < len(products_data) - 1:
+            prompt += ','
+        prompt += '\n'
+
+    prompt += '  ]\n'
+    prompt += '}\n\n'
+    prompt += 'Product details:\n'
+
+    for product in products_data:
+        name = product.get('name', 'Unknown Product')
+        description = product.get(
+            'description', 'No description available')
+        category = product.get('category', 'No category')
+        website = product.get('website', 'No website')
+
+        prompt += f'\nProduct Name: {name}\n'
+        prompt += f'Website: {website}\n'
+        prompt += f'Raw Category: {category}\n'
+        prompt += f'Raw Description: {description}\n'
+
+    prompt += '\nIMPORTANT: The description must be exactly 2 sentences. Do not truncate or add ellipsis.'
+    prompt += ' If the product doesn\'t fit clearly into the first 5 categories, use "other".'
+
+    return prompt
@@ -0,0 +1,76 @@
+"""
+Prompt tokens per product of the current batch prompt format against the
+legacy v1 format, over a corpus packed the way the workers pack it.
+
+Tokens are counted with the model's tokenizer when tiktoken is installed,
+and otherwise with the packer's ~4 characters per token estimate.
+
+    cd api
+    python -m benchmarks.prompt_report
+    python -m benchmarks.prompt_report --fixture my_products.jsonl
+"""
+import argparse
+import json
+import os
+from typing import Callable, Tuple
+
+from benchmarks.legacy_prompt import LEGACY_BATCH_SYSTEM_PROMPT, LEGACY_PROMPT_VERSION, build_legacy_batch_prompt
+from config.ai_config import get_ai_config
+from services.batch_packer import BatchPacker, estimate_tokens
+from services.prompts import BATCH_SYSTEM_PROMPT, PROMPT_VERSION, build_batch_prompt
+
+DEFAULT_FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures", "products.jsonl")
+
+
+def token_counter(model: str) -> Tuple[str, Callable[[str], int]]:
+    """Name and count function of the model's tokenizer, or of the chars/4 estimate without tiktoken"""
+    try:
+        import tiktoken
+    except ImportError:
+        return "chars/4", estimate_tokens
+
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return f"tiktoken:{encoding.name}", lambda text: len(encoding.encode(text))
+
+
+def prompt_report(products, count_tokens: Callable[[str], int]):
+    """Requests and prompt tokens per product for both formats"""
+    legacy_tokens = 0
+    current_tokens = 0
+    batches = BatchPacker().pack(products)
+    for batch in batches:
+        legacy_tokens += count_tokens(LEGACY_BATCH_SYSTEM_PROMPT) + \
+            count_tokens(build_legacy_batch_prompt(batch))
+        prompt, _ = build_batch_prompt(batch)
+        current_tokens += count_tokens(BATCH_SYSTEM_PROMPT) + count_tokens(prompt)
+
+    return {
+        "products": len(products),
+        "requests": len(batches),
+        "legacy_prompt_version": LEGACY_PROMPT_VERSION,
+        "current_prompt_version": PROMPT_VERSION,
+        "legacy_tokens_per_product": round(legacy_tokens / len(products), 1),
+        "current_tokens_per_product": round(current_tokens / len(products), 1),
+        "reduction": round(1 - current_tokens / legacy_tokens, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report batch prompt tokens per product, legacy format vs the current one.")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE,
+                        help="JSONL file of products (name, website, category, description).")
+    args = parser.parse_args()
+
+    with open(args.fixture) as fixture:
+        products = [json.loads(line) for line in fixture if line.strip()]
+    tokenizer, count_tokens = token_counter(get_ai_config()["model"])
+    print(json.dumps({"tokenizer": tokenizer, **prompt_report(products, count_tokens)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import json
+import math
+from collections import Counter
+
+from loguru import logger
+
+from config.ai_config import get_classifier_config
+from database import (
+    create_tables, drop_counter_triggers, install_counter_triggers, SessionLocal, RawProduct, CleanProduct)
+from services.category_classifier import CategoryClassifier
+from services.category_mapping import CategoryMappings
+from services.ai_service import AIService
+from services.batch_file_service import BatchFileService
+from services.batch_packer import BatchPacker
+from services.product_service import ProductService
+
+
+def reconcile_stats(args):
+    """Recompute the stats counters and report drift"""
+    db = SessionLocal()
+    try:
+        drift = ProductService(db).reconcile_counters()
+    except ValueError as e:
+        logger.error(str(e))
+        return
+    finally:
+        db.close()
+
+    if drift:
+        logger.warning(f"Corrected {len(drift)} drifted counters")
+        print(json.dumps(drift, indent=2))
+    else:
+        logger.success("Product counters are in sync")
+
+
+def install_counters(args):
+    """Install the stats counter triggers and seed the counters"""
+    if install_counter_triggers():
+        logger.success("Product counter triggers installed; set STATS_USE_COUNTERS=true on the API")
+    else:
+        logger.info("Product counter triggers are already installed")
+
+
+def drop_counters(args):
+    """Remove the stats counter triggers"""
+    drop_counter_triggers()
+    logger.success("Product counter triggers dropped; /products/stats counts the product tables")
+
+
+def load_products(args):
+    """Products from a JSONL fixture, or a sample of raw products from the database"""
+    if args.fixture:
+        with open(args.fixture) as fixture:
+            return [json.loads(line) for line in fixture if line.strip()]
+
+    db = SessionLocal()
+    try:
+        rows = db.query(RawProduct).order_by(
+            RawProduct.id).limit(args.limit).all()
+        return [{
+            "id": row.id,
+            "name": row.name,
+            "website": row.website,
+            "category": row.category,
+            "description": row.description
+        } for row in rows]
+    finally:
+        db.close()
+
+
+def packing_report(args):
+    """Report how products pack into AI requests and, with --live, how often completions hit max_tokens"""
+    products = load_products(args)
+    if not products:
+        logger.warning("No products to report on")
+        return
+
+    # Packed as stored, without preset categories, so output estimates are upper bounds
+    packer = BatchPacker()
+    packed = packer.pack_with_limits(products)
+    sizes = [len(batch) for batch, _ in packed]
+    report = {
+        "products": len(products),
+        "requests": len(packed),
+        "products_per_request": {
+            "mean": round(len(products) / len(packed), 1), "min": min(sizes), "max": max(sizes)},
+        "closed_by": dict(Counter(limit or "end_of_input" for _, limit in packed)),
+        "estimated_input_tokens_per_request": round(sum(
+            packer.input_tokens(product) for product in products) / len(packed)),
+        "estimated_output_tokens_per_request": round(sum(
+            packer.output_tokens(product) for product in products) / len(packed))
+    }
+
+    if args.live:
+        ai_service = AIService()
+        measured = [ai_service.measure_request(batch) for batch, _ in packed[:args.requests]]
+        report["live"] = live_packing_stats(measured, packer.batch_config)
+
+    print(json.dumps(report, indent=2))
+
+
+def live_packing_stats(measured, batch_config):
+    """
+    Truncation rate and completion tokens of measured requests, with the
+    output estimate and margin they imply: output_tokens_per_product shifted
+    by the mean per-product error, and the margin covering the largest
+    completion relative to that estimate
+    """
+    used = [request for request in measured if request["completion_tokens"] is not None]
+    products = sum(request["products"] for request in used)
+    stats = {
+        "requests": len(measured),
+        "length_finish_rate": round(
+            sum(request["finish_reason"] == "length" for request in measured) / len(measured), 3)
+    }
+    if not products:
+        return stats
+
+    # Truncated requests count with max_tokens, a lower bound of what they needed
+    shift = (sum(request["completion_tokens"] for request in used)
+             - sum(request["estimated_output_tokens"] for request in used)) / products
+    ratios = [request["completion_tokens"] / (request["estimated_output_tokens"] + shift * request["products"])
+              for request in used]
+    stats.update({
+        "completion_tokens_per_product": round(
+            sum(request["completion_tokens"] for request in used) / products, 1),
+        "completion_to_estimate": round(
+            sum(request["completion_tokens"] for request in used)
+            / sum(request["estimated_output_tokens"] for request in used), 3),
+        "suggested_output_tokens_per_product": round(batch_config["output_tokens_per_product"] + shift),
+        "suggested_output_safety_margin": max(math.ceil(max(ratios) * 20) / 20, 1.0)
+    })
+    return stats
+
+
+def load_approved_samples():
+    """(raw product, approved category) pairs from the review history"""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(RawProduct.id, RawProduct.name, RawProduct.website,
+                     RawProduct.category, RawProduct.description, CleanProduct.category)
+            .join(CleanProduct, CleanProduct.raw_product_id == RawProduct.id)
+            .filter(CleanProduct.status == "approved")
+            .order_by(RawProduct.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+    return [({
+        "id": product_id,
+        "name": name,
+        "website": website,
+        "category": raw_category,
+        "description": description
+    }, category) for product_id, name, website, raw_category, description, category in rows]
+
+
+def train_classifier(args):
+    """Evaluate the local category classifier on held-out approvals, then retrain and save it"""
+    config = get_classifier_config()
+    samples = load_approved_samples()
+    if len(samples) < config["min_training_samples"]:
+        logger.warning(
+            f"Only {len(samples)} approved products, need {config['min_training_samples']} to train")
+        return
+
+    # Every fifth product is held out, so reruns evaluate on the same split
+    train = [(product, category) for product, category in samples if product["id"] % 5]
+    held_out = [(product, category) for product, category in samples if not product["id"] % 5]
+    classifier = CategoryClassifier.train(train)
+
+    correct = covered = covered_correct = 0
+    for product, category in held_out:
+        predicted, confidence = classifier.predict(product)
+        correct += predicted == category
+        if predicted and confidence >= config["confidence_threshold"]:
+            covered += 1
+            covered_correct += predicted == category
+
+    # Requests and completion tokens for the held-out products with and without
+    # local categories; requests only drop once batches are token-bound
+    packer = BatchPacker()
+    products = [product for product, _ in held_out]
+    preset = [{**product, "fixed_category": classifier.confident_category(product)}
+              for product in products]
+    requests_without = len(packer.pack(products))
+    requests_with = len(packer.pack(preset))
+    output_without = sum(packer.output_tokens(product) for product in products)
+    output_with = sum(packer.output_tokens(product) for product in preset)
+
+    report = {
+        "samples": len(samples),
+        "held_out": len(held_out),
+        "accuracy": round(correct / len(held_out), 4) if held_out else None,
+        "confidence_threshold": config["confidence_threshold"],
+        "coverage": round(covered / len(held_out), 4) if held_out else None,
+        "accuracy_when_confident": round(covered_correct / covered, 4) if covered else None,
+        "requests_without_classifier": requests_without,
+        "requests_with_classifier": requests_with,
+        "requests_saved": requests_without - requests_with,
+        "completion_tokens_saved": output_without - output_with
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.dry_run:
+        return
+    CategoryClassifier.train(samples).save(config["model_path"])
+    logger.success(
+        f"Trained category model on {len(samples)} approved products: {config['model_path']}")
+
+
+def rebuild_mappings(args):
+    """Relearn site category mappings from every approved review"""
+    db = SessionLocal()
+    try:
+        pairs = CategoryMappings().rebuild(db, reset_reviews=args.reset_reviews)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    logger.success(f"Rebuilt {pairs} site category mapping counts")
+    stats = CategoryMappings().stats()
+    print(json.dumps({"active_mappings": stats["active_mappings"],
+                      "mappings": stats["mappings"]}, indent=2))
+
+
+def batch_export(args):
+    """Export queued AI jobs to an offline batch input file"""
+    db = SessionLocal()
+    try:
+        exported = BatchFileService(db).export(args.limit)
+    finally:
+        db.close()
+
+    if exported:
+        print(json.dumps(exported, indent=2))
+
+
+def batch_import(args):
+    """Apply an offline batch output file"""
+    db = SessionLocal()
+    try:
+        imported = BatchFileService(db).import_results(args.output, args.file_id)
+    finally:
+        db.close()
+
+    print(json.dumps(imported, indent=2))
+
+
+def batch_status(args):
+    """List batch files and their in-flight products"""
+    db = SessionLocal()
+    try:
+        print(json.dumps(BatchFileService(db).status(), indent=2))
+    finally:
+        db.close()
+
+
+# Command registry
+COMMANDS = {
+    "install-counters": install_counters,
+    "drop-counters": drop_counters,
+    "reconcile-stats": reconcile_stats,
+    "packing-report": packing_report,
+    "train-classifier": train_classifier,
+    "rebuild-mappings": rebuild_mappings,
+    "batch-export": batch_export,
+    "batch-import": batch_import,
+    "batch-status": batch_status,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Zoftware API maintenance commands.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "install-counters", help="Install the database triggers that keep /products/stats counters up to date.")
+    subparsers.add_parser(
+        "drop-counters", help="Remove the /products/stats counter triggers.")
+    subparsers.add_parser(
+        "reconcile-stats", help="Recompute /products/stats counters from scratch and report drift.")
+    packing_parser = subparsers.add_parser(
+        "packing-report", help="Report products per AI request and, with --live, the max_tokens truncation rate.")
+    packing_parser.add_argument(
+        "--fixture", help="JSONL file of products (name, website, category, description).")
+    packing_parser.add_argument("--limit", type=int, default=200,
+                                help="Raw products sampled from the database when no fixture is given.")
+    packing_parser.add_argument("--live", action="store_true",
+                                help="Send the packed requests to OpenAI, without saving results, and measure completions.")
+    packing_parser.add_argument("--requests", type=int, default=10,
+                                help="Packed requests sent with --live.")
+    train_parser = subparsers.add_parser(
+        "train-classifier", help="Train the local category classifier from approved products and report its accuracy.")
+    train_parser.add_argument("--dry-run", action="store_true",
+                              help="Only report accuracy and savings; keep the current model.")
+    rebuild_parser = subparsers.add_parser(
+        "rebuild-mappings", help="Relearn site category to category mappings from all approved reviews.")
+    rebuild_parser.add_argument("--reset-reviews", action="store_true",
+                                help="Also clear mapped review and rejection counts, reinstating retired mappings.")
+    export_parser = subparsers.add_parser(
+        "batch-export", help="Write queued AI jobs to a batch input file (JSONL, one request per packed batch).")
+    export_parser.add_argument("--limit", type=int,
+                               help="Maximum products in the file.")
+    import_parser = subparsers.add_parser(
+        "batch-import", help="Apply a batch output file to clean and raw products.")
+    import_parser.add_argument("output", help="Batch output JSONL file.")
+    import_parser.add_argument("--file-id", type=int,
+                               help="Batch file the output belongs to (read from custom_id by default).")
+    subparsers.add_parser(
+        "batch-status", help="List batch files and their product counts by status.")
+    args = parser.parse_args()
+
+    create_tables()
+    COMMANDS[args.command](args)
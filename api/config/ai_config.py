@@ -1,6 +1,7 @@
 """
 AI Processing Configuration
 """
+import os
 from typing import Dict, Any
 
 # OpenAI API Configuration
@@ -8,21 +9,109 @@ OPENAI_CONFIG = {
     "model": "gpt-4o-mini",
     "max_tokens": 10000,
     "temperature": 0.3,
-    "response_format": {"type": "json_object"}
+    "response_format": {"type": "json_object"},
+    "timeout_seconds": 120,          # Per request, including streamed responses
+    "max_connections": 16,           # HTTP connection pool shared by every thread
+    # Stream batch responses and persist each product as soon as it is parsed
+    "stream": os.getenv("AI_STREAM_RESPONSES", "false").lower() == "true"
 }
 
 # Batch Processing Configuration
 BATCH_CONFIG = {
-    "max_products_per_request": 10,  # Maximum products per AI request
+    # The token estimates and budgets below are checked against a corpus with
+    # `python cli.py packing-report`; --live measures real completions and
+    # suggests output_tokens_per_product and output_safety_margin from them
+    "max_products_per_request": 25,  # Upper bound; the token budgets only bind for long descriptions
+    "max_input_tokens_per_request": 6000,   # Prompt token budget per AI request
+    "max_output_tokens_per_request": 4000,  # Completion token budget per AI request
+    "output_tokens_per_product": 90,        # Expected completion tokens for one product
+    "prompt_tokens_per_product": 20,        # Prompt template tokens repeated per product
+    "category_output_tokens": 10,           # Completion tokens saved when the category is preset
+    "output_safety_margin": 1.3,            # max_tokens headroom over the output estimate
+    "max_wait_seconds": 5,           # How long queued products wait for a fuller batch
     "max_requests_per_minute": 3,    # OpenAI rate limit
     "batch_delay_seconds": 20,       # Delay between batches to respect rate limit
     "max_background_tasks": 20        # Maximum concurrent background tasks
 }
 
+# AI Result Cache Configuration
+CACHE_CONFIG = {
+    "enabled": True,
+    "ttl_seconds": 30 * 24 * 3600,   # Cached results older than this are ignored and evicted
+    "max_entries": 50000             # Least recently used entries beyond this are evicted
+}
+
+# Local Category Classifier Configuration
+CLASSIFIER_CONFIG = {
+    "enabled": True,
+    "model_path": os.getenv("CLASSIFIER_MODEL_PATH", "./category_model.json"),
+    "confidence_threshold": 0.8,     # At or above this, the LLM only writes the description
+    "softmax_scale": 10.0,           # Sharpness of the TF-IDF similarity to confidence mapping
+    "max_vocabulary": 20000,
+    "min_training_samples": 30       # Approved products needed before a model is trained
+}
+
+# Offline Batch File Configuration
+BATCH_FILE_CONFIG = {
+    "directory": os.getenv("AI_BATCH_FILE_DIR", "./batch_files"),
+    "max_products_per_file": 50000,
+    "lease_hours": 48                # Exported jobs return to the queue if not imported by then
+}
+
+# Site Category Mapping Configuration
+MAPPING_CONFIG = {
+    "enabled": True,
+    "min_approvals": 5,              # Approvals before a site category is mapped
+    "min_agreement": 0.9,            # Share of approvals that must agree on the target category
+    "min_mapped_reviews": 5,         # Reviews of mapped products before the rejection rate is judged
+    "max_rejection_rate": 0.3        # Rejected share of mapped products that retires a mapping
+}
+
+# Shared Rate Limit Configuration (enforced across threads and processes)
+RATE_LIMIT_CONFIG = {
+    "max_requests_per_minute": BATCH_CONFIG["max_requests_per_minute"],
+    "max_tokens_per_minute": 40000,  # OpenAI TPM limit for the model
+    # Local SQLite file holding the buckets; every API and worker process must share it
+    "store_path": os.getenv("RATE_LIMIT_STORE", "./ratelimit.db")
+}
+
+# AI Worker Configuration
+WORKER_CONFIG = {
+    "concurrency": 2,                # Worker threads per worker process
+    "lease_seconds": 300,            # How long a claimed job is owned without a heartbeat
+    "heartbeat_seconds": 30,         # How often leases of running jobs are extended
+    "poll_interval_seconds": 2,      # Idle wait between claim attempts
+    "max_attempts": 3,               # Attempts before a job is dead-lettered as failed
+    "retry_delay_seconds": 60,       # Delay before a failed job is claimable again, doubled per attempt
+    "max_retry_delay_seconds": 3600,
+    "stuck_after_seconds": 900,      # Unleased rows left in processing this long count as stuck
+    # Port `python -m worker` serves its own /metrics on (AI metrics are recorded
+    # in the worker process); 0 disables it
+    "metrics_port": int(os.getenv("AI_WORKER_METRICS_PORT", "9101")),
+    # Run workers inside the API process instead of `python -m worker`
+    "embedded": os.getenv("AI_WORKER_EMBEDDED", "false").lower() == "true"
+}
+
+# Adaptive Batching Configuration
+ADAPTIVE_BATCH_CONFIG = {
+    "enabled": True,
+    "min_batch_size": 2,             # Products per request never shrink below this
+    "max_batch_size": BATCH_CONFIG["max_products_per_request"],
+    "min_concurrency": 1,            # Worker threads per process allowed to send requests
+    "max_concurrency": 8,
+    "window_size": 20,               # Recent requests the error rates are computed over
+    "max_latency_seconds": 60,       # Slower requests shrink the batch
+    "max_missing_rate": 0.1,         # Share of products missing from responses before shrinking
+    "grow_after_requests": 5,        # Clean requests in a row before growing again
+    "batch_growth_step": 2,          # Products added per growth step
+    "decrease_factor": 0.5           # Multiplier applied on parse failures, truncation and 429s
+}
+
 # Product Processing Configuration
 PROCESSING_CONFIG = {
     "default_category": "other",
     "description_sentences": 2,
+    "max_description_chars": 1500,   # Raw descriptions are cut to this length in batch prompts
     "valid_categories": [
         "sales_marketing",
         "devtools",
@@ -44,6 +133,41 @@ def get_batch_config() -> Dict[str, Any]:
     return BATCH_CONFIG.copy()
 
 
+def get_cache_config() -> Dict[str, Any]:
+    """Get AI result cache configuration"""
+    return CACHE_CONFIG.copy()
+
+
+def get_classifier_config() -> Dict[str, Any]:
+    """Get local category classifier configuration"""
+    return CLASSIFIER_CONFIG.copy()
+
+
+def get_batch_file_config() -> Dict[str, Any]:
+    """Get offline batch file configuration"""
+    return BATCH_FILE_CONFIG.copy()
+
+
+def get_mapping_config() -> Dict[str, Any]:
+    """Get site category mapping configuration"""
+    return MAPPING_CONFIG.copy()
+
+
+def get_rate_limit_config() -> Dict[str, Any]:
+    """Get shared rate limit configuration"""
+    return RATE_LIMIT_CONFIG.copy()
+
+
+def get_worker_config() -> Dict[str, Any]:
+    """Get AI worker configuration"""
+    return WORKER_CONFIG.copy()
+
+
+def get_adaptive_batch_config() -> Dict[str, Any]:
+    """Get adaptive batching configuration"""
+    return ADAPTIVE_BATCH_CONFIG.copy()
+
+
 def get_processing_config() -> Dict[str, Any]:
     """Get product processing configuration"""
     return PROCESSING_CONFIG.copy()
@@ -0,0 +1,87 @@
+"""
+Database Configuration
+"""
+import os
+from typing import Dict, Any
+
+# Database profiles, selected with the DATABASE_PROFILE environment variable
+DATABASE_PROFILES = {
+    "development": {
+        "url": "sqlite:///./zoftware.db",
+        "pragmas": {
+            "busy_timeout": 5000
+        },
+        "write_pool_size": 5,
+        "read_pool_size": 5
+    },
+    "production": {
+        "url": "sqlite:///./zoftware.db",
+        # WAL lets readers proceed while the AI result writers commit
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -64000,       # 64 MB page cache per connection
+            "mmap_size": 268435456,     # 256 MB memory-mapped reads
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY"
+        },
+        "write_pool_size": 5,
+        "read_pool_size": 20
+    }
+}
+
+# Statistics Configuration
+STATS_CONFIG = {
+    # Serve /products/stats from trigger-maintained counters instead of
+    # aggregating the product tables on every call
+    "use_counters": os.getenv("STATS_USE_COUNTERS", "false").lower() == "true"
+}
+
+# SQL Profiler Configuration
+PROFILER_CONFIG = {
+    # Count and time the statements of every request (X-Query-Count/X-Query-Time)
+    "enabled": os.getenv("SQL_PROFILER", "false").lower() == "true",
+    "slow_statements": 3,       # Slowest statements logged per request
+    "log_min_ms": 100,          # Only log requests whose queries took longer
+    "repeat_threshold": 5       # Identical statements per request flagged as N+1
+}
+
+# Response Cache Configuration
+RESPONSE_CACHE_CONFIG = {
+    # Serve product listings and stats from memory until the product tables change
+    "enabled": os.getenv("RESPONSE_CACHE", "true").lower() == "true",
+    # Total size of the cached response bodies; least recently used ones are
+    # evicted beyond it, and a single larger response is served uncached
+    "max_bytes": int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    # Touched after every committed product write so other processes
+    # (AI workers, CLI) invalidate this process's cache too
+    "version_file": os.getenv("RESPONSE_CACHE_VERSION_FILE", "./response_cache.version")
+}
+
+
+def get_database_config() -> Dict[str, Any]:
+    """Get the active database profile, with DATABASE_URL overriding its url"""
+    profile_name = os.getenv("DATABASE_PROFILE", "development")
+    if profile_name not in DATABASE_PROFILES:
+        raise ValueError(
+            f"Unknown DATABASE_PROFILE '{profile_name}', expected one of {list(DATABASE_PROFILES)}")
+
+    profile = DATABASE_PROFILES[profile_name].copy()
+    profile["name"] = profile_name
+    profile["url"] = os.getenv("DATABASE_URL", profile["url"])
+    return profile
+
+
+def get_stats_config() -> Dict[str, Any]:
+    """Get statistics configuration"""
+    return STATS_CONFIG.copy()
+
+
+def get_profiler_config() -> Dict[str, Any]:
+    """Get SQL profiler configuration"""
+    return PROFILER_CONFIG.copy()
+
+
+def get_response_cache_config() -> Dict[str, Any]:
+    """Get response cache configuration"""
+    return RESPONSE_CACHE_CONFIG.copy()
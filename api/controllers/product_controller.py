@@ -1,19 +1,18 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from loguru import logger
 
 from database import RawProduct, CleanProduct, Review as ReviewModel
 from services.product_service import ProductService
-from services.ai_service import AIService
-from schemas.product import RawProduct as RawProductModel, CleanProduct as CleanProductModel, Review, ProductResponse, ReviewStatus, ReviewAction
+from services.category_mapping import CategoryMappings
+from services.job_service import JobService
+from schemas.product import RawProduct as RawProductModel, CleanProduct as CleanProductModel, Review, ProductResponse, ProductPage, ReviewStatus, ReviewAction
 
 
 class ProductController:
     def __init__(self, db: Session):
         self.db = db
         self.product_service = ProductService(db)
-        self.ai_service = AIService()
 
     def ingest_product(self, product: RawProductModel) -> Dict[str, Any]:
         """Ingest a raw product and return result"""
@@ -49,6 +48,29 @@ class ProductController:
         except Exception as e:
             raise Exception(f"Failed to get products: {str(e)}")
 
+    def get_products_page(
+        self,
+        status_filter: Optional[str] = None,
+        processing_status: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> ProductPage:
+        """Get products with filtering and keyset pagination"""
+        try:
+            return self.product_service.get_products_page(
+                status_filter=status_filter,
+                processing_status=processing_status,
+                limit=limit,
+                cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to get products: {str(e)}")
+
     def review_product(self, clean_product_id: int, review: Review) -> Dict[str, Any]:
         """Review a clean product (approve/reject)"""
         try:
@@ -67,6 +89,14 @@ class ProductController:
             elif review.action == ReviewAction.REJECT:
                 clean_product.status = ReviewStatus.REJECTED
 
+            # Learn the site category's target from approvals and count the
+            # review against the mapping that categorized the product
+            source_category = self.db.query(RawProduct.category).filter(
+                RawProduct.id == clean_product.raw_product_id).scalar()
+            CategoryMappings().record_review(
+                self.db, source_category, clean_product.category,
+                approved=review.action == ReviewAction.APPROVE)
+
             # Save review
             db_review = ReviewModel(
                 clean_product_id=clean_product_id,
@@ -92,57 +122,9 @@ class ProductController:
         except Exception as e:
             raise Exception(f"Failed to get stats: {str(e)}")
 
-    def process_product_with_ai(self, raw_id: int):
-        """Process raw product with AI"""
-        try:
-            # Get raw product
-            raw_product = self.db.query(RawProduct).filter(
-                RawProduct.id == raw_id).first()
-            if not raw_product:
-                return
-
-            # Update status to processing
-            self.product_service.update_processing_status(raw_id, "processing")
-
-            # Prepare data for AI
-            raw_data = {
-                "name": raw_product.name,
-                "website": raw_product.website,
-                "category": raw_product.category,
-                "description": raw_product.description
-            }
-
-            # Process with AI
-            ai_result = self.ai_service.process_product(raw_data)
-
-            # Save clean product
-            if self.product_service.create_clean_product(raw_id, ai_result):
-                # Update raw product status
-                self.product_service.update_processing_status(
-                    raw_id, "completed")
-
-        except Exception as e:
-            # Update status to failed
-            self.product_service.update_processing_status(raw_id, "failed")
-            raise e
-
-    def bulk_process_products_with_ai(self, raw_ids: List[int]):
-        """Process multiple raw products with AI in batches"""
+    def requeue_products(self, include_failed: bool, include_stuck: bool, stuck_after_seconds: Optional[int]) -> Dict[str, Any]:
+        """Requeue failed and stuck raw products for AI processing"""
         try:
-            if not raw_ids:
-                return
-
-            # Process products with AI through the service
-            if self.product_service.bulk_process_products_with_ai(raw_ids):
-                logger.info(
-                    f"Successfully processed {len(raw_ids)} products with AI")
-            else:
-                logger.error(
-                    f"Failed to process {len(raw_ids)} products with AI")
-
+            return JobService(self.db).requeue(include_failed, include_stuck, stuck_after_seconds)
         except Exception as e:
-            logger.error(f"Bulk AI processing failed: {e}")
-            # Update statuses to failed
-            for raw_id in raw_ids:
-                self.product_service.update_processing_status(raw_id, "failed")
-            raise e
+            raise Exception(f"Failed to requeue products: {str(e)}")
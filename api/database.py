@@ -1,21 +1,95 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.sql import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+from typing import Any, Dict, Iterator, List
+from loguru import logger
 import os
+import time
 
-# Database URL
-DATABASE_URL = "sqlite:///./zoftware.db"
+from config.db_config import get_database_config
+from services import metrics, query_profiler
+from services.response_cache import CACHED_TABLES, get_response_cache
 
-# Create engine
+# Database profile (connection url, pragmas, pool sizes)
+db_config = get_database_config()
+DATABASE_URL = db_config["url"]
+
+# Values per IN (...) list, well under SQLite's bound parameter limit
+IN_CHUNK_SIZE = 500
+
+
+def in_chunks(values: List[Any]) -> Iterator[List[Any]]:
+    """Split values into lists small enough for one IN (...) clause"""
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        yield values[start:start + IN_CHUNK_SIZE]
+
+
+def _apply_pragmas(engine, pragmas: Dict[str, Any], query_only: bool = False):
+    """Run the profile pragmas on every new DBAPI connection"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+def _instrument(engine, name: str):
+    """Count and time every statement the engine executes, for /metrics and the SQL profiler"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        metrics.DB_STATEMENTS.inc(1, name, operation)
+        metrics.DB_STATEMENT_DURATION.observe(seconds, name, operation)
+        query_profiler.record_statement(statement, seconds)
+        if name == "write" and operation in ("INSERT", "UPDATE", "DELETE") and any(
+                table in statement for table in CACHED_TABLES):
+            conn.info["product_data_changed"] = True
+
+
+def _invalidate_on_checkin(engine):
+    """Bump the response cache version once a connection that changed product data is returned"""
+    @event.listens_for(engine, "checkin")
+    def bump_response_cache(dbapi_connection, connection_record):
+        # Checkin follows the commit (or rollback), so readers never cache
+        # uncommitted data under the new version
+        if connection_record is not None and connection_record.info.pop("product_data_changed", False):
+            get_response_cache().bump_version()
+
+
+# Create engines: writes go through `engine`, request reads through
+# `read_engine` so readers never queue behind a writer's pooled connection
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite specific
+    connect_args={"check_same_thread": False},  # SQLite specific
+    pool_size=db_config["write_pool_size"]
 )
+_apply_pragmas(engine, db_config["pragmas"])
+_instrument(engine, "write")
+_invalidate_on_checkin(engine)
 
-# Create session factory
+read_engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},  # SQLite specific
+    pool_size=db_config["read_pool_size"]
+)
+_apply_pragmas(read_engine, db_config["pragmas"], query_only=True)
+_instrument(read_engine, "read")
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=read_engine)
 
 # Create base class for models
 Base = declarative_base()
@@ -23,9 +97,13 @@ Base = declarative_base()
 
 class RawProduct(Base):
     __tablename__ = "raw_products"
+    __table_args__ = (
+        # Keyset pagination over a processing status
+        Index("ix_raw_products_processing_status_id", "processing_status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
     description = Column(Text, nullable=False)
     website = Column(String, nullable=False)
     logo = Column(String)
@@ -38,6 +116,10 @@ class RawProduct(Base):
 
 class CleanProduct(Base):
     __tablename__ = "clean_products"
+    __table_args__ = (
+        # Keyset pagination over a review status
+        Index("ix_clean_products_status_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     raw_product_id = Column(Integer, ForeignKey(
@@ -61,9 +143,236 @@ class Review(Base):
     created_at = Column(DateTime, default=func.now())
 
 
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        # Claim scan: oldest available queued jobs first
+        Index("ix_ai_jobs_status_available_at", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    raw_product_id = Column(Integer, ForeignKey(
+        "raw_products.id"), unique=True, nullable=False)
+    status = Column(SQLEnum("queued", "leased", "done",
+                    "failed"), default="queued", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    lease_owner = Column(String)
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class AIBatchFile(Base):
+    __tablename__ = "ai_batch_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    input_path = Column(String, nullable=False)
+    output_path = Column(String)
+    status = Column(SQLEnum("exported", "imported"),
+                    default="exported", nullable=False)
+    prompt_version = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    requests = Column(Integer, default=0, nullable=False)
+    products = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    imported_at = Column(DateTime)
+
+
+class AIBatchItem(Base):
+    __tablename__ = "ai_batch_items"
+    __table_args__ = (
+        # Resolve a response line's products: custom_id, then prompt id
+        Index("ix_ai_batch_items_file_custom_id", "batch_file_id", "custom_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_file_id = Column(Integer, ForeignKey(
+        "ai_batch_files.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("ai_jobs.id"), nullable=False)
+    raw_product_id = Column(Integer, ForeignKey(
+        "raw_products.id"), nullable=False, index=True)
+    custom_id = Column(String, nullable=False)
+    product_key = Column(String, nullable=False)
+    fixed_category = Column(String)
+    status = Column(SQLEnum("in_flight", "applied", "failed"),
+                    default="in_flight", nullable=False)
+
+
+class AIResultCache(Base):
+    __tablename__ = "ai_result_cache"
+
+    # sha256 of normalized name, description, raw category, prompt version and model
+    key = Column(String, primary_key=True)
+    prompt_version = Column(String, nullable=False, index=True)
+    model = Column(String, nullable=False)
+    # Normalized raw category, so results preset by a retired category mapping can be dropped
+    source_category = Column(String, default="", server_default=text("''"), nullable=False, index=True)
+    description = Column(Text, nullable=False)
+    category = Column(String, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow,
+                          nullable=False, index=True)
+
+
+class CategoryMapping(Base):
+    __tablename__ = "category_mappings"
+
+    # Approved target categories per normalized site category, e.g. ("crm", "sales_marketing")
+    source_category = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    approvals = Column(Integer, default=0, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    # Reviews, and rejections among them, of products categorized by this mapping while active
+    reviewed = Column(Integer, default=0, server_default="0", nullable=False)
+    rejections = Column(Integer, default=0, server_default="0", nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AIBatchingState(Base):
+    __tablename__ = "ai_batching_state"
+
+    # Latest adaptive batching decision, shared by the API and worker processes
+    name = Column(String, primary_key=True)
+    batch_size = Column(Integer, nullable=False)
+    concurrency = Column(Integer, nullable=False)
+    last_decision = Column(Text)
+    window = Column(Text)            # JSON summary of the recent requests
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ProductCounter(Base):
+    __tablename__ = "product_counters"
+
+    # "<table>:<status>", e.g. "raw_products:pending"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+# Status column counted per table in product_counters
+COUNTED_STATUS_COLUMNS = {
+    "raw_products": "processing_status",
+    "clean_products": "status"
+}
+
+
+def _counter_upsert(table: str, row: str, column: str, delta: int) -> str:
+    return (
+        "INSERT INTO product_counters (name, value) "
+        f"VALUES ('{table}:' || COALESCE({row}.{column}, ''), {delta}) "
+        f"ON CONFLICT(name) DO UPDATE SET value = value + {delta};"
+    )
+
+
+def _counter_trigger_ddl() -> List[str]:
+    """CREATE TRIGGER statements keeping product_counters in step with writes"""
+    statements = []
+    for table, column in COUNTED_STATUS_COLUMNS.items():
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert "
+            f"AFTER INSERT ON {table} BEGIN "
+            f"{_counter_upsert(table, 'NEW', column, 1)} END")
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete "
+            f"AFTER DELETE ON {table} BEGIN "
+            f"{_counter_upsert(table, 'OLD', column, -1)} END")
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_count_update "
+            f"AFTER UPDATE OF {column} ON {table} "
+            f"WHEN OLD.{column} IS NOT NEW.{column} BEGIN "
+            f"{_counter_upsert(table, 'OLD', column, -1)} "
+            f"{_counter_upsert(table, 'NEW', column, 1)} END")
+    return statements
+
+
+def counter_seed_sql() -> List[str]:
+    """Statements recomputing product_counters from the product tables"""
+    return [
+        f"INSERT INTO product_counters (name, value) "
+        f"SELECT '{table}:' || COALESCE({column}, ''), COUNT(*) "
+        f"FROM {table} GROUP BY COALESCE({column}, '')"
+        for table, column in COUNTED_STATUS_COLUMNS.items()
+    ]
+
+
+def _installed_counter_triggers(conn) -> int:
+    return conn.execute(text(
+        "SELECT COUNT(*) FROM sqlite_master "
+        "WHERE type = 'trigger' AND name LIKE 'trg_%_count_%'")).scalar()
+
+
+def counter_triggers_installed(conn) -> bool:
+    """Whether every counter trigger exists, so product_counters is being kept up to date"""
+    return _installed_counter_triggers(conn) == len(_counter_trigger_ddl())
+
+
+def install_counter_triggers() -> bool:
+    """Install the counter triggers and seed the counters; False if they were already installed"""
+    with engine.begin() as conn:
+        if counter_triggers_installed(conn):
+            return False
+        statements = _counter_trigger_ddl()
+
+        # Triggers and seed share one transaction so no write is missed
+        for statement in statements:
+            conn.execute(text(statement))
+        conn.execute(text("DELETE FROM product_counters"))
+        for statement in counter_seed_sql():
+            conn.execute(text(statement))
+    logger.info("Installed product counter triggers")
+    return True
+
+
+def drop_counter_triggers():
+    """Remove the counter triggers so writes stop paying for them"""
+    with engine.begin() as conn:
+        for table in COUNTED_STATUS_COLUMNS:
+            for operation in ("insert", "delete", "update"):
+                conn.execute(
+                    text(f"DROP TRIGGER IF EXISTS trg_{table}_count_{operation}"))
+        conn.execute(text("DELETE FROM product_counters"))
+    logger.info("Dropped product counter triggers")
+
+
 # Create tables
 def create_tables():
+    # Counter triggers are installed and dropped explicitly (cli.py
+    # install-counters / drop-counters), never as a side effect of startup
     Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    ensure_indexes()
+
+
+def ensure_columns():
+    """Add columns added after a table was first created"""
+    # create_all never alters an existing table; new columns need a server default
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or column.server_default is None:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                not_null = "" if column.nullable else "NOT NULL "
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} "
+                    f"{not_null}DEFAULT {column.server_default.arg}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
+def ensure_indexes():
+    """Create indexes added after a table was first created"""
+    # create_all only emits CREATE INDEX together with CREATE TABLE
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except IntegrityError as e:
+                logger.error(
+                    f"Could not create index {index.name}, existing rows violate it: {e}")
 
 
 # Dependency to get database session
@@ -73,3 +382,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get a read-only database session
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -3,8 +3,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 
+from config.ai_config import get_worker_config
+from config.db_config import get_profiler_config
 from database import create_tables
-from routes import health, product_routes
+from middleware.metrics import MetricsMiddleware
+from middleware.query_profiler import QueryProfilerMiddleware
+from routes import ai_routes, health, product_routes
+from worker import AIWorkerPool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,8 +21,14 @@ async def lifespan(app: FastAPI):
     # Startup
     create_tables()
     logger.info("Database tables created/verified")
+    worker_pool = None
+    if get_worker_config()["embedded"]:
+        worker_pool = AIWorkerPool()
+        worker_pool.start()
     yield
     # Shutdown
+    if worker_pool:
+        worker_pool.stop()
     logger.info("Application shutting down")
 
 # Create FastAPI app
@@ -35,8 +46,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Query-Count", "X-Query-Time"],
 )
 
+# Record per-route request metrics for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in per-request SQL profiling (SQL_PROFILER=true)
+if get_profiler_config()["enabled"]:
+    app.add_middleware(QueryProfilerMiddleware)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(product_routes.router)
+app.include_router(ai_routes.router)
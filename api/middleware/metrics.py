@@ -0,0 +1,37 @@
+import time
+
+from services import metrics
+
+
+class MetricsMiddleware:
+    """
+    Records request counts, latency and in-flight requests per route template
+    (e.g. /products/{product_id}) so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - started
+            metrics.HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            metrics.HTTP_REQUESTS.inc(1, scope["method"], path, str(status["code"]))
+            metrics.HTTP_REQUEST_DURATION.observe(seconds, scope["method"], path)
@@ -0,0 +1,52 @@
+from loguru import logger
+
+from config.db_config import get_profiler_config
+from services.query_profiler import profile_queries
+
+
+class QueryProfilerMiddleware:
+    """
+    Profiles the SQL statements of each request: adds X-Query-Count and
+    X-Query-Time (milliseconds) headers, logs the slowest statements of slow
+    requests and warns about statements repeated often enough to be N+1 queries.
+    Statements run after the response has started (streamed bodies) are logged
+    but not counted in the headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.config = get_profiler_config()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries() as profile:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(profile.count).encode()))
+                    headers.append(
+                        (b"x-query-time", f"{profile.total_seconds * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, profile)
+
+    def _report(self, scope, profile) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        total_ms = profile.total_seconds * 1000
+
+        if total_ms >= self.config["log_min_ms"]:
+            slowest = "; ".join(
+                f"{seconds * 1000:.1f}ms {statement}"
+                for statement, seconds in profile.slowest(self.config["slow_statements"]))
+            logger.info(
+                f"{request}: {profile.count} queries in {total_ms:.1f}ms, slowest: {slowest}")
+
+        for statement, count in profile.repeated(self.config["repeat_threshold"]).items():
+            logger.warning(f"{request}: probable N+1, {count}x {statement}")
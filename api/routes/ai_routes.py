@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, status
+
+from services.ai_cache import AIResultCache
+from services.batch_controller import get_batch_controller
+from services.category_mapping import CategoryMappings
+from services.rate_limiter import get_rate_limiter
+
+# Create router
+router = APIRouter(prefix="/ai", tags=["ai"])
+
+
+@router.get("/rate-limit")
+def get_rate_limit():
+    """
+    Get the saturation of the shared OpenAI rate limit buckets
+    """
+    try:
+        return get_rate_limiter().saturation()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get rate limit status: {str(e)}"
+        )
+
+
+@router.get("/batching")
+def get_batching():
+    """
+    Get the adaptive batch size and concurrency decisions and the request stats behind them
+    """
+    try:
+        return get_batch_controller().state()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get batching state: {str(e)}"
+        )
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """
+    Get AI result cache size and hit/miss counters
+    """
+    try:
+        return AIResultCache().stats()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get AI cache stats: {str(e)}"
+        )
+
+
+@router.delete("/cache")
+def invalidate_cache(prompt_version: str):
+    """
+    Invalidate every cached AI result produced with a prompt version
+    """
+    try:
+        removed = AIResultCache().invalidate(prompt_version)
+        return {"message": "AI cache invalidated", "prompt_version": prompt_version, "removed": removed}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to invalidate AI cache: {str(e)}"
+        )
+
+
+@router.get("/category-mappings")
+def get_category_mappings():
+    """
+    Get learned site category mappings with hit rates and disagreement counts
+    """
+    try:
+        return CategoryMappings().stats()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get category mappings: {str(e)}"
+        )
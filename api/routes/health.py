@@ -1,4 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from database import COUNTED_STATUS_COLUMNS, get_read_db
+from services import metrics
+from services.product_service import ProductService
 
 # Create router
 router = APIRouter(tags=["health"])
@@ -12,3 +18,29 @@ def read_root():
 @router.get("/health")
 def health_check():
     return {"status": "healthy", "database": "connected"}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(db: Session = Depends(get_read_db)):
+    """
+    Get API, database and AI metrics in the Prometheus text format
+    """
+    try:
+        # Product counts are only read when scraped
+        counts = ProductService(db).status_counts()
+        lines = []
+        for table, column in COUNTED_STATUS_COLUMNS.items():
+            lines.extend(metrics.gauge_lines(
+                table, f"Rows in {table} by {column}", column,
+                {name.split(":", 1)[1]: value for name, value in counts.items()
+                 if name.startswith(f"{table}:")}))
+
+        return PlainTextResponse(
+            metrics.REGISTRY.render() + "\n".join(lines) + "\n",
+            media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get metrics: {str(e)}"
+        )
@@ -1,36 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from database import get_db
+from database import get_db, get_read_db
 from controllers.product_controller import ProductController
-from schemas.product import RawProduct, CleanProduct, Review
+from schemas.product import RawProduct, CleanProduct, Review, ExportFormat, ProcessingStatus, ReviewStatus
+from services.ndjson_ingest import ingest_ndjson
+from services.product_export import stream_products
+from services.response_cache import get_response_cache
 
 # Create router
 router = APIRouter(prefix="/products", tags=["products"])
 
+RAW_PRODUCT_ADAPTER = TypeAdapter(RawProduct)
+RAW_PRODUCTS_ADAPTER = TypeAdapter(List[RawProduct])
 
-@router.post("/ingest", status_code=status.HTTP_202_ACCEPTED)
+
+def _json_body(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAPI request body for a route that reads and validates its own JSON body"""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
+def _validate_body(adapter: TypeAdapter, body: bytes) -> Any:
+    """Parse and validate a JSON body, failing with the same 422 as a declared body parameter"""
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+            body=body)
+
+
+@router.post("/ingest", status_code=status.HTTP_202_ACCEPTED,
+             openapi_extra=_json_body(RawProduct.model_json_schema()))
 async def ingest_product(
-    product: RawProduct,
-    background_tasks: BackgroundTasks,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
-    Ingest a raw product and process it with AI in the background
+    Ingest a raw product and queue it for AI processing
     """
-    try:
-        product_controller = ProductController(db)
-        result = product_controller.ingest_product(product)
+    body = await request.body()
+    product_controller = ProductController(db)
 
-        if "raw_id" in result:
-            # Add AI processing as background task
-            background_tasks.add_task(
-                product_controller.process_product_with_ai, result["raw_id"])
-            return result
-        else:
-            return result
+    def ingest():
+        return product_controller.ingest_product(_validate_body(RAW_PRODUCT_ADAPTER, body))
 
+    try:
+        return await run_in_threadpool(ingest)
+
+    except RequestValidationError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -38,37 +62,29 @@ async def ingest_product(
         )
 
 
-@router.post("/ingest/bulk", status_code=status.HTTP_202_ACCEPTED)
+@router.post("/ingest/bulk", status_code=status.HTTP_202_ACCEPTED,
+             openapi_extra=_json_body({"type": "array", "items": RawProduct.model_json_schema()}))
 async def bulk_ingest_products(
-    products: List[RawProduct],
-    background_tasks: BackgroundTasks,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
-    Ingest multiple raw products in bulk and process them with AI in the background
+    Ingest multiple raw products in bulk and queue them for AI processing.
+    Only the body is read on the event loop; parsing and validating it
+    happen in the threadpool with the insert, so a large payload does not
+    stall other requests
     """
+    body = await request.body()
+    product_controller = ProductController(db)
+
+    def ingest():
+        return product_controller.bulk_ingest_products(_validate_body(RAW_PRODUCTS_ADAPTER, body))
+
     try:
-        product_controller = ProductController(db)
-        result = product_controller.bulk_ingest_products(products)
-
-        # Add bulk AI processing as background task for all created products
-        if "results" in result:
-            created_product_ids = [
-                product_result["raw_id"]
-                for product_result in result["results"]
-                if product_result["status"] == "created" and product_result["raw_id"]
-            ]
-
-            if created_product_ids:
-                # Process products in batches of 10 to respect rate limits
-                batch_size = 10
-                for i in range(0, len(created_product_ids), batch_size):
-                    batch_ids = created_product_ids[i:i + batch_size]
-                    background_tasks.add_task(
-                        product_controller.bulk_process_products_with_ai, batch_ids)
-
-        return result
+        return await run_in_threadpool(ingest)
 
+    except RequestValidationError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -76,26 +92,71 @@ async def bulk_ingest_products(
         )
 
 
+@router.post("/ingest/ndjson", status_code=status.HTTP_202_ACCEPTED)
+async def ndjson_ingest_products(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=2000),
+    db: Session = Depends(get_db)
+):
+    """
+    Ingest raw products from an application/x-ndjson body (one product per line),
+    committing and queueing them for AI processing chunk by chunk as the body arrives
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in ("application/x-ndjson", "application/jsonl"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected an application/x-ndjson body"
+        )
+
+    product_controller = ProductController(db)
+
+    async def ingest_chunk(products):
+        return await run_in_threadpool(product_controller.bulk_ingest_products, products)
+
+    try:
+        return await ingest_ndjson(request.stream(), ingest_chunk, chunk_size)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to ingest products: {str(e)}"
+        )
+
+
 @router.get("/")
 def get_products(
+    request: Request,
     status_filter: Optional[str] = None,
     processing_status: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get products with optional filtering
+    Get products with optional filtering.
+    Passing `cursor` (empty for the first page) switches to keyset pagination
+    and returns `items` plus a `next_cursor` instead of a plain list.
     """
     try:
         product_controller = ProductController(db)
-        return product_controller.get_products(
+        if cursor is not None:
+            return get_response_cache().respond(request, lambda: product_controller.get_products_page(
+                status_filter=status_filter,
+                processing_status=processing_status,
+                limit=limit,
+                cursor=cursor
+            ))
+        return get_response_cache().respond(request, lambda: product_controller.get_products(
             status_filter=status_filter,
             processing_status=processing_status,
             limit=limit,
             offset=offset
-        )
+        ))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -105,21 +166,31 @@ def get_products(
 
 @router.get("/pending")
 def get_pending_products(
-    limit: int = 100,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
     Get products pending approval for admin review
     """
     try:
         product_controller = ProductController(db)
-        return product_controller.get_products(
+        if cursor is not None:
+            return get_response_cache().respond(request, lambda: product_controller.get_products_page(
+                status_filter="pending",
+                limit=limit,
+                cursor=cursor
+            ))
+        return get_response_cache().respond(request, lambda: product_controller.get_products(
             status_filter="pending",
             limit=limit,
             offset=offset
-        )
+        ))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -129,21 +200,31 @@ def get_pending_products(
 
 @router.get("/approved")
 def get_approved_products(
-    limit: int = 100,
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
     Get only approved products for end user display
     """
     try:
         product_controller = ProductController(db)
-        return product_controller.get_products(
+        if cursor is not None:
+            return get_response_cache().respond(request, lambda: product_controller.get_products_page(
+                status_filter="approved",
+                limit=limit,
+                cursor=cursor
+            ))
+        return get_response_cache().respond(request, lambda: product_controller.get_products(
             status_filter="approved",
             limit=limit,
             offset=offset
-        )
+        ))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -151,6 +232,35 @@ def get_approved_products(
         )
 
 
+@router.get("/export")
+def export_products(
+    format: ExportFormat = ExportFormat.NDJSON,
+    status_filter: Optional[ReviewStatus] = Query(None, alias="status"),
+    processing_status: Optional[ProcessingStatus] = None,
+    gzip: bool = False
+):
+    """
+    Stream the whole catalog, or the products with a review status, as NDJSON
+    or CSV straight from a database cursor. `gzip=true` compresses the stream.
+    """
+    media_type = "text/csv" if format == ExportFormat.CSV else "application/x-ndjson"
+    filename = f"products-{status_filter.value if status_filter else 'all'}.{format.value}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_products(
+            format,
+            status_filter=status_filter.value if status_filter else None,
+            processing_status=processing_status.value if processing_status else None,
+            compress=gzip
+        ),
+        media_type=media_type,
+        headers=headers
+    )
+
+
 @router.post("/review/{clean_product_id}")
 def review_product(
     clean_product_id: int,
@@ -173,14 +283,35 @@ def review_product(
         )
 
 
+@router.post("/requeue")
+def requeue_products(
+    include_failed: bool = True,
+    include_stuck: bool = True,
+    stuck_after_seconds: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Requeue failed raw products, and ones stuck in processing, for AI processing
+    """
+    try:
+        product_controller = ProductController(db)
+        return product_controller.requeue_products(include_failed, include_stuck, stuck_after_seconds)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to requeue products: {str(e)}"
+        )
+
+
 @router.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
+def get_stats(request: Request, db: Session = Depends(get_read_db)):
     """
     Get processing statistics
     """
     try:
         product_controller = ProductController(db)
-        return product_controller.get_stats()
+        return get_response_cache().respond(request, product_controller.get_stats)
 
     except Exception as e:
         raise HTTPException(
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -17,11 +17,23 @@ class ReviewStatus(str, Enum):
     REJECTED = "rejected"
 
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class ReviewAction(str, Enum):
     APPROVE = "approve"
     REJECT = "reject"
 
 
+class AIOutcome(str, Enum):
+    OK = "ok"
+    PLACEHOLDER = "placeholder"            # The request failed; nothing usable came back
+    INVALID_CATEGORY = "invalid_category"  # Described, but with a category outside ProductCategory
+    MISSING = "missing"                    # The response left the product out or malformed it
+
+
 class ProductCategory(str, Enum):
     SALES_MARKETING = "sales_marketing"
     DEVTOOLS = "devtools"
@@ -63,3 +75,8 @@ class ProductResponse(BaseModel):
     processing_status: ProcessingStatus
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
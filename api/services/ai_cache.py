@@ -0,0 +1,205 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Dict, Any, List, Optional
+from loguru import logger
+
+from database import SessionLocal, AIResultCache as AIResultCacheModel, in_chunks
+from config.ai_config import get_ai_config, get_cache_config
+from services.prompts import PROMPT_VERSION
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).lower()
+
+
+class AIResultCache:
+    """
+    Persistent cache of AI results keyed by a hash of the normalized product
+    content, prompt version and model, so identical listings are paid for once.
+    """
+
+    # Hit/miss counters for this process, shared by every instance
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+
+    def __init__(self):
+        self.ai_config = get_ai_config()
+        self.cache_config = get_cache_config()
+
+    def key_for(self, product: Dict[str, Any]) -> str:
+        """Content address of a product for the current prompt version and model"""
+        payload = json.dumps([
+            _normalize(product.get("name")),
+            _normalize(product.get("description")),
+            _normalize(product.get("category")),
+            PROMPT_VERSION,
+            self.ai_config["model"]
+        ])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_many(self, products: List[Dict[str, Any]]) -> Dict[Any, Dict[str, str]]:
+        """Return cached results keyed by product id for the products that hit"""
+        if not self.cache_config["enabled"] or not products:
+            return {}
+
+        keys = {product.get("id"): self.key_for(product) for product in products}
+        fresh_after = datetime.utcnow() - \
+            timedelta(seconds=self.cache_config["ttl_seconds"])
+
+        db = SessionLocal()
+        try:
+            cached = {}
+            for chunk in in_chunks(list(set(keys.values()))):
+                cached.update({key: {"description": description, "category": category}
+                               for key, description, category in db.execute(
+                    select(AIResultCacheModel.key, AIResultCacheModel.description,
+                           AIResultCacheModel.category)
+                    .where(AIResultCacheModel.key.in_(chunk))
+                    .where(AIResultCacheModel.created_at >= fresh_after)
+                )})
+
+            if cached:
+                now = datetime.utcnow()
+                for chunk in in_chunks(list(cached)):
+                    db.execute(
+                        update(AIResultCacheModel)
+                        .where(AIResultCacheModel.key.in_(chunk))
+                        .values(hits=AIResultCacheModel.hits + 1, last_used_at=now)
+                    )
+                db.commit()
+
+        except Exception as e:
+            logger.error(f"AI cache lookup failed: {e}")
+            db.rollback()
+            return {}
+        finally:
+            db.close()
+
+        results = {product_id: cached[key]
+                   for product_id, key in keys.items() if key in cached}
+        self._count(hits=len(results), misses=len(products) - len(results))
+        return results
+
+    def put_many(self, products: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> None:
+        """Store results (matched to products by product_id) and evict beyond the size bound"""
+        if not self.cache_config["enabled"] or not results:
+            return
+
+        products_by_id = {product.get("id"): product for product in products}
+        now = datetime.utcnow()
+        rows = {}
+        for result in results:
+            product = products_by_id.get(result.get("product_id"))
+            if product is None:
+                continue
+            key = self.key_for(product)
+            rows[key] = {
+                "key": key,
+                "prompt_version": PROMPT_VERSION,
+                "model": self.ai_config["model"],
+                "source_category": _normalize(product.get("category")),
+                "description": result["description"],
+                "category": result["category"],
+                "hits": 0,
+                "created_at": now,
+                "last_used_at": now
+            }
+        if not rows:
+            return
+
+        db = SessionLocal()
+        try:
+            stmt = sqlite_insert(AIResultCacheModel)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[AIResultCacheModel.key],
+                set_={
+                    "description": stmt.excluded.description,
+                    "category": stmt.excluded.category,
+                    "created_at": stmt.excluded.created_at,
+                    "last_used_at": stmt.excluded.last_used_at
+                }
+            ), list(rows.values()))
+            self._evict(db, now)
+            db.commit()
+
+        except Exception as e:
+            logger.error(f"AI cache store failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _evict(self, db, now: datetime) -> None:
+        """Drop expired entries and least recently used ones beyond max_entries"""
+        expired_before = now - \
+            timedelta(seconds=self.cache_config["ttl_seconds"])
+        db.execute(delete(AIResultCacheModel).where(
+            AIResultCacheModel.created_at < expired_before))
+
+        overflow = (
+            select(AIResultCacheModel.key)
+            .order_by(AIResultCacheModel.last_used_at.desc())
+            .limit(-1)
+            .offset(self.cache_config["max_entries"])
+        )
+        db.execute(delete(AIResultCacheModel).where(
+            AIResultCacheModel.key.in_(overflow.scalar_subquery())))
+
+    def forget_category(self, db, source_category: str, category: str) -> int:
+        """Delete cached results giving a normalized site category's products a category; the caller commits"""
+        result = db.execute(delete(AIResultCacheModel)
+                            .where(AIResultCacheModel.source_category == source_category)
+                            .where(AIResultCacheModel.category == category))
+        return result.rowcount
+
+    def invalidate(self, prompt_version: str) -> int:
+        """Delete every cached result produced with a prompt version"""
+        db = SessionLocal()
+        try:
+            result = db.execute(delete(AIResultCacheModel).where(
+                AIResultCacheModel.prompt_version == prompt_version))
+            db.commit()
+            logger.info(
+                f"Invalidated {result.rowcount} cached AI results for prompt {prompt_version}")
+            return result.rowcount
+
+        except Exception as e:
+            logger.error(f"AI cache invalidation failed: {e}")
+            db.rollback()
+            raise Exception(f"Failed to invalidate AI cache: {str(e)}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size per prompt version plus hit/miss counters"""
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(AIResultCacheModel.prompt_version, func.count(),
+                       func.sum(AIResultCacheModel.hits))
+                .group_by(AIResultCacheModel.prompt_version)
+            ).all()
+        finally:
+            db.close()
+
+        with self._lock:
+            hits, misses = AIResultCache._hits, AIResultCache._misses
+        lookups = hits + misses
+        return {
+            "enabled": self.cache_config["enabled"],
+            "prompt_version": PROMPT_VERSION,
+            "entries": {version: count for version, count, _ in rows},
+            "lifetime_hits": sum(total or 0 for _, _, total in rows),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None
+        }
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            AIResultCache._hits += hits
+            AIResultCache._misses += misses
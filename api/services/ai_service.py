@@ -1,312 +1,426 @@
-from openai import OpenAI
-import os
+import json
 import time
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from loguru import logger
-from schemas.product import ProductCategory
-from dotenv import load_dotenv
-from config.ai_config import get_ai_config, get_batch_config
-
-# Load environment variables from .env file in api directory
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+from schemas.product import AIOutcome, ProductCategory
+from config.ai_config import get_ai_config, get_batch_config, get_classifier_config
+from services.ai_cache import AIResultCache
+from services.batch_controller import get_batch_controller
+from services.batch_packer import BatchPacker
+from services.openai_client import get_openai_client
+from services.category_classifier import get_classifier
+from services.category_mapping import CategoryMappings
+from services import metrics
+from services.prompts import BATCH_SYSTEM_PROMPT, build_batch_prompt
+from services.rate_limiter import get_rate_limiter
+from services.stream_parser import ProductStreamParser
 
 
 class AIService:
     def __init__(self):
-        # Get API key from environment variable
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            logger.warning("OPENAI_API_KEY not found in environment variables")
-
-        # Set OpenAI client
-        if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
-        else:
-            self.client = None
-
         # Load configurations
         self.ai_config = get_ai_config()
         self.batch_config = get_batch_config()
 
-        # Rate limiting
-        self.last_request_time = 0
-        self.requests_this_minute = 0
-        self.minute_start_time = time.time()
-
-    def _check_rate_limit(self):
-        """Check and enforce rate limits"""
-        current_time = time.time()
-
-        # Reset counter if a minute has passed
-        if current_time - self.minute_start_time >= 60:
-            self.requests_this_minute = 0
-            self.minute_start_time = current_time
-
-        # Check if we've hit the rate limit
-        if self.requests_this_minute >= self.batch_config["max_requests_per_minute"]:
-            wait_time = 60 - (current_time - self.minute_start_time)
-            if wait_time > 0:
-                logger.info(
-                    f"Rate limit reached, waiting {wait_time:.1f} seconds")
-                time.sleep(wait_time)
-                self.requests_this_minute = 0
-                self.minute_start_time = time.time()
-
-    def _make_api_request(self, messages: List[Dict[str, Any]], max_tokens: int = None) -> Dict[str, Any]:
-        """Make API request with rate limiting"""
-        self._check_rate_limit()
-
+        # Rate limiting shared with every other request and worker process
+        self.rate_limiter = get_rate_limiter()
+
+        # Results already paid for, keyed by product content
+        self.result_cache = AIResultCache()
+
+        # Splits work into requests that fit the token budgets, capped by the
+        # batch size adapted to recent latency and error rates
+        self.batch_packer = BatchPacker()
+        self.batch_controller = get_batch_controller()
+
+        # Categories known without asking the AI
+        self.category_mappings = CategoryMappings()
+        self.classifier_config = get_classifier_config()
+
+    @property
+    def client(self):
+        """Shared OpenAI client, created on first use; None without an API key"""
+        return get_openai_client()
+
+    def _estimate_tokens(self, messages: List[Dict[str, Any]], max_tokens: int) -> int:
+        """Rough upper bound of tokens a request consumes (~4 characters per token)"""
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return prompt_chars // 4 + max_tokens
+
+    def _make_api_request(
+        self,
+        messages: List[Dict[str, Any]],
+        max_tokens: int = None,
+        request_stats: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Make API request with rate limiting; request_stats receives the request's duration"""
         # Use configured max_tokens if not specified
         if max_tokens is None:
             max_tokens = self.ai_config["max_tokens"]
 
-        response = self.client.chat.completions.create(
-            model=self.ai_config["model"],
-            messages=messages,
-            response_format=self.ai_config["response_format"],
-            max_tokens=max_tokens,
-            temperature=self.ai_config["temperature"]
-        )
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        self.rate_limiter.acquire(estimated_tokens)
 
-        # Update rate limiting counters
-        self.requests_this_minute += 1
-        self.last_request_time = time.time()
+        # Timed after the rate limit wait so only the API's latency is measured
+        started = time.monotonic()
+        try:
+            response = self.client.chat.completions.create(
+                model=self.ai_config["model"],
+                messages=messages,
+                response_format=self.ai_config["response_format"],
+                max_tokens=max_tokens,
+                temperature=self.ai_config["temperature"]
+            )
+        except Exception as e:
+            metrics.AI_REQUESTS.inc(1, type(e).__name__)
+            raise
+        seconds = time.monotonic() - started
+        if request_stats is not None:
+            request_stats["seconds"] = seconds
+        self._record_request_metrics(seconds, response.usage)
+
+        # Give back the part of the estimate the request did not use
+        if response.usage:
+            self.rate_limiter.adjust_tokens(
+                estimated_tokens - response.usage.total_tokens)
 
         return response
 
-    def process_product(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _record_request_metrics(seconds: float, usage: Any) -> None:
+        metrics.AI_REQUESTS.inc(1, "ok")
+        metrics.AI_REQUEST_DURATION.observe(seconds)
+        if usage:
+            metrics.AI_TOKENS.inc(usage.prompt_tokens, "prompt")
+            metrics.AI_TOKENS.inc(usage.completion_tokens, "completion")
+
+    def process_multiple_products(
+        self,
+        products_data: List[Dict[str, Any]],
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Process raw product data using OpenAI API with structured outputs
-        Returns: description, category
+        Process multiple products in a single AI request to reduce API calls
+        With streaming enabled and `on_result` given, each successful result is
+        passed to it as soon as it streams in; cache hits are only returned
+        Returns: List of results with product_id, description, category and
+        outcome; only "ok" results should be persisted
         """
-        if not self.api_key or not self.client:
+        if self.client is None:
             logger.error("OpenAI API key not available")
             raise Exception("OpenAI API key not configured")
 
-        try:
-            # Call OpenAI API with structured output
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a software categorization expert. Analyze the product description and categorize it into one of the predefined categories. Create exactly 2 sentences for the description - no more, no less."
-                },
-                {
-                    "role": "user",
-                    "content": self._create_prompt(raw_data)
-                }
-            ]
-
-            response = self._make_api_request(messages, max_tokens=500)
-
-            # Parse the response
-            content = response.choices[0].message.content
-            import json
-            result = json.loads(content)
-
-            # Validate required fields
-            required_fields = ["description", "category"]
-            for field in required_fields:
-                if field not in result:
-                    raise Exception(f"Missing required field: {field}")
-
-            # Validate category
-            try:
-                category = ProductCategory(result["category"])
-            except ValueError:
-                logger.warning(
-                    f"Invalid category '{result['category']}', defaulting to 'other'")
-                category = ProductCategory.OTHER
-
-            final_result = {
-                "description": result["description"],
-                "category": category.value
-            }
+        if not products_data:
+            return []
 
+        # Reuse results for listings already processed with this prompt and model
+        cached = self.result_cache.get_many(products_data)
+        uncached = [product for product in products_data
+                    if product.get("id") not in cached]
+        if cached:
             logger.info(
-                f"Successfully processed product: {raw_data.get('name', 'Unknown')}")
-            return final_result
-
-        except Exception as e:
-            logger.error(f"AI processing failed: {e}")
-            raise Exception(f"AI processing failed: {str(e)}")
-
-    def process_multiple_products(self, products_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                f"AI cache hit for {len(cached)} of {len(products_data)} products")
+
+        # Products with a known category only need a description from the AI
+        if uncached:
+            uncached = self._preset_categories(uncached)
+
+        # One request per token-budget packed batch
+        fresh_results = {}
+        for batch in self.batch_packer.pack(uncached, self.batch_controller.batch_size()):
+            results = self._request_batch(batch, on_result)
+            fresh_results.update(
+                {result["product_id"]: result for result in results})
+            self.result_cache.put_many(
+                batch, [result for result in results if result["outcome"] == AIOutcome.OK.value])
+
+        processed_results = []
+        for product_data in products_data:
+            product_id = product_data.get("id")
+            if product_id in cached:
+                processed_results.append(
+                    {"product_id": product_id, **cached[product_id], "outcome": AIOutcome.OK.value})
+            else:
+                processed_results.append(fresh_results[product_id])
+        return processed_results
+
+    def _preset_categories(self, products_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Process multiple products in a single AI request to reduce API calls
-        Returns: List of results with product_id, description, category
+        Copy of the products with fixed_category set from a learned site category
+        mapping, or else where the local classifier is confident
         """
-        if not self.api_key or not self.client:
-            logger.error("OpenAI API key not available")
-            raise Exception("OpenAI API key not configured")
-
-        if not products_data:
-            return []
+        mapped = self.category_mappings.lookup(products_data)
+        classifier = get_classifier() if self.classifier_config["enabled"] else None
+
+        preset = []
+        classified = 0
+        for product_data in products_data:
+            category = mapped.get(product_data.get("id"))
+            if category is None and classifier is not None:
+                category = classifier.confident_category(product_data)
+                classified += category is not None
+            preset.append({**product_data, "fixed_category": category}
+                          if category else product_data)
+
+        if mapped or classified:
+            logger.info(
+                f"Preset categories for {len(mapped)} mapped and {classified} locally classified "
+                f"of {len(products_data)} products")
+        return preset
+
+    def _request_batch(
+        self,
+        products_data: List[Dict[str, Any]],
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Send one AI request for the products
+        Returns: one result per product, with the outcome of the product's part of the response
+        """
+        # Already loaded by the client; imported here to keep the module light
+        from openai import RateLimitError
 
+        results_by_id = {}
+        request_stats = {}
+        parse_failed = rate_limited = False
         try:
-            # Create a single prompt for all products
-            combined_prompt = self._create_batch_prompt(products_data)
+            messages, products_by_key = self._batch_messages(products_data)
 
             logger.info(
                 f"Processing {len(products_data)} products in single AI request")
 
-            # Call OpenAI API with structured output for multiple products
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a software categorization expert. Analyze multiple products and categorize each one. For each product, create exactly 2 sentences for the description - no more, no less."
-                },
-                {
-                    "role": "user",
-                    "content": combined_prompt
-                }
-            ]
-
-            response = self._make_api_request(messages, max_tokens=2000)
-
-            # Parse the response
-            content = response.choices[0].message.content
-            import json
-            result = json.loads(content)
-
-            # Validate and process results
-            processed_results = []
-            for i, product_data in enumerate(products_data):
-                product_id = product_data.get("id")
-                product_name = product_data.get("name", "Unknown")
-
-                try:
-                    # Extract result for this product
-                    if "products" in result and i < len(result["products"]):
-                        product_result = result["products"][i]
-                    else:
-                        # Fallback: try to find by name
-                        product_result = self._find_product_result(
-                            result, product_name)
-
-                    if product_result and "description" in product_result and "category" in product_result:
-                        # Validate category
-                        try:
-                            category = ProductCategory(
-                                product_result["category"])
-                        except ValueError:
-                            logger.warning(
-                                f"Invalid category '{product_result['category']}' for {product_name}, defaulting to 'other'")
-                            category = ProductCategory.OTHER
-
-                        processed_results.append({
-                            "product_id": product_id,
-                            "description": product_result["description"],
-                            "category": category.value
-                        })
-
-                        logger.info(f"Successfully processed: {product_name}")
-                    else:
-                        logger.warning(
-                            f"Missing required fields for {product_name}")
-                        # Add default result
-                        processed_results.append({
-                            "product_id": product_id,
-                            "description": f"{product_name} is a software product that provides various features and functionality.",
-                            "category": "other"
-                        })
-
-                except Exception as e:
-                    logger.error(f"Error processing {product_name}: {e}")
-                    # Add default result on error
-                    processed_results.append({
-                        "product_id": product_id,
-                        "description": f"{product_name} is a software product that provides various features and functionality.",
-                        "category": "other"
-                    })
-
-            logger.info(
-                f"Successfully processed {len(processed_results)} out of {len(products_data)} products")
-            return processed_results
-
+            max_tokens = self.batch_packer.max_tokens_for(products_data)
+
+            if on_result and self.ai_config["stream"]:
+                # Hand each product over as soon as its object has streamed in
+                for key, product_result in self._stream_api_request(messages, max_tokens, request_stats):
+                    product_data = products_by_key.get(key)
+                    if product_data is None or product_data.get("id") in results_by_id:
+                        continue
+                    result = self._to_result(product_data, product_result)
+                    if result:
+                        results_by_id[result["product_id"]] = result
+                        if result["outcome"] == AIOutcome.OK.value:
+                            on_result(result)
+            else:
+                response = self._make_api_request(
+                    messages, max_tokens=max_tokens, request_stats=request_stats)
+
+                # A truncated completion is invalid JSON; the batch estimate was too low
+                if response.choices[0].finish_reason == "length":
+                    request_stats["truncated"] = True
+                    logger.warning(
+                        f"AI response truncated at max_tokens for a batch of {len(products_data)} products")
+
+                results_by_id = self.parse_batch_response(
+                    response.choices[0].message.content, products_by_key)
+
+        except RateLimitError as e:
+            rate_limited = True
+            logger.error(f"AI batch processing rate limited: {e}")
+        except ValueError as e:
+            parse_failed = True
+            logger.error(f"AI batch response could not be parsed: {e}")
         except Exception as e:
             logger.error(f"AI batch processing failed: {e}")
-            # Return default results for all products on failure
-            default_results = []
-            for product_data in products_data:
-                product_id = product_data.get("id")
-                product_name = product_data.get("name", "Unknown")
-                default_results.append({
-                    "product_id": product_id,
-                    "description": f"{product_name} is a software product that provides various features and functionality.",
-                    "category": "other"
-                })
-            return default_results
-
-    def _find_product_result(self, result: Dict[str, Any], product_name: str) -> Optional[Dict[str, Any]]:
-        """Find product result by name in case the order doesn't match"""
-        if "products" in result:
-            for product_result in result["products"]:
-                if product_result.get("name") == product_name:
-                    return product_result
-        return None
-
-    def _create_batch_prompt(self, products_data: List[Dict[str, Any]]) -> str:
-        """Create a prompt for processing multiple products at once"""
-        prompt = "Please analyze the following software products and provide a JSON response with the following structure:\n\n"
-        prompt += "{\n"
-        prompt += '  "products": [\n'
-
-        for i, product in enumerate(products_data):
-            name = product.get('name', 'Unknown Product')
-            description = product.get(
-                'description', 'No description available')
-            category = product.get('category', 'No category')
-            website = product.get('website', 'No website')
-
-            prompt += '    {\n'
-            prompt += f'      "name": "{name}",\n'
-            prompt += f'      "description": "EXACTLY 2 sentences - no more, no less. Make it professional and clear while preserving important context.",\n'
-            prompt += f'      "category": "Choose from: sales_marketing, devtools, data_analytics, productivity, finance, other"\n'
-            prompt += '    }'
-            if i < len(products_data) - 1:
-                prompt += ','
-            prompt += '\n'
-
-        prompt += '  ]\n'
-        prompt += '}\n\n'
-        prompt += 'Product details:\n'
-
-        for product in products_data:
-            name = product.get('name', 'Unknown Product')
-            description = product.get(
-                'description', 'No description available')
-            category = product.get('category', 'No category')
-            website = product.get('website', 'No website')
-
-            prompt += f'\nProduct Name: {name}\n'
-            prompt += f'Website: {website}\n'
-            prompt += f'Raw Category: {category}\n'
-            prompt += f'Raw Description: {description}\n'
-
-        prompt += '\nIMPORTANT: The description must be exactly 2 sentences. Do not truncate or add ellipsis.'
-        prompt += ' If the product doesn\'t fit clearly into the first 5 categories, use "other".'
-
-        return prompt
-
-    def _create_prompt(self, raw_data: Dict[str, Any]) -> str:
-        """Create the prompt for OpenAI API for single product"""
-        name = raw_data.get('name', 'Unknown Product')
-        description = raw_data.get('description', 'No description available')
-        category = raw_data.get('category', 'No category')
-        website = raw_data.get('website', 'No website')
-
-        prompt = f"""
-        Product Name: {name}
-        Website: {website}
-        Raw Category: {category}
-        Raw Description: {description}
-
-        Please analyze this software product and provide a JSON response with:
-        1. description: EXACTLY 2 sentences - no more, no less. Make it professional and clear while preserving important context.
-        2. category: Choose from: sales_marketing, devtools, data_analytics, productivity, finance, other
-
-        If the product doesn't fit clearly into the first 5 categories, use "other".
-        IMPORTANT: The description must be exactly 2 sentences. Do not truncate or add ellipsis.
+
+        # Feed the outcome back into the batch size and concurrency decisions
+        if rate_limited or "seconds" in request_stats:
+            self.batch_controller.record(
+                products=len(products_data),
+                latency=request_stats.get("seconds", 0.0),
+                missing=len(products_data) - len(results_by_id),
+                parse_failed=parse_failed,
+                truncated=request_stats.get("truncated", False),
+                rate_limited=rate_limited
+            )
+
+        # Products without a usable result get the placeholder result; with a
+        # response in hand they were missing from it, otherwise the request failed
+        outcome = AIOutcome.MISSING if "seconds" in request_stats and not parse_failed \
+            else AIOutcome.PLACEHOLDER
+        processed_results = []
+        for product_data in products_data:
+            product_id = product_data.get("id")
+            if product_id in results_by_id:
+                processed_results.append(results_by_id[product_id])
+            else:
+                logger.warning(
+                    f"Missing required fields for {product_data.get('name', 'Unknown')}")
+                processed_results.append(
+                    self._default_result(product_data, outcome))
+
+        ok = sum(1 for result in processed_results if result["outcome"] == AIOutcome.OK.value)
+        logger.info(
+            f"Successfully processed {ok} out of {len(products_data)} products")
+        return processed_results
+
+    def _batch_messages(self, products_data: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Chat messages for a batch, plus the products keyed by their prompt ids"""
+        # Create a single compact prompt for all products
+        combined_prompt, products_by_key = build_batch_prompt(products_data)
+
+        # Instructions are sent once as the system message
+        messages = [
+            {
+                "role": "system",
+                "content": BATCH_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": combined_prompt
+            }
+        ]
+        return messages, products_by_key
+
+    def parse_batch_response(self, content: str, products_by_key: Dict[str, Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        """Valid results keyed by product id from a batch response body"""
+        result = json.loads(content)
+        results_by_key = result.get("products") if isinstance(result, dict) else None
+        if not isinstance(results_by_key, dict):
+            raise ValueError(
+                "Response products is not an object keyed by id")
+
+        # Match results by short id rather than position
+        results_by_id = {}
+        for key, product_data in products_by_key.items():
+            product_result = self._to_result(
+                product_data, results_by_key.get(key))
+            if product_result:
+                results_by_id[product_result["product_id"]] = product_result
+        return results_by_id
+
+    def measure_request(self, products_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send one batch request without caching or saving its results
+        Returns: its finish reason and token usage next to the packer's estimates
+        """
+        messages, _ = self._batch_messages(products_data)
+        max_tokens = self.batch_packer.max_tokens_for(products_data)
+        response = self._make_api_request(messages, max_tokens=max_tokens)
+        return {
+            "products": len(products_data),
+            "estimated_output_tokens": sum(
+                self.batch_packer.output_tokens(product) for product in products_data),
+            "max_tokens": max_tokens,
+            "finish_reason": response.choices[0].finish_reason,
+            "prompt_tokens": response.usage.prompt_tokens if response.usage else None,
+            "completion_tokens": response.usage.completion_tokens if response.usage else None
+        }
+
+    def prepare_offline_batches(
+        self,
+        products_data: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Build chat completion request bodies for an offline batch file instead of calling the API
+        Returns: requests (body and products keyed by prompt id) and results served from the cache
         """
+        cached = self.result_cache.get_many(products_data)
+        uncached = [product for product in products_data
+                    if product.get("id") not in cached]
+        if uncached:
+            uncached = self._preset_categories(uncached)
+
+        requests = []
+        for batch in self.batch_packer.pack(uncached):
+            messages, products_by_key = self._batch_messages(batch)
+            requests.append({
+                "body": {
+                    "model": self.ai_config["model"],
+                    "messages": messages,
+                    "response_format": self.ai_config["response_format"],
+                    "max_tokens": self.batch_packer.max_tokens_for(batch),
+                    "temperature": self.ai_config["temperature"]
+                },
+                "products_by_key": products_by_key
+            })
+
+        cached_results = [{"product_id": product_id, **result}
+                          for product_id, result in cached.items()]
+        return requests, cached_results
+
+    def _to_result(self, product_data: Dict[str, Any], product_result: Any) -> Optional[Dict[str, Any]]:
+        """Validate one product's part of the response; None if it is unusable"""
+        product_name = product_data.get("name", "Unknown")
+        fixed_category = product_data.get("fixed_category")
+        if not isinstance(product_result, dict) or "description" not in product_result:
+            return None
+        if not fixed_category and "category" not in product_result:
+            return None
+
+        # Validate category; a locally assigned one wins over the response
+        outcome = AIOutcome.OK
+        try:
+            category = ProductCategory(
+                fixed_category or product_result["category"])
+        except ValueError:
+            logger.warning(
+                f"Invalid category '{product_result['category']}' for {product_name}, defaulting to 'other'")
+            category = ProductCategory.OTHER
+            outcome = AIOutcome.INVALID_CATEGORY
+
+        logger.info(f"Successfully processed: {product_name}")
+        return {
+            "product_id": product_data.get("id"),
+            "description": product_result["description"],
+            "category": category.value,
+            "outcome": outcome.value
+        }
+
+    def _stream_api_request(
+        self,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        request_stats: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Make a streaming API request, yielding (id, product) pairs as they complete"""
+        request_stats = request_stats if request_stats is not None else {}
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        self.rate_limiter.acquire(estimated_tokens)
+
+        started = time.monotonic()
+        usage = None
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.ai_config["model"],
+                messages=messages,
+                response_format=self.ai_config["response_format"],
+                max_tokens=max_tokens,
+                temperature=self.ai_config["temperature"],
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+
+            parser = ProductStreamParser()
+            for chunk in stream:
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        yield from parser.feed(choice.delta.content)
+                    if choice.finish_reason == "length":
+                        request_stats["truncated"] = True
+                        logger.warning(
+                            "Streamed AI response truncated at max_tokens")
 
-        return prompt.strip()
+                # The final chunk carries usage; give back the unused estimate
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                    self.rate_limiter.adjust_tokens(
+                        estimated_tokens - usage.total_tokens)
+        except Exception as e:
+            metrics.AI_REQUESTS.inc(1, type(e).__name__)
+            raise
+
+        request_stats["seconds"] = time.monotonic() - started
+        self._record_request_metrics(request_stats["seconds"], usage)
+
+    def _default_result(self, product_data: Dict[str, Any], outcome: AIOutcome = AIOutcome.PLACEHOLDER) -> Dict[str, Any]:
+        """Placeholder result for a product the AI response did not cover"""
+        product_name = product_data.get("name", "Unknown")
+        return {
+            "product_id": product_data.get("id"),
+            "description": f"{product_name} is a software product that provides various features and functionality.",
+            "category": product_data.get("fixed_category") or "other",
+            "outcome": outcome.value
+        }
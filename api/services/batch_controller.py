@@ -0,0 +1,243 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional
+from loguru import logger
+
+from database import SessionLocal, AIBatchingState
+from config.ai_config import get_adaptive_batch_config
+
+STATE_NAME = "default"
+
+
+class AdaptiveBatchController:
+    """
+    Adjusts products per request and active worker concurrency from observed
+    requests: multiplicative decrease on parse failures, truncation and rate
+    limit errors, smaller decreases on slow or incomplete responses, and
+    additive increase after a run of clean requests. Decisions are stored in
+    ai_batching_state so every process works from the latest one.
+    """
+
+    # Re-read decisions made by other processes this often
+    REFRESH_SECONDS = 10
+
+    def __init__(self):
+        self.config = get_adaptive_batch_config()
+        self.max_concurrency = self.config["max_concurrency"]
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=self.config["window_size"])
+        self._clean_streak = 0
+        self._batch_size = self.config["max_batch_size"]
+        self._concurrency = self.max_concurrency
+        self._refreshed_at = 0.0
+        self._refresh()
+
+    def limit_concurrency(self, threads: int) -> None:
+        """Cap concurrency at the worker threads this process actually runs"""
+        with self._lock:
+            self.max_concurrency = max(self.config["min_concurrency"],
+                                       min(self.config["max_concurrency"], threads))
+            self._concurrency = min(self._concurrency, self.max_concurrency)
+            if self.config["enabled"]:
+                self._store(None, None, f"{threads} worker threads")
+
+    def batch_size(self) -> int:
+        """Products per AI request to pack right now"""
+        if not self.config["enabled"]:
+            return self.config["max_batch_size"]
+        self._refresh_if_stale()
+        return self._batch_size
+
+    def concurrency(self) -> int:
+        """Worker threads that may send AI requests right now"""
+        if not self.config["enabled"]:
+            return self.max_concurrency
+        self._refresh_if_stale()
+        return self._concurrency
+
+    def record(
+        self,
+        products: int,
+        latency: float,
+        missing: int = 0,
+        parse_failed: bool = False,
+        truncated: bool = False,
+        rate_limited: bool = False
+    ) -> None:
+        """Record one AI request and adjust the batch size and concurrency"""
+        if not self.config["enabled"]:
+            return
+
+        with self._lock:
+            self._window.append({
+                "products": products,
+                "latency": latency,
+                "missing": missing,
+                "parse_failed": parse_failed,
+                "truncated": truncated,
+                "rate_limited": rate_limited
+            })
+            decision = self._decide(latency, parse_failed, truncated, rate_limited)
+            if decision:
+                self._store(*decision)
+
+    def _decide(self, latency: float, parse_failed: bool, truncated: bool, rate_limited: bool):
+        """(resize, rescale, reason) to apply to the stored batch size and concurrency, or None"""
+        factor = self.config["decrease_factor"]
+        missing_rate = self._missing_rate()
+
+        if rate_limited:
+            return (None, lambda concurrency: math.floor(concurrency * factor),
+                    "rate limited")
+        if parse_failed or truncated:
+            return (lambda size: math.floor(size * factor), None,
+                    "unparseable response" if parse_failed else "truncated response")
+        if missing_rate > self.config["max_missing_rate"]:
+            return (lambda size: size - max(1, size // 4), None,
+                    f"missing rate {missing_rate:.2f}")
+        if latency > self.config["max_latency_seconds"]:
+            return (lambda size: size - max(1, size // 4), None,
+                    f"latency {latency:.1f}s")
+
+        self._clean_streak += 1
+        if self._clean_streak < self.config["grow_after_requests"]:
+            return None
+        self._clean_streak = 0
+        grow_concurrency = not any(
+            observation["rate_limited"] for observation in self._window)
+        return (lambda size: size + self.config["batch_growth_step"],
+                (lambda concurrency: concurrency + 1) if grow_concurrency else None,
+                "clean requests")
+
+    def _missing_rate(self) -> float:
+        products = sum(observation["products"] for observation in self._window)
+        missing = sum(observation["missing"] for observation in self._window)
+        return missing / products if products else 0.0
+
+    def _store(self, resize, rescale, reason: str) -> None:
+        """Apply a decision to the stored state (read-modify-write) and adopt the result"""
+        db = SessionLocal()
+        try:
+            state = db.query(AIBatchingState).filter(
+                AIBatchingState.name == STATE_NAME).first()
+            if state is None:
+                state = AIBatchingState(
+                    name=STATE_NAME, batch_size=self._batch_size, concurrency=self._concurrency)
+                db.add(state)
+
+            # Decisions start from the stored values within this process's bounds
+            batch_size = min(self.config["max_batch_size"], state.batch_size)
+            concurrency = min(self.max_concurrency, state.concurrency)
+            if resize:
+                batch_size = min(self.config["max_batch_size"],
+                                 max(self.config["min_batch_size"], resize(batch_size)))
+            if rescale:
+                concurrency = min(self.max_concurrency,
+                                  max(self.config["min_concurrency"], rescale(concurrency)))
+
+            changed = (batch_size, concurrency) != (state.batch_size, state.concurrency)
+            decision = (f"{reason}: batch size {state.batch_size} -> {batch_size}, "
+                        f"concurrency {state.concurrency} -> {concurrency}")
+            state.batch_size = batch_size
+            state.concurrency = concurrency
+            if changed:
+                state.last_decision = decision
+            state.window = json.dumps(self._summary())
+            state.updated_at = datetime.utcnow()
+            db.commit()
+
+        except Exception as e:
+            logger.error(f"Could not store adaptive batching state: {e}")
+            db.rollback()
+            return
+        finally:
+            db.close()
+
+        if changed:
+            logger.info(f"Adaptive batching, {decision}")
+            # A decrease starts a fresh window so one burst is acted on once
+            if reason != "clean requests":
+                self._window.clear()
+                self._clean_streak = 0
+        self._batch_size, self._concurrency = batch_size, concurrency
+        self._refreshed_at = time.monotonic()
+
+    def _refresh_if_stale(self) -> None:
+        if time.monotonic() - self._refreshed_at >= self.REFRESH_SECONDS:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        """Adopt the decision stored by any process, within this process's bounds"""
+        db = SessionLocal()
+        try:
+            state = db.query(AIBatchingState).filter(
+                AIBatchingState.name == STATE_NAME).first()
+            if state:
+                with self._lock:
+                    self._batch_size = min(self.config["max_batch_size"],
+                                           max(self.config["min_batch_size"], state.batch_size))
+                    self._concurrency = min(self.max_concurrency,
+                                            max(self.config["min_concurrency"], state.concurrency))
+        except Exception as e:
+            logger.error(f"Could not load adaptive batching state: {e}")
+        finally:
+            db.close()
+            self._refreshed_at = time.monotonic()
+
+    def _summary(self) -> Dict[str, Any]:
+        """Rates over the recent requests"""
+        requests = len(self._window)
+        if not requests:
+            return {"requests": 0}
+        return {
+            "requests": requests,
+            "avg_latency_seconds": round(
+                sum(observation["latency"] for observation in self._window) / requests, 2),
+            "parse_failure_rate": round(
+                sum(observation["parse_failed"] for observation in self._window) / requests, 4),
+            "truncation_rate": round(
+                sum(observation["truncated"] for observation in self._window) / requests, 4),
+            "rate_limited_rate": round(
+                sum(observation["rate_limited"] for observation in self._window) / requests, 4),
+            "missing_rate": round(self._missing_rate(), 4)
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """Current decisions, their bounds and the last stored request summary"""
+        db = SessionLocal()
+        try:
+            stored = db.query(AIBatchingState).filter(
+                AIBatchingState.name == STATE_NAME).first()
+        finally:
+            db.close()
+
+        return {
+            "enabled": self.config["enabled"],
+            "batch_size": stored.batch_size if stored else self._batch_size,
+            "concurrency": stored.concurrency if stored else self._concurrency,
+            "bounds": {
+                "batch_size": [self.config["min_batch_size"], self.config["max_batch_size"]],
+                "concurrency": [self.config["min_concurrency"], self.max_concurrency]
+            },
+            "last_decision": stored.last_decision if stored else None,
+            "window": json.loads(stored.window) if stored and stored.window else self._summary(),
+            "updated_at": stored.updated_at.isoformat() if stored else None
+        }
+
+
+_controller: Optional[AdaptiveBatchController] = None
+_controller_lock = threading.Lock()
+
+
+def get_batch_controller() -> AdaptiveBatchController:
+    """Get the process-wide adaptive batch controller"""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdaptiveBatchController()
+    return _controller
@@ -0,0 +1,329 @@
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional
+from loguru import logger
+
+from database import AIBatchFile, AIBatchItem, AIJob, RawProduct, in_chunks
+from config.ai_config import get_ai_config, get_batch_file_config
+from schemas.product import AIOutcome
+from services.job_service import JobService
+from services.product_service import ProductService
+from services.prompts import PROMPT_VERSION
+
+
+class BatchFileService:
+    """
+    Offline AI processing through batch files: queued jobs are exported as a
+    JSONL file of chat completion requests (one per packed batch) and the
+    matching output file is applied in a single transaction.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.config = get_batch_file_config()
+        self.ai_config = get_ai_config()
+        self.job_service = JobService(db)
+
+    @staticmethod
+    def owner_for(batch_file_id: int) -> str:
+        return f"batch-file:{batch_file_id}"
+
+    def export(self, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Lease queued jobs to a new batch file and write its requests; None if nothing is queued"""
+        limit = min(limit or self.config["max_products_per_file"],
+                    self.config["max_products_per_file"])
+        os.makedirs(self.config["directory"], exist_ok=True)
+
+        batch_file = AIBatchFile(
+            input_path="",
+            prompt_version=PROMPT_VERSION,
+            model=self.ai_config["model"]
+        )
+        self.db.add(batch_file)
+        self.db.commit()
+
+        # Exported jobs stay leased to the file until imported; if that never
+        # happens the lease expires and workers pick them up again
+        try:
+            claimed = self.job_service.claim_batch(
+                self.owner_for(batch_file.id), limit,
+                lease_seconds=self.config["lease_hours"] * 3600)
+        except Exception:
+            self.db.delete(batch_file)
+            self.db.commit()
+            raise
+        if not claimed:
+            self.db.delete(batch_file)
+            self.db.commit()
+            logger.info("No queued AI jobs to export")
+            return None
+
+        try:
+            job_ids = {job["raw_id"]: job["job_id"] for job in claimed}
+            products_data = self._load_products(list(job_ids))
+
+            # Import here to avoid circular imports
+            from services.ai_service import AIService
+            requests, cached_results = AIService().prepare_offline_batches(products_data)
+
+            input_path = os.path.join(
+                self.config["directory"], f"ai-batch-{batch_file.id}-input.jsonl")
+            items = []
+            with open(input_path, "w") as input_file:
+                for index, request in enumerate(requests, start=1):
+                    custom_id = f"f{batch_file.id}-r{index}"
+                    input_file.write(json.dumps({
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": request["body"]
+                    }, ensure_ascii=False) + "\n")
+                    for key, product in request["products_by_key"].items():
+                        items.append({
+                            "batch_file_id": batch_file.id,
+                            "job_id": job_ids[product["id"]],
+                            "raw_product_id": product["id"],
+                            "custom_id": custom_id,
+                            "product_key": key,
+                            "fixed_category": product.get("fixed_category"),
+                            "status": "in_flight"
+                        })
+
+            if items:
+                self.db.execute(insert(AIBatchItem), items)
+
+            # Products already in the result cache are done without a request
+            if cached_results:
+                self._apply_results(
+                    cached_results, [job_ids[result["product_id"]] for result in cached_results])
+
+            batch_file.input_path = input_path
+            batch_file.requests = len(requests)
+            batch_file.products = len(items)
+            self.db.commit()
+
+            logger.info(
+                f"Exported {len(items)} products in {len(requests)} requests to {input_path}"
+                f" ({len(cached_results)} served from cache)")
+            return {
+                "batch_file_id": batch_file.id,
+                "input_path": input_path,
+                "requests": len(requests),
+                "products": len(items),
+                "cached": len(cached_results)
+            }
+
+        except Exception as e:
+            logger.error(f"Error exporting AI batch file: {e}")
+            self.db.rollback()
+            self.job_service.fail([job["job_id"] for job in claimed],
+                                  f"Batch file export failed: {str(e)}")
+            raise Exception(f"Failed to export AI batch file: {str(e)}")
+
+    def import_results(self, output_path: str, batch_file_id: Optional[int] = None) -> Dict[str, Any]:
+        """Apply a batch output file to clean_products, raw_products and ai_jobs in one transaction"""
+        with open(output_path) as output_file:
+            lines = [json.loads(line) for line in output_file if line.strip()]
+
+        if batch_file_id is None:
+            batch_file_id = self._file_id_from(lines)
+        batch_file = self.db.query(AIBatchFile).filter(
+            AIBatchFile.id == batch_file_id).first()
+        if not batch_file:
+            raise ValueError(f"Batch file {batch_file_id} not found")
+        if batch_file.status == "imported":
+            raise ValueError(f"Batch file {batch_file_id} was already imported")
+
+        try:
+            items = self._in_flight_items(batch_file_id)
+
+            # Import here to avoid circular imports
+            from services.ai_service import AIService
+            ai_service = AIService()
+
+            results = []
+            errors: Dict[int, str] = {}
+            responses = {line.get("custom_id"): line for line in lines}
+            for custom_id, products_by_key in items.items():
+                line = responses.get(custom_id)
+                try:
+                    content = self._response_content(line)
+                    results_by_id = ai_service.parse_batch_response(
+                        content, products_by_key)
+                except Exception as e:
+                    results_by_id = {}
+                    error = f"{AIOutcome.PLACEHOLDER.value}: batch response {custom_id} unusable: {str(e)}"
+                    logger.warning(error)
+                else:
+                    error = f"{AIOutcome.MISSING.value}: not in batch response {custom_id}"
+
+                for product in products_by_key.values():
+                    result = results_by_id.get(product["id"])
+                    if result is None:
+                        errors[product["id"]] = error
+                    elif result["outcome"] != AIOutcome.OK.value:
+                        errors[product["id"]] = f"{result['outcome']}: batch response {custom_id}"
+                    else:
+                        results.append(result)
+
+            job_ids = {product["id"]: product["job_id"]
+                       for products_by_key in items.values() for product in products_by_key.values()}
+            self._apply_results(
+                results, [job_ids[result["product_id"]] for result in results])
+            failed_jobs: Dict[str, List[int]] = defaultdict(list)
+            for raw_id, error in errors.items():
+                failed_jobs[error].append(job_ids[raw_id])
+            for error, error_job_ids in failed_jobs.items():
+                for chunk in in_chunks(error_job_ids):
+                    self.job_service.mark_failed(chunk, error)
+
+            for status, raw_ids in (("applied", [result["product_id"] for result in results]),
+                                    ("failed", list(errors))):
+                for chunk in in_chunks(raw_ids):
+                    self.db.execute(
+                        update(AIBatchItem)
+                        .where(AIBatchItem.batch_file_id == batch_file_id)
+                        .where(AIBatchItem.raw_product_id.in_(chunk))
+                        .values(status=status),
+                        execution_options={"synchronize_session": False}
+                    )
+
+            batch_file.status = "imported"
+            batch_file.output_path = output_path
+            batch_file.imported_at = datetime.utcnow()
+            self.db.commit()
+
+        except Exception as e:
+            logger.error(f"Error importing AI batch file: {e}")
+            self.db.rollback()
+            raise Exception(f"Failed to import AI batch file: {str(e)}")
+
+        # Results are only cached once they are committed, keyed by the full
+        # content they were generated from, and only if the file's prompt and
+        # model are still the current ones
+        if (batch_file.prompt_version, batch_file.model) == (PROMPT_VERSION, self.ai_config["model"]):
+            ai_service.result_cache.put_many(
+                self._load_products([result["product_id"] for result in results]), results)
+
+        logger.info(
+            f"Imported batch file {batch_file_id}: {len(results)} applied, {len(errors)} failed")
+        return {
+            "batch_file_id": batch_file_id,
+            "applied": len(results),
+            "failed": len(errors)
+        }
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Every batch file with its item counts by status"""
+        counts: Dict[int, Dict[str, int]] = {}
+        for batch_file_id, item_status, count in (
+            self.db.query(AIBatchItem.batch_file_id, AIBatchItem.status, func.count())
+            .group_by(AIBatchItem.batch_file_id, AIBatchItem.status)
+        ):
+            counts.setdefault(batch_file_id, {})[item_status] = count
+
+        return [{
+            "batch_file_id": batch_file.id,
+            "status": batch_file.status,
+            "input_path": batch_file.input_path,
+            "output_path": batch_file.output_path,
+            "prompt_version": batch_file.prompt_version,
+            "requests": batch_file.requests,
+            "products": batch_file.products,
+            "items": counts.get(batch_file.id, {}),
+            "created_at": batch_file.created_at.isoformat(),
+            "imported_at": batch_file.imported_at.isoformat() if batch_file.imported_at else None
+        } for batch_file in self.db.query(AIBatchFile).order_by(AIBatchFile.id)]
+
+    def _load_products(self, raw_ids: List[int]) -> List[Dict[str, Any]]:
+        products = []
+        for chunk in in_chunks(raw_ids):
+            products.extend({
+                "id": row.id,
+                "name": row.name,
+                "website": row.website,
+                "category": row.category,
+                "description": row.description
+            } for row in self.db.query(
+                RawProduct.id, RawProduct.name, RawProduct.website,
+                RawProduct.category, RawProduct.description
+            ).filter(RawProduct.id.in_(chunk)))
+        return products
+
+    def _in_flight_items(self, batch_file_id: int) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        In-flight items whose job is still leased to this file, as products keyed
+        by prompt id per custom_id; items that lost their lease are marked failed
+        """
+        rows = (
+            self.db.query(AIBatchItem.custom_id, AIBatchItem.product_key, AIBatchItem.job_id,
+                          AIBatchItem.fixed_category, RawProduct.id, RawProduct.name,
+                          AIJob.status, AIJob.lease_owner)
+            .join(RawProduct, RawProduct.id == AIBatchItem.raw_product_id)
+            .join(AIJob, AIJob.id == AIBatchItem.job_id)
+            .filter(AIBatchItem.batch_file_id == batch_file_id)
+            .filter(AIBatchItem.status == "in_flight")
+            .all()
+        )
+
+        owner = self.owner_for(batch_file_id)
+        items: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        lost = []
+        for custom_id, key, job_id, fixed_category, raw_id, name, job_status, lease_owner in rows:
+            # An expired lease may have been reclaimed by a worker; leave those to it
+            if job_status != "leased" or lease_owner != owner:
+                lost.append(raw_id)
+                continue
+            items.setdefault(custom_id, {})[key] = {
+                "id": raw_id,
+                "name": name,
+                "job_id": job_id,
+                "fixed_category": fixed_category
+            }
+
+        if lost:
+            logger.warning(
+                f"{len(lost)} products of batch file {batch_file_id} are no longer leased to it")
+            for chunk in in_chunks(lost):
+                self.db.execute(
+                    update(AIBatchItem)
+                    .where(AIBatchItem.batch_file_id == batch_file_id)
+                    .where(AIBatchItem.raw_product_id.in_(chunk))
+                    .values(status="failed"),
+                    execution_options={"synchronize_session": False}
+                )
+        return items
+
+    def _apply_results(self, results: List[Dict[str, Any]], job_ids: List[int]) -> None:
+        """Save clean products, complete raw products and their jobs; the caller commits"""
+        ProductService(self.db).save_ai_results(results)
+        for chunk in in_chunks(job_ids):
+            self.job_service.mark_done(chunk)
+
+    @staticmethod
+    def _file_id_from(lines: List[Dict[str, Any]]) -> int:
+        """Batch file id encoded in the custom_id ("f<file>-r<request>") of the first line"""
+        try:
+            return int(lines[0]["custom_id"].split("-")[0][1:])
+        except (IndexError, KeyError, ValueError):
+            raise ValueError(
+                "Cannot tell the batch file from the output; pass its id")
+
+    @staticmethod
+    def _response_content(line: Optional[Dict[str, Any]]) -> str:
+        """Message content of one batch output line"""
+        if line is None:
+            raise Exception("no response line")
+        if line.get("error"):
+            raise Exception(line["error"].get("message", "request failed"))
+        response = line.get("response") or {}
+        if response.get("status_code") != 200:
+            raise Exception(f"status code {response.get('status_code')}")
+        choice = response["body"]["choices"][0]
+        if choice.get("finish_reason") == "length":
+            logger.warning("Batch response truncated at max_tokens")
+        return choice["message"]["content"]
@@ -0,0 +1,91 @@
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.ai_config import get_batch_config, get_processing_config
+from services.prompts import compact_text
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token for English text)"""
+    return math.ceil(len(text or "") / 4)
+
+
+class BatchPacker:
+    """Pack products into AI requests that fill, but do not overflow, the token budgets"""
+
+    def __init__(self):
+        self.batch_config = get_batch_config()
+        self.max_description_chars = get_processing_config()[
+            "max_description_chars"]
+
+    def input_tokens(self, product: Dict[str, Any]) -> int:
+        """Estimated prompt tokens contributed by one product"""
+        content = " ".join(compact_text(product.get(field)) for field in (
+            "name", "website", "category"))
+        description = compact_text(
+            product.get("description"), self.max_description_chars)
+        return (estimate_tokens(content) + estimate_tokens(description)
+                + self.batch_config["prompt_tokens_per_product"])
+
+    def output_tokens(self, product: Dict[str, Any]) -> int:
+        """Estimated completion tokens for one product's result"""
+        # Long source descriptions tend to yield longer sentences
+        tokens = (self.batch_config["output_tokens_per_product"]
+                  + min(estimate_tokens(product.get("description")) // 20, 40))
+        # Locally categorized products come back without a category
+        if product.get("fixed_category"):
+            tokens -= self.batch_config["category_output_tokens"]
+        return tokens
+
+    def pack(self, products: List[Dict[str, Any]], max_products: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """Split products, in order, into batches within the per-request budgets"""
+        return [batch for batch, _ in self.pack_with_limits(products, max_products)]
+
+    def pack_with_limits(
+        self,
+        products: List[Dict[str, Any]],
+        max_products: Optional[int] = None
+    ) -> List[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Pack like pack(), pairing each batch with the limit that closed it:
+        "max_products", "input_tokens" or "output_tokens" (None for the last batch)
+        """
+        max_products = min(max_products or self.batch_config["max_products_per_request"],
+                           self.batch_config["max_products_per_request"])
+        max_input = self.batch_config["max_input_tokens_per_request"]
+        max_output = self.batch_config["max_output_tokens_per_request"] / \
+            self.batch_config["output_safety_margin"]
+
+        batches = []
+        batch, batch_input, batch_output = [], 0, 0
+        for product in products:
+            product_input = self.input_tokens(product)
+            product_output = self.output_tokens(product)
+
+            # A product that alone exceeds a budget still gets a batch of its own
+            limit = None
+            if batch:
+                if len(batch) >= max_products:
+                    limit = "max_products"
+                elif batch_input + product_input > max_input:
+                    limit = "input_tokens"
+                elif batch_output + product_output > max_output:
+                    limit = "output_tokens"
+            if limit:
+                batches.append((batch, limit))
+                batch, batch_input, batch_output = [], 0, 0
+
+            batch.append(product)
+            batch_input += product_input
+            batch_output += product_output
+
+        if batch:
+            batches.append((batch, None))
+        return batches
+
+    def max_tokens_for(self, batch: List[Dict[str, Any]]) -> int:
+        """Completion token limit for a packed batch, with headroom against truncation"""
+        # Packing keeps this within max_output_tokens_per_request except for
+        # a single oversized product, which gets the room it needs
+        expected = sum(self.output_tokens(product) for product in batch)
+        return math.ceil(expected * self.batch_config["output_safety_margin"])
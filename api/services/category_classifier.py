@@ -0,0 +1,200 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+from loguru import logger
+
+from config.ai_config import get_classifier_config
+
+# Keywords that strongly suggest a category, matched against name, raw category and description
+KEYWORD_RULES = {
+    "sales_marketing": [
+        "crm", "sales", "marketing", "lead generation", "email marketing", "seo",
+        "advertising", "social media", "customer relationship", "affiliate", "campaign"
+    ],
+    "devtools": [
+        "developer", "api", "devops", "continuous integration", "ci/cd", "git", "ide",
+        "code review", "debugging", "software testing", "monitoring", "sdk"
+    ],
+    "data_analytics": [
+        "analytics", "business intelligence", "data warehouse", "etl", "dashboard",
+        "data visualization", "reporting", "big data", "data science"
+    ],
+    "productivity": [
+        "project management", "collaboration", "task management", "note taking",
+        "calendar", "scheduling", "document management", "time tracking", "workflow"
+    ],
+    "finance": [
+        "accounting", "invoice", "invoicing", "payroll", "billing", "expense",
+        "tax", "payment", "budgeting", "bookkeeping", "financial"
+    ]
+}
+
+# Where a keyword hit counts most: a site's category label beats free text
+FIELD_WEIGHTS = {"category": 3.0, "name": 2.0, "description": 1.0}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "their", "this", "to", "with", "your", "you"
+}
+
+
+def words_of(text: str) -> str:
+    """Lowercase words joined by single spaces, for whole-phrase keyword matching"""
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word unigrams and bigrams"""
+    words = [word for word in re.findall(r"[a-z0-9]+", (text or "").lower())
+             if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def product_text(product: Dict[str, Any]) -> str:
+    return " ".join(str(product.get(field) or "") for field in ("name", "category", "description"))
+
+
+class CategoryClassifier:
+    """Keyword rules plus a TF-IDF nearest-centroid model trained on approved products"""
+
+    def __init__(self, model: Optional[Dict[str, Any]] = None):
+        self.config = get_classifier_config()
+        self.idf: Dict[str, float] = (model or {}).get("idf", {})
+        self.centroids: Dict[str, Dict[str, float]] = (
+            model or {}).get("centroids", {})
+
+    # Keyword rules
+
+    def rule_scores(self, product: Dict[str, Any]) -> Dict[str, float]:
+        scores = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            text = f" {words_of(product.get(field))} "
+            for category, keywords in KEYWORD_RULES.items():
+                for keyword in keywords:
+                    if f" {words_of(keyword)} " in text:
+                        scores[category] += weight
+        return scores
+
+    def predict_rules(self, product: Dict[str, Any]) -> Tuple[Optional[str], float]:
+        scores = self.rule_scores(product)
+        if not scores:
+            return None, 0.0
+        category, top = max(scores.items(), key=lambda item: item[1])
+        # Share of the evidence, discounted until there is a strong hit
+        confidence = top / sum(scores.values()) * min(1.0, top / 3)
+        return category, confidence
+
+    # TF-IDF model
+
+    def vectorize(self, product: Dict[str, Any]) -> Dict[str, float]:
+        counts = Counter(term for term in tokenize(product_text(product)) if term in self.idf)
+        vector = {term: count * self.idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {term: value / norm for term, value in vector.items()} if norm else {}
+
+    def predict_model(self, product: Dict[str, Any]) -> Tuple[Optional[str], float]:
+        if not self.centroids:
+            return None, 0.0
+        vector = self.vectorize(product)
+        if not vector:
+            return None, 0.0
+
+        similarities = {
+            category: sum(value * centroid.get(term, 0.0) for term, value in vector.items())
+            for category, centroid in self.centroids.items()
+        }
+        # Softmax over cosine similarities turns margins into a confidence
+        scale = self.config["softmax_scale"]
+        peak = max(similarities.values())
+        weights = {category: math.exp(scale * (similarity - peak))
+                   for category, similarity in similarities.items()}
+        category = max(weights, key=weights.get)
+        return category, weights[category] / sum(weights.values())
+
+    def predict(self, product: Dict[str, Any]) -> Tuple[Optional[str], float]:
+        """Category and confidence from whichever signal is surer; disagreement halves it"""
+        rule_category, rule_confidence = self.predict_rules(product)
+        model_category, model_confidence = self.predict_model(product)
+
+        if rule_category is None or model_category is None:
+            return (rule_category, rule_confidence) if model_category is None else (model_category, model_confidence)
+        if rule_category == model_category:
+            return rule_category, max(rule_confidence, model_confidence)
+        if rule_confidence >= model_confidence:
+            return rule_category, rule_confidence / 2
+        return model_category, model_confidence / 2
+
+    def confident_category(self, product: Dict[str, Any]) -> Optional[str]:
+        """Category if the prediction clears the confidence threshold"""
+        category, confidence = self.predict(product)
+        if category and confidence >= self.config["confidence_threshold"]:
+            return category
+        return None
+
+    # Training
+
+    @classmethod
+    def train(cls, samples: List[Tuple[Dict[str, Any], str]]) -> "CategoryClassifier":
+        """Fit IDF weights and per-category centroids from (product, category) samples"""
+        config = get_classifier_config()
+        documents = [set(tokenize(product_text(product)))
+                     for product, _ in samples]
+        document_frequency = Counter(
+            term for document in documents for term in document)
+        vocabulary = [term for term, _ in document_frequency.most_common(
+            config["max_vocabulary"]) if document_frequency[term] >= 2]
+
+        total = len(samples)
+        idf = {term: math.log((1 + total) / (1 + document_frequency[term])) + 1
+               for term in vocabulary}
+        classifier = cls({"idf": idf, "centroids": {}})
+
+        sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for product, category in samples:
+            for term, value in classifier.vectorize(product).items():
+                sums[category][term] += value
+
+        centroids = {}
+        for category, vector in sums.items():
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            if norm:
+                centroids[category] = {term: round(value / norm, 6)
+                                       for term, value in vector.items()}
+        classifier.centroids = centroids
+        return classifier
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"idf": self.idf, "centroids": self.centroids}
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as model_file:
+            json.dump(self.to_dict(), model_file)
+
+
+_classifier: Optional[CategoryClassifier] = None
+_classifier_mtime: Optional[float] = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> CategoryClassifier:
+    """Shared classifier, reloaded when the model file is retrained"""
+    global _classifier, _classifier_mtime
+    path = get_classifier_config()["model_path"]
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+
+    with _classifier_lock:
+        if _classifier is None or mtime != _classifier_mtime:
+            model = None
+            if mtime is not None:
+                try:
+                    with open(path) as model_file:
+                        model = json.load(model_file)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not load category model {path}: {e}")
+            _classifier = CategoryClassifier(model)
+            _classifier_mtime = mtime
+        return _classifier
@@ -0,0 +1,266 @@
+import threading
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional, Tuple
+from loguru import logger
+
+from database import SessionLocal, CategoryMapping, RawProduct, CleanProduct, in_chunks
+from config.ai_config import get_mapping_config
+from services.ai_cache import AIResultCache
+
+
+def normalize_source_category(category: Optional[str]) -> str:
+    return " ".join((category or "").split()).lower()
+
+
+class CategoryMappings:
+    """
+    Site category to ProductCategory memo learned from approved reviews.
+    A site category is mapped once enough approvals agree on one target, and
+    the mapping is retired once reviewers reject too many of its products.
+    """
+
+    # Lookup counters for this process, shared by every instance
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+
+    def __init__(self):
+        self.config = get_mapping_config()
+
+    def record_review(self, db: Session, source_category: Optional[str], category: str,
+                      approved: bool) -> None:
+        """
+        Count a review against the active mapping that categorized the product,
+        if any, and learn from approvals; the caller commits
+        """
+        if self.config["enabled"]:
+            self._record_mapped_review(db, source_category, category, approved)
+        if approved:
+            self.record_approval(db, source_category, category)
+
+    def _record_mapped_review(self, db: Session, source_category: Optional[str], category: str,
+                              approved: bool) -> None:
+        source = normalize_source_category(source_category)
+        if not source:
+            return
+
+        # The product was categorized by the mapping if the mapping is active
+        # and agrees with it; a matching AI answer is counted the same way
+        mapping = self._resolve(db.execute(
+            self._select().where(CategoryMapping.source_category == source)).all()).get(source)
+        if not mapping or not mapping["active"] or mapping["category"] != category:
+            return
+
+        reviewed = mapping["reviewed"] + 1
+        rejections = mapping["rejections"] + (0 if approved else 1)
+        db.execute(
+            update(CategoryMapping)
+            .where(CategoryMapping.source_category == source)
+            .where(CategoryMapping.category == category)
+            .values(reviewed=CategoryMapping.reviewed + 1,
+                    rejections=CategoryMapping.rejections + (0 if approved else 1),
+                    updated_at=datetime.utcnow())
+        )
+        if self._retired(reviewed, rejections):
+            # Cached results would keep presetting the retired category without the mapping
+            forgotten = AIResultCache().forget_category(db, source, category)
+            logger.warning(
+                f"Retired category mapping '{source}' -> {category}: "
+                f"{rejections} of {reviewed} mapped products rejected, "
+                f"{forgotten} cached results dropped")
+
+    def record_approval(self, db: Session, source_category: Optional[str], category: str) -> None:
+        """Count an approved (site category, category) pair; the caller commits"""
+        source = normalize_source_category(source_category)
+        if not source:
+            return
+
+        stmt = sqlite_insert(CategoryMapping).values(
+            source_category=source,
+            category=category,
+            approvals=1,
+            hits=0,
+            reviewed=0,
+            rejections=0,
+            updated_at=datetime.utcnow()
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[CategoryMapping.source_category,
+                            CategoryMapping.category],
+            set_={
+                "approvals": CategoryMapping.approvals + 1,
+                "updated_at": stmt.excluded.updated_at
+            }
+        ))
+
+    def rebuild(self, db: Session, reset_reviews: bool = False) -> int:
+        """
+        Recount approvals from the whole review history, keeping hit counts and,
+        unless reset_reviews, the mapped review counts that retire mappings,
+        which the history does not record; the caller commits
+        """
+        rows = (
+            db.query(RawProduct.category, CleanProduct.category, func.count())
+            .join(CleanProduct, CleanProduct.raw_product_id == RawProduct.id)
+            .filter(CleanProduct.status == "approved")
+            .group_by(RawProduct.category, CleanProduct.category)
+            .all()
+        )
+        approvals: Dict[Tuple[str, str], int] = defaultdict(int)
+        for source_category, category, count in rows:
+            source = normalize_source_category(source_category)
+            if source:
+                approvals[(source, category)] += count
+
+        reset = {"approvals": 0}
+        if reset_reviews:
+            reset.update(reviewed=0, rejections=0)
+        db.execute(update(CategoryMapping).values(**reset))
+        if approvals:
+            now = datetime.utcnow()
+            stmt = sqlite_insert(CategoryMapping)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[CategoryMapping.source_category,
+                                CategoryMapping.category],
+                set_={"approvals": stmt.excluded.approvals,
+                      "updated_at": stmt.excluded.updated_at}
+            ), [{"source_category": source, "category": category, "approvals": count,
+                 "hits": 0, "reviewed": 0, "rejections": 0, "updated_at": now}
+                for (source, category), count in approvals.items()])
+        return len(approvals)
+
+    def _retired(self, reviewed: int, rejections: int) -> bool:
+        """Whether reviewers rejected too many of a mapping's products for it to be trusted"""
+        return (reviewed >= self.config["min_mapped_reviews"]
+                and rejections / reviewed > self.config["max_rejection_rate"])
+
+    def _resolve(self, rows) -> Dict[str, Dict[str, Any]]:
+        """
+        Leading category, its approvals, disagreements, hits and mapped reviews
+        per site category; retired mappings no longer vote
+        """
+        votes = defaultdict(dict)
+        reviews = {}
+        retired = defaultdict(list)
+        hits = defaultdict(int)
+        for source, category, approvals, category_hits, reviewed, rejections in rows:
+            hits[source] += category_hits
+            if self._retired(reviewed, rejections):
+                retired[source].append(
+                    {"category": category, "reviewed": reviewed, "rejections": rejections})
+            else:
+                votes[source][category] = approvals
+                reviews[(source, category)] = (reviewed, rejections)
+
+        resolved = {}
+        for source in set(votes) | set(retired):
+            categories = votes[source]
+            category, approvals = max(
+                categories.items(), key=lambda item: item[1], default=(None, 0))
+            total = sum(categories.values())
+            reviewed, rejections = reviews.get((source, category), (0, 0))
+            resolved[source] = {
+                "category": category,
+                "approvals": approvals,
+                "disagreements": total - approvals,
+                "agreement": round(approvals / total, 4) if total else None,
+                "hits": hits[source],
+                "reviewed": reviewed,
+                "rejections": rejections,
+                "rejection_rate": round(rejections / reviewed, 4) if reviewed else None,
+                "retired": retired[source],
+                "active": (approvals >= self.config["min_approvals"]
+                           and approvals / total >= self.config["min_agreement"])
+            }
+        return resolved
+
+    def _select(self):
+        return select(CategoryMapping.source_category, CategoryMapping.category,
+                      CategoryMapping.approvals, CategoryMapping.hits,
+                      CategoryMapping.reviewed, CategoryMapping.rejections)
+
+    def lookup(self, products: List[Dict[str, Any]]) -> Dict[Any, str]:
+        """Return mapped categories keyed by product id for products whose site category is mapped"""
+        if not self.config["enabled"] or not products:
+            return {}
+
+        sources = {product.get("id"): normalize_source_category(product.get("category"))
+                   for product in products}
+        wanted = {source for source in sources.values() if source}
+        if not wanted:
+            self._count(hits=0, misses=len(products))
+            return {}
+
+        db = SessionLocal()
+        try:
+            rows = []
+            for chunk in in_chunks(list(wanted)):
+                rows.extend(db.execute(
+                    self._select().where(CategoryMapping.source_category.in_(chunk))).all())
+            mapped = {source: mapping["category"]
+                      for source, mapping in self._resolve(rows).items() if mapping["active"]}
+
+            results = {product_id: mapped[source]
+                       for product_id, source in sources.items() if source in mapped}
+
+            # Hits are kept on the row of the mapped category
+            used: Dict[Tuple[str, str], int] = defaultdict(int)
+            for source in sources.values():
+                if source in mapped:
+                    used[(source, mapped[source])] += 1
+            for (source, category), count in used.items():
+                db.execute(
+                    update(CategoryMapping)
+                    .where(CategoryMapping.source_category == source)
+                    .where(CategoryMapping.category == category)
+                    .values(hits=CategoryMapping.hits + count)
+                )
+            if used:
+                db.commit()
+
+        except Exception as e:
+            logger.error(f"Category mapping lookup failed: {e}")
+            db.rollback()
+            return {}
+        finally:
+            db.close()
+
+        self._count(hits=len(results), misses=len(products) - len(results))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Every learned mapping with agreement and hits, plus lookup hit rate"""
+        db = SessionLocal()
+        try:
+            rows = db.execute(self._select()).all()
+        finally:
+            db.close()
+
+        mappings = self._resolve(rows)
+        with self._lock:
+            hits, misses = CategoryMappings._hits, CategoryMappings._misses
+        lookups = hits + misses
+        return {
+            "enabled": self.config["enabled"],
+            "active_mappings": sum(1 for mapping in mappings.values() if mapping["active"]),
+            "retired_mappings": sum(len(mapping["retired"]) for mapping in mappings.values()),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            # Most rejected and contested first, so stale mappings surface at the top
+            "mappings": [
+                {"source_category": source, **mapping}
+                for source, mapping in sorted(
+                    mappings.items(),
+                    key=lambda item: (-item[1]["rejections"], -item[1]["disagreements"], item[0]))
+            ]
+        }
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            CategoryMappings._hits += hits
+            CategoryMappings._misses += misses
@@ -0,0 +1,321 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import List, Dict, Optional
+from loguru import logger
+
+from database import AIJob, RawProduct, in_chunks
+from config.ai_config import get_worker_config
+
+
+class JobService:
+    """Durable queue of AI processing jobs, one per raw product"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.worker_config = get_worker_config()
+
+    def enqueue(self, raw_ids: List[int]) -> int:
+        """
+        Add queued jobs for raw products, skipping products that already have
+        one (e.g. enqueued by a concurrent backfill); the caller commits
+        """
+        if not raw_ids:
+            return 0
+        queued = self.db.execute(
+            sqlite_insert(AIJob).on_conflict_do_nothing().returning(AIJob.id),
+            [{"raw_product_id": raw_id, "status": "queued"} for raw_id in raw_ids]
+        ).all()
+        return len(queued)
+
+    def backfill(self) -> int:
+        """Enqueue unfinished raw products that have no job yet"""
+        try:
+            raw_ids = [
+                raw_id for (raw_id,) in self.db.query(RawProduct.id)
+                .outerjoin(AIJob, AIJob.raw_product_id == RawProduct.id)
+                .filter(AIJob.id.is_(None))
+                .filter(RawProduct.processing_status.in_(["pending", "processing"]))
+            ]
+            queued = self.enqueue(raw_ids)
+            self.db.commit()
+            if queued:
+                logger.info(f"Enqueued {queued} raw products without a job")
+            return queued
+
+        except Exception as e:
+            logger.error(f"Error backfilling AI jobs: {e}")
+            self.db.rollback()
+            raise Exception(f"Failed to backfill AI jobs: {str(e)}")
+
+    def claim_batch(
+        self,
+        owner: str,
+        limit: int,
+        max_wait_seconds: float = 0,
+        lease_seconds: Optional[int] = None
+    ) -> List[Dict[str, int]]:
+        """
+        Atomically lease up to `limit` available jobs for `owner`.
+        With `max_wait_seconds`, a partial batch is only claimed once its
+        oldest job has waited that long, so single ingests are coalesced.
+        """
+        now = datetime.utcnow()
+        lease_seconds = lease_seconds or self.worker_config["lease_seconds"]
+        try:
+            if max_wait_seconds and not self._batch_ready(now, limit, max_wait_seconds):
+                return []
+
+            # Queued jobs that are due, plus leases whose owner stopped heartbeating
+            claimable = (
+                select(AIJob.id)
+                .where(or_(
+                    and_(AIJob.status == "queued", AIJob.available_at <= now),
+                    and_(AIJob.status == "leased", AIJob.lease_expires_at < now)
+                ))
+                .where(AIJob.attempts < self.worker_config["max_attempts"])
+                .order_by(AIJob.id)
+                .limit(limit)
+            )
+            claimed = self.db.execute(
+                update(AIJob)
+                .where(AIJob.id.in_(claimable.scalar_subquery()))
+                .values(
+                    status="leased",
+                    lease_owner=owner,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    heartbeat_at=now,
+                    attempts=AIJob.attempts + 1
+                )
+                .returning(AIJob.id, AIJob.raw_product_id),
+                execution_options={"synchronize_session": False}
+            ).all()
+
+            self._set_raw_status([raw_id for _, raw_id in claimed], "processing")
+            self.db.commit()
+
+            return [{"job_id": job_id, "raw_id": raw_id} for job_id, raw_id in claimed]
+
+        except Exception as e:
+            logger.error(f"Error claiming AI jobs: {e}")
+            self.db.rollback()
+            raise Exception(f"Failed to claim AI jobs: {str(e)}")
+
+    def _batch_ready(self, now: datetime, limit: int, max_wait_seconds: float) -> bool:
+        """Whether a full batch is due or the oldest due job has waited long enough"""
+        due = (
+            select(AIJob.available_at)
+            .where(AIJob.status == "queued", AIJob.available_at <= now)
+            .order_by(AIJob.id)
+            .limit(limit)
+            .subquery()
+        )
+        count, oldest = self.db.execute(
+            select(func.count(), func.min(due.c.available_at))).one()
+        self.db.rollback()
+
+        if count >= limit:
+            return True
+        if count and now - oldest >= timedelta(seconds=max_wait_seconds):
+            return True
+
+        # Abandoned leases are reclaimed without waiting
+        return self.db.query(AIJob.id).filter(
+            AIJob.status == "leased", AIJob.lease_expires_at < now).first() is not None
+
+    def heartbeat(self, owner_prefix: str) -> int:
+        """Extend the leases of every running job owned by this process"""
+        now = datetime.utcnow()
+        try:
+            result = self.db.execute(
+                update(AIJob)
+                .where(AIJob.status == "leased")
+                .where(AIJob.lease_owner.startswith(owner_prefix))
+                .values(
+                    heartbeat_at=now,
+                    lease_expires_at=now +
+                    timedelta(seconds=self.worker_config["lease_seconds"])
+                ),
+                execution_options={"synchronize_session": False}
+            )
+            self.db.commit()
+            return result.rowcount
+
+        except Exception as e:
+            logger.error(f"Error extending AI job leases: {e}")
+            self.db.rollback()
+            return 0
+
+    def complete(self, job_ids: List[int]) -> None:
+        """Mark leased jobs as done"""
+        try:
+            self.mark_done(job_ids)
+            self.db.commit()
+
+        except Exception as e:
+            logger.error(f"Error completing AI jobs: {e}")
+            self.db.rollback()
+
+    def mark_done(self, job_ids: List[int]) -> None:
+        """Mark jobs as done; the caller commits"""
+        for chunk in in_chunks(job_ids):
+            self.db.execute(
+                update(AIJob)
+                .where(AIJob.id.in_(chunk))
+                .values(status="done", lease_owner=None, lease_expires_at=None, last_error=None),
+                execution_options={"synchronize_session": False}
+            )
+
+    def fail(self, job_ids: List[int], error: str) -> None:
+        """Requeue failed jobs after a delay, or fail them once out of attempts"""
+        try:
+            self.mark_failed(job_ids, error)
+            self.db.commit()
+
+        except Exception as e:
+            logger.error(f"Error failing AI jobs: {e}")
+            self.db.rollback()
+
+    def mark_failed(self, job_ids: List[int], error: str) -> None:
+        """Requeue jobs after a delay, or fail them once out of attempts; the caller commits"""
+        now = datetime.utcnow()
+        max_attempts = self.worker_config["max_attempts"]
+        jobs = []
+        for chunk in in_chunks(job_ids):
+            jobs.extend(self.db.query(AIJob.id, AIJob.raw_product_id, AIJob.attempts).filter(
+                AIJob.id.in_(chunk)).all())
+        retry = [job for job in jobs if job.attempts < max_attempts]
+        exhausted = [job for job in jobs if job.attempts >= max_attempts]
+
+        # Exponential backoff: the delay doubles with every attempt made
+        by_attempts: Dict[int, List[int]] = {}
+        for job in retry:
+            by_attempts.setdefault(job.attempts, []).append(job.id)
+        for attempts, retry_ids in by_attempts.items():
+            for chunk in in_chunks(retry_ids):
+                self.db.execute(
+                    update(AIJob)
+                    .where(AIJob.id.in_(chunk))
+                    .values(
+                        status="queued",
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        available_at=now +
+                        timedelta(seconds=self.retry_delay(attempts)),
+                        last_error=error
+                    ),
+                    execution_options={"synchronize_session": False}
+                )
+        if retry:
+            self._set_raw_status([job.raw_product_id for job in retry], "pending")
+
+        if exhausted:
+            for chunk in in_chunks([job.id for job in exhausted]):
+                self.db.execute(
+                    update(AIJob)
+                    .where(AIJob.id.in_(chunk))
+                    .values(status="failed", lease_owner=None, lease_expires_at=None, last_error=error),
+                    execution_options={"synchronize_session": False}
+                )
+            self._set_raw_status(
+                [job.raw_product_id for job in exhausted], "failed")
+            logger.warning(
+                f"{len(exhausted)} AI jobs failed after {max_attempts} attempts")
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds before a job that has made `attempts` attempts is retried"""
+        delay = self.worker_config["retry_delay_seconds"] * 2 ** max(attempts - 1, 0)
+        return min(delay, self.worker_config["max_retry_delay_seconds"])
+
+    def requeue(
+        self,
+        include_failed: bool = True,
+        include_stuck: bool = True,
+        stuck_after_seconds: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Put failed raw products, and ones stuck in processing without a live
+        lease, back in the queue with a fresh attempt budget
+        """
+        now = datetime.utcnow()
+        stuck_before = now - timedelta(
+            seconds=stuck_after_seconds or self.worker_config["stuck_after_seconds"])
+        try:
+            failed_ids = [raw_id for (raw_id,) in self.db.query(RawProduct.id).filter(
+                RawProduct.processing_status == "failed")] if include_failed else []
+
+            stuck_ids = []
+            if include_stuck:
+                live_lease = (
+                    select(AIJob.id)
+                    .where(AIJob.raw_product_id == RawProduct.id)
+                    .where(AIJob.status == "leased", AIJob.lease_expires_at >= now)
+                    .exists()
+                )
+                stuck_ids = [raw_id for (raw_id,) in self.db.query(RawProduct.id).filter(
+                    RawProduct.processing_status == "processing",
+                    RawProduct.updated_at < stuck_before,
+                    ~live_lease
+                )]
+
+            raw_ids = failed_ids + stuck_ids
+            with_job = set()
+            for chunk in in_chunks(raw_ids):
+                with_job.update(raw_id for (raw_id,) in self.db.execute(
+                    update(AIJob)
+                    .where(AIJob.raw_product_id.in_(chunk))
+                    .values(
+                        status="queued",
+                        attempts=0,
+                        available_at=now,
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        last_error=None
+                    )
+                    .returning(AIJob.raw_product_id),
+                    execution_options={"synchronize_session": False}
+                ))
+                self._set_raw_status(chunk, "pending")
+
+            # Rows from before the job queue have no job to reset
+            self.enqueue([raw_id for raw_id in raw_ids if raw_id not in with_job])
+            self.db.commit()
+
+            if raw_ids:
+                logger.info(
+                    f"Requeued {len(failed_ids)} failed and {len(stuck_ids)} stuck raw products")
+            return {"failed": len(failed_ids), "stuck": len(stuck_ids), "requeued": len(raw_ids)}
+
+        except Exception as e:
+            logger.error(f"Error requeueing raw products: {e}")
+            self.db.rollback()
+            raise Exception(f"Failed to requeue raw products: {str(e)}")
+
+    def fail_expired(self) -> int:
+        """Fail jobs whose lease expired on their last allowed attempt"""
+        now = datetime.utcnow()
+        try:
+            expired = self.db.query(AIJob.id).filter(
+                AIJob.status == "leased",
+                AIJob.lease_expires_at < now,
+                AIJob.attempts >= self.worker_config["max_attempts"]
+            ).all()
+            if expired:
+                self.fail([job_id for (job_id,) in expired],
+                          "Lease expired on final attempt")
+            return len(expired)
+
+        except Exception as e:
+            logger.error(f"Error failing expired AI jobs: {e}")
+            self.db.rollback()
+            return 0
+
+    def _set_raw_status(self, raw_ids: List[int], status: str) -> None:
+        for chunk in in_chunks(raw_ids):
+            self.db.execute(
+                update(RawProduct)
+                .where(RawProduct.id.in_(chunk))
+                .values(processing_status=status),
+                execution_options={"synchronize_session": False}
+            )
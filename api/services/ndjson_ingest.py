@@ -0,0 +1,96 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from pydantic import ValidationError
+
+from schemas.product import RawProduct as RawProductModel
+
+# Longest accepted product line; longer lines are rejected without being buffered
+MAX_LINE_BYTES = 1024 * 1024
+
+# Invalid lines reported back individually; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(body: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """(line number, line) pairs of a request body as it arrives; None marks a line over MAX_LINE_BYTES"""
+    buffer = b""
+    line_number = 0
+    oversized = False
+    async for data in body:
+        buffer += data
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_number += 1
+            # A whole line can arrive in one piece of the body, so check every line too
+            if oversized or len(line) > MAX_LINE_BYTES:
+                oversized = False
+                yield line_number, None
+            elif line.strip():
+                yield line_number, line
+        # Drop an unterminated line once it is too long instead of buffering it
+        if len(buffer) > MAX_LINE_BYTES:
+            buffer = b""
+            oversized = True
+
+    if oversized or buffer.strip():
+        yield line_number + 1, None if oversized else buffer
+
+
+async def ingest_ndjson(
+    body: AsyncIterator[bytes],
+    ingest_chunk: Callable[[List[RawProductModel]], Awaitable[Dict[str, Any]]],
+    chunk_size: int
+) -> Dict[str, Any]:
+    """
+    Validate an NDJSON body of raw products line by line and hand them to
+    ingest_chunk in chunks of chunk_size as they arrive, so memory is bounded
+    by one chunk. Returns the totals with per-chunk counts; chunks already
+    ingested stay committed if a later chunk fails.
+    """
+    summary = {"total_processed": 0, "created": 0, "skipped": 0, "invalid": 0,
+               "chunks": [], "errors": []}
+    chunk: List[RawProductModel] = []
+    invalid_in_chunk = 0
+
+    async def flush():
+        nonlocal chunk, invalid_in_chunk
+        try:
+            result = await ingest_chunk(chunk) if chunk else {"created": 0, "skipped": 0}
+        except Exception as e:
+            raise Exception(
+                f"Failed to ingest chunk {len(summary['chunks']) + 1} "
+                f"({summary['created']} products from earlier chunks are committed): {str(e)}")
+        summary["chunks"].append({
+            "chunk": len(summary["chunks"]) + 1,
+            "created": result["created"],
+            "skipped": result["skipped"],
+            "invalid": invalid_in_chunk
+        })
+        summary["created"] += result["created"]
+        summary["skipped"] += result["skipped"]
+        chunk, invalid_in_chunk = [], 0
+
+    async for line_number, line in iter_lines(body):
+        summary["total_processed"] += 1
+        try:
+            if line is None:
+                raise ValueError(f"line longer than {MAX_LINE_BYTES} bytes")
+            chunk.append(RawProductModel.model_validate_json(line))
+        except (ValidationError, ValueError) as e:
+            invalid_in_chunk += 1
+            summary["invalid"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"line": line_number, "error": str(e)})
+            continue
+
+        if len(chunk) >= chunk_size:
+            await flush()
+
+    if chunk or invalid_in_chunk:
+        await flush()
+
+    logger.info(
+        f"NDJSON ingest completed: {summary['created']} created, {summary['skipped']} skipped, "
+        f"{summary['invalid']} invalid in {len(summary['chunks'])} chunks")
+    return summary
@@ -0,0 +1,53 @@
+import os
+import threading
+from typing import Any, Optional
+from loguru import logger
+
+from config.ai_config import get_ai_config
+
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+_env_loaded = False
+
+
+def get_api_key() -> Optional[str]:
+    """OpenAI API key from the environment, loading the api directory's .env once"""
+    global _env_loaded
+    if not _env_loaded:
+        # Imported here so processes that never call the AI skip dotenv
+        from dotenv import load_dotenv
+        load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+        _env_loaded = True
+    return os.getenv("OPENAI_API_KEY")
+
+
+def get_openai_client():
+    """
+    Get the process-wide OpenAI client, created on first use so its HTTP
+    connection pool is shared by every request and worker thread.
+    Returns None when no API key is configured.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = get_api_key()
+                if not api_key:
+                    logger.warning(
+                        "OPENAI_API_KEY not found in environment variables")
+                    return None
+
+                # The openai package is only imported once AI work is needed
+                import httpx
+                from openai import OpenAI
+
+                config = get_ai_config()
+                _client = OpenAI(
+                    api_key=api_key,
+                    timeout=config["timeout_seconds"],
+                    http_client=httpx.Client(limits=httpx.Limits(
+                        max_connections=config["max_connections"],
+                        max_keepalive_connections=config["max_connections"]
+                    ))
+                )
+    return _client
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+from loguru import logger
+
+from database import ReadSessionLocal
+from schemas.product import ExportFormat
+from services.product_service import EXPORT_FIELDS, ProductService
+
+# Bytes buffered before a chunk is handed to the response
+CHUNK_SIZE = 64 * 1024
+
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield _encode_json(row) + "\n"
+
+
+def _csv_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    """Join lines into chunks of about CHUNK_SIZE bytes"""
+    parts, size = [], 0
+    for line in lines:
+        part = line.encode()
+        parts.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield b"".join(parts)
+            parts, size = [], 0
+    # Lines can be empty, e.g. the CSV writer's last flush; never send an empty chunk
+    if size:
+        yield b"".join(parts)
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_products(
+    export_format: ExportFormat,
+    status_filter: Optional[str] = None,
+    processing_status: Optional[str] = None,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Stream matching products as NDJSON or CSV bytes with memory independent of
+    the row count. The generator owns its read session, because the response
+    body is sent after request dependencies have been closed.
+    """
+    db = ReadSessionLocal()
+    try:
+        rows = ProductService(db).iter_products(status_filter, processing_status)
+        lines = _csv_lines(rows) if export_format == ExportFormat.CSV else _ndjson_lines(rows)
+        chunks = _chunked(lines)
+        yield from (_gzipped(chunks) if compress else chunks)
+    except Exception as e:
+        # Headers are already sent, so the client only sees a truncated body
+        logger.error(f"Error exporting products: {e}")
+        raise
+    finally:
+        db.close()
@@ -1,9 +1,38 @@
+import base64
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from sqlalchemy import delete, func, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import List, Optional, Dict, Any, Iterator
 from loguru import logger
 
-from database import RawProduct, CleanProduct, Review
-from schemas.product import RawProduct as RawProductModel, CleanProduct as CleanProductModel, Review as ReviewModel, ProductResponse
+from config.db_config import get_stats_config
+from database import RawProduct, CleanProduct, Review, ProductCounter, counter_seed_sql, counter_triggers_installed, in_chunks
+from services.job_service import JobService
+from schemas.product import RawProduct as RawProductModel, CleanProduct as CleanProductModel, Review as ReviewModel, ProductResponse, ProductPage, AIOutcome
+
+# Rows fetched from the cursor at a time while exporting
+EXPORT_BATCH_SIZE = 1000
+
+# Columns of an exported product, in CSV column order
+EXPORT_FIELDS = ["id", "name", "description", "website", "logo", "category",
+                 "status", "processing_status", "created_at", "updated_at"]
+
+
+def encode_cursor(key_kind: str, key: int) -> str:
+    """Encode a listing sort key as an opaque cursor"""
+    return base64.urlsafe_b64encode(f"{key_kind}:{key}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_kind: str) -> int:
+    """Decode a cursor produced by encode_cursor for the same listing"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, key = base64.urlsafe_b64decode(padded).decode().split(":")
+        if kind != key_kind:
+            raise ValueError("cursor belongs to a different listing")
+        return int(key)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 class ProductService:
@@ -13,31 +42,33 @@ class ProductService:
     def create_raw_product(self, product: RawProductModel) -> Dict[str, Any]:
         """Create a new raw product"""
         try:
-            # Check if product already exists
-            existing = self.db.query(RawProduct).filter(
-                RawProduct.name == product.name).first()
-            if existing:
-                return {"message": "Product already exists", "raw_id": existing.id}
-
-            # Save raw product
-            db_product = RawProduct(
-                name=product.name,
-                description=product.description,
-                website=product.website,
-                logo=product.logo,
-                category=product.category,
-                processing_status="pending"
-            )
+            # Insert unless the name exists, so a concurrent ingest of the
+            # same name is skipped instead of failing on the unique index
+            raw_id = self.db.execute(
+                sqlite_insert(RawProduct).values(
+                    name=product.name,
+                    description=product.description,
+                    website=product.website,
+                    logo=product.logo,
+                    category=product.category,
+                    processing_status="pending"
+                ).on_conflict_do_nothing().returning(RawProduct.id)
+            ).scalar()
+
+            if raw_id is None:
+                self.db.rollback()
+                existing_id = self._find_ids_by_name([product.name]).get(product.name)
+                return {"message": "Product already exists", "raw_id": existing_id}
 
-            self.db.add(db_product)
+            # Queue AI processing in the same transaction as the insert
+            JobService(self.db).enqueue([raw_id])
             self.db.commit()
-            self.db.refresh(db_product)
 
             logger.info(
-                f"Product created: {product.name} (ID: {db_product.id})")
+                f"Product created: {product.name} (ID: {raw_id})")
             return {
                 "message": "Product created successfully",
-                "raw_id": db_product.id,
+                "raw_id": raw_id,
                 "status": "pending"
             }
 
@@ -49,54 +80,63 @@ class ProductService:
     def bulk_create_raw_products(self, products: List[RawProductModel]) -> Dict[str, Any]:
         """Create multiple raw products in bulk"""
         try:
+            names = list(dict.fromkeys(product.name for product in products))
+            existing_ids = self._find_ids_by_name(names)
+
+            # Build insert rows, skipping existing names and repeats within the batch
+            rows = []
+            batch_names = set()
+            for product in products:
+                if product.name in existing_ids or product.name in batch_names:
+                    continue
+                batch_names.add(product.name)
+                rows.append({
+                    "name": product.name,
+                    "description": product.description,
+                    "website": product.website,
+                    "logo": product.logo,
+                    "category": product.category,
+                    "processing_status": "pending"
+                })
+
+            # Multi-row insert returning generated ids; rows lost to a
+            # concurrent ingest of the same name are ignored and looked up below
+            created_ids = {}
+            if rows:
+                stmt = sqlite_insert(RawProduct).on_conflict_do_nothing().returning(
+                    RawProduct.id, RawProduct.name)
+                for raw_id, name in self.db.execute(stmt, rows):
+                    created_ids[name] = raw_id
+
+                raced = [row["name"] for row in rows
+                         if row["name"] not in created_ids]
+                existing_ids.update(self._find_ids_by_name(raced))
+
+            # Queue AI processing in the same transaction as the insert
+            JobService(self.db).enqueue(list(created_ids.values()))
+            self.db.commit()
+
             results = []
             created_count = 0
             skipped_count = 0
-
             for product in products:
-                # Check if product already exists
-                existing = self.db.query(RawProduct).filter(
-                    RawProduct.name == product.name).first()
-                if existing:
+                if product.name in created_ids and product.name in batch_names:
+                    batch_names.discard(product.name)
+                    results.append({
+                        "name": product.name,
+                        "status": "created",
+                        "message": "Product created successfully",
+                        "raw_id": created_ids[product.name]
+                    })
+                    created_count += 1
+                else:
                     results.append({
                         "name": product.name,
                         "status": "skipped",
                         "message": "Product already exists",
-                        "raw_id": existing.id
+                        "raw_id": created_ids.get(product.name, existing_ids.get(product.name))
                     })
                     skipped_count += 1
-                    continue
-
-                # Create raw product
-                db_product = RawProduct(
-                    name=product.name,
-                    description=product.description,
-                    website=product.website,
-                    logo=product.logo,
-                    category=product.category,
-                    processing_status="pending"
-                )
-                self.db.add(db_product)
-                results.append({
-                    "name": product.name,
-                    "status": "created",
-                    "message": "Product created successfully",
-                    "raw_id": None  # Will be set after commit
-                })
-                created_count += 1
-
-            # Commit all changes
-            self.db.commit()
-
-            # Update raw_id for created products
-            for i, result in enumerate(results):
-                if result["status"] == "created":
-                    # Get the product we just created to get its ID
-                    created_product = self.db.query(RawProduct).filter(
-                        RawProduct.name == result["name"]
-                    ).first()
-                    if created_product:
-                        result["raw_id"] = created_product.id
 
             logger.info(
                 f"Bulk insert completed: {created_count} created, {skipped_count} skipped")
@@ -112,6 +152,15 @@ class ProductService:
             self.db.rollback()
             raise Exception(f"Failed to bulk create products: {str(e)}")
 
+    def _find_ids_by_name(self, names: List[str]) -> Dict[str, int]:
+        """Look up raw product ids by name using chunked IN queries"""
+        found = {}
+        for chunk in in_chunks(names):
+            rows = self.db.query(RawProduct.name, RawProduct.id).filter(
+                RawProduct.name.in_(chunk)).all()
+            found.update({name: raw_id for name, raw_id in rows})
+        return found
+
     def get_products(
         self,
         status_filter: Optional[str] = None,
@@ -121,209 +170,362 @@ class ProductService:
     ) -> List[ProductResponse]:
         """Get products with filtering and pagination"""
         try:
-            query = self.db.query(RawProduct).outerjoin(CleanProduct)
-
-            # Apply filters
-            if status_filter:
-                query = query.filter(CleanProduct.status == status_filter)
-
-            if processing_status:
-                query = query.filter(
-                    RawProduct.processing_status == processing_status)
+            query, sort_key = self._product_listing_query(
+                status_filter, processing_status)
 
             # Apply pagination
-            products = query.offset(offset).limit(limit).all()
-
-            # Convert to response model
-            result = []
-            for raw_product in products:
-                clean_product = self.db.query(CleanProduct).filter(
-                    CleanProduct.raw_product_id == raw_product.id
-                ).first()
-
-                response = ProductResponse(
-                    id=raw_product.id,
-                    name=raw_product.name,
-                    description=clean_product.description if clean_product else raw_product.description,
-                    website=raw_product.website,
-                    logo=raw_product.logo,
-                    category=clean_product.category if clean_product else None,
-                    status=clean_product.status if clean_product else "pending",
-                    processing_status=raw_product.processing_status,
-                    created_at=raw_product.created_at,
-                    updated_at=raw_product.updated_at
-                )
-                result.append(response)
-
-            return result
+            rows = query.order_by(sort_key).offset(offset).limit(limit).all()
+
+            return [self._to_product_response(row) for row in rows]
 
         except Exception as e:
             logger.error(f"Error getting products: {e}")
             raise Exception(f"Failed to get products: {str(e)}")
 
-    def update_processing_status(self, raw_id: int, status: str) -> bool:
-        """Update the processing status of a raw product"""
-        try:
-            raw_product = self.db.query(RawProduct).filter(
-                RawProduct.id == raw_id).first()
-            if not raw_product:
-                return False
-
-            raw_product.processing_status = status
-            self.db.commit()
-            return True
+    def get_products_page(
+        self,
+        status_filter: Optional[str] = None,
+        processing_status: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> ProductPage:
+        """Get a page of products after an opaque keyset cursor"""
+        query, sort_key = self._product_listing_query(
+            status_filter, processing_status)
+        key_kind = "c" if status_filter else "r"
 
-        except Exception as e:
-            logger.error(f"Error updating processing status: {e}")
-            self.db.rollback()
-            return False
+        # Seek past the last row of the previous page instead of using OFFSET
+        if cursor:
+            query = query.filter(sort_key > decode_cursor(cursor, key_kind))
 
-    def create_clean_product(self, raw_id: int, ai_result: Dict[str, str]) -> bool:
-        """Create a clean product from AI processing result"""
         try:
-            clean_product = CleanProduct(
-                raw_product_id=raw_id,
-                description=ai_result["description"],
-                category=ai_result["category"],
-                status="pending"
+            rows = query.order_by(sort_key).limit(limit + 1).all()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(
+                    key_kind, last.clean_id if status_filter else last.id)
+
+            return ProductPage(
+                items=[self._to_product_response(row) for row in rows],
+                next_cursor=next_cursor
             )
 
-            self.db.add(clean_product)
-            self.db.commit()
-            return True
-
         except Exception as e:
-            logger.error(f"Error creating clean product: {e}")
-            self.db.rollback()
-            return False
-
-    def bulk_create_clean_products(self, ai_results: List[Dict[str, Any]]) -> bool:
-        """Create multiple clean products from AI processing results"""
-        try:
-            for result in ai_results:
-                raw_id = result.get("product_id")
-                if raw_id:
-                    clean_product = CleanProduct(
-                        raw_product_id=raw_id,
-                        description=result["description"],
-                        category=result["category"],
-                        status="pending"
-                    )
-                    self.db.add(clean_product)
+            logger.error(f"Error getting products page: {e}")
+            raise Exception(f"Failed to get products: {str(e)}")
 
-            self.db.commit()
-            logger.info(
-                f"Successfully created {len(ai_results)} clean products")
-            return True
+    def iter_products(
+        self,
+        status_filter: Optional[str] = None,
+        processing_status: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream every matching product as an export row, fetching EXPORT_BATCH_SIZE rows at a time"""
+        query, sort_key = self._product_listing_query(
+            status_filter, processing_status)
+        # Unpacked positionally; named attribute access dominates per-row cost
+        for (raw_id, name, description, website, logo, processing_status, created_at,
+             updated_at, clean_id, clean_description, clean_category, clean_status
+             ) in query.order_by(sort_key).yield_per(EXPORT_BATCH_SIZE):
+            has_clean = clean_id is not None
+            yield {
+                "id": raw_id,
+                "name": name,
+                "description": clean_description if has_clean else description,
+                "website": website,
+                "logo": logo,
+                "category": clean_category if has_clean else None,
+                "status": clean_status if has_clean else "pending",
+                "processing_status": processing_status,
+                "created_at": created_at.isoformat() if created_at else None,
+                "updated_at": updated_at.isoformat() if updated_at else None
+            }
 
-        except Exception as e:
-            logger.error(f"Error creating clean products: {e}")
-            self.db.rollback()
-            return False
+    def _product_listing_query(
+        self,
+        status_filter: Optional[str],
+        processing_status: Optional[str]
+    ):
+        """Build the listing query and the column it is ordered by"""
+        # Project raw and clean columns in one query instead of loading
+        # the clean product separately for every row
+        query = self.db.query(
+            RawProduct.id,
+            RawProduct.name,
+            RawProduct.description,
+            RawProduct.website,
+            RawProduct.logo,
+            RawProduct.processing_status,
+            RawProduct.created_at,
+            RawProduct.updated_at,
+            CleanProduct.id.label("clean_id"),
+            CleanProduct.description.label("clean_description"),
+            CleanProduct.category.label("clean_category"),
+            CleanProduct.status.label("clean_status")
+        ).outerjoin(CleanProduct, CleanProduct.raw_product_id == RawProduct.id)
+
+        # Apply filters
+        if status_filter:
+            query = query.filter(CleanProduct.status == status_filter)
+
+        if processing_status:
+            query = query.filter(
+                RawProduct.processing_status == processing_status)
+
+        # Order by the id covered by the (status, id) index being filtered on
+        sort_key = CleanProduct.id if status_filter else RawProduct.id
+        return query, sort_key
+
+    def _to_product_response(self, row) -> ProductResponse:
+        """Map a projected raw/clean product row to the response model"""
+        has_clean = row.clean_id is not None
+        return ProductResponse(
+            id=row.id,
+            name=row.name,
+            description=row.clean_description if has_clean else row.description,
+            website=row.website,
+            logo=row.logo,
+            category=row.clean_category if has_clean else None,
+            status=row.clean_status if has_clean else "pending",
+            processing_status=row.processing_status,
+            created_at=row.created_at,
+            updated_at=row.updated_at
+        )
+
+    def save_ai_results(self, ai_results: List[Dict[str, Any]]) -> List[int]:
+        """
+        Upsert clean products for AI results and mark their raw products completed
+        with set-based statements; the caller commits. Returns the raw ids saved
+        """
+        raw_ids = [result["product_id"]
+                   for result in ai_results if result.get("product_id")]
+        if not raw_ids:
+            return []
+
+        # A retried product replaces its earlier result unless it was already reviewed
+        stmt = sqlite_insert(CleanProduct)
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[CleanProduct.raw_product_id],
+            set_={
+                "description": stmt.excluded.description,
+                "category": stmt.excluded.category,
+                "updated_at": func.now()
+            },
+            where=CleanProduct.status == "pending"
+        ), [{
+            "raw_product_id": result["product_id"],
+            "description": result["description"],
+            "category": result["category"],
+            "status": "pending"
+        } for result in ai_results if result.get("product_id")])
+
+        self.set_processing_status(raw_ids, "completed")
+        return raw_ids
+
+    def set_processing_status(self, raw_ids: List[int], status: str) -> None:
+        """Set the processing status of many raw products; the caller commits"""
+        for chunk in in_chunks(raw_ids):
+            self.db.execute(
+                update(RawProduct)
+                .where(RawProduct.id.in_(chunk))
+                .values(processing_status=status),
+                execution_options={"synchronize_session": False}
+            )
 
-    def bulk_process_products_with_ai(self, raw_ids: List[int]) -> bool:
-        """Process multiple raw products with AI in batches"""
+    def bulk_process_products_with_ai(self, raw_ids: List[int], job_ids: Optional[Dict[int, int]] = None) -> Dict[str, Any]:
+        """
+        Process multiple raw products with AI in batches
+        With `job_ids` (raw id -> job id), each product's job is completed or
+        failed in the same transaction as its clean product and status
+        Returns: raw ids completed with an "ok" result, and the outcome of every other one
+        """
+        job_service = JobService(self.db)
+        persisted_ids = set()
         try:
             # Get raw products data
-            raw_products = self.db.query(RawProduct).filter(
-                RawProduct.id.in_(raw_ids)
-            ).all()
-
-            if not raw_products:
+            products_data = [{
+                "id": row.id,
+                "name": row.name,
+                "website": row.website,
+                "category": row.category,
+                "description": row.description
+            } for row in self.db.query(
+                RawProduct.id, RawProduct.name, RawProduct.website,
+                RawProduct.category, RawProduct.description
+            ).filter(RawProduct.id.in_(raw_ids))]
+
+            if not products_data:
                 logger.warning("No raw products found for AI processing")
-                return False
-
-            # Update status to processing
-            for raw_product in raw_products:
-                raw_product.processing_status = "processing"
-
-            self.db.commit()
+                return {"completed": [], "failed": {}}
 
-            # Prepare data for AI processing
-            products_data = []
-            for raw_product in raw_products:
-                products_data.append({
-                    "id": raw_product.id,
-                    "name": raw_product.name,
-                    "website": raw_product.website,
-                    "category": raw_product.category,
-                    "description": raw_product.description
-                })
+            # Update status to processing (claiming the jobs already did)
+            if not job_ids:
+                self.set_processing_status(
+                    [product["id"] for product in products_data], "processing")
+                self.db.commit()
 
             # Import AI service here to avoid circular imports
             from services.ai_service import AIService
             ai_service = AIService()
 
+            # With streaming, persist each result as soon as it streams in so it
+            # becomes reviewable without waiting for the rest of the response
+            def persist_result(result: Dict[str, Any]):
+                raw_id = result["product_id"]
+                try:
+                    self.save_ai_results([result])
+                    if job_ids:
+                        job_service.mark_done([job_ids[raw_id]])
+                    self.db.commit()
+                    persisted_ids.add(raw_id)
+                except Exception as e:
+                    logger.error(f"Error saving AI result for {raw_id}: {e}")
+                    self.db.rollback()
+
             # Process with AI
-            ai_results = ai_service.process_multiple_products(products_data)
-
-            if ai_results:
-                # Create clean products from AI results
-                if self.bulk_create_clean_products(ai_results):
-                    # Update raw product statuses to completed
-                    for raw_id in raw_ids:
-                        self.update_processing_status(raw_id, "completed")
-                    logger.info(
-                        f"Successfully processed {len(raw_ids)} products with AI")
-                    return True
-                else:
-                    # Update statuses to failed if clean product creation fails
-                    for raw_id in raw_ids:
-                        self.update_processing_status(raw_id, "failed")
-                    return False
-            else:
-                # Update statuses to failed if AI processing fails
-                for raw_id in raw_ids:
-                    self.update_processing_status(raw_id, "failed")
-                return False
+            ai_results = ai_service.process_multiple_products(
+                products_data,
+                on_result=persist_result if ai_service.ai_config["stream"] else None)
+
+            # Only usable results are persisted; the rest are left to be retried
+            failed = {result["product_id"]: result["outcome"] for result in ai_results
+                      if result["outcome"] != AIOutcome.OK.value}
+            remaining_results = [result for result in ai_results
+                                 if result["outcome"] == AIOutcome.OK.value
+                                 and result["product_id"] not in persisted_ids]
+
+            # Everything left, cache hits included, is written in one transaction
+            completed = self.save_ai_results(remaining_results)
+            if job_ids:
+                if completed:
+                    job_service.mark_done([job_ids[raw_id] for raw_id in completed])
+                failed_by_outcome: Dict[str, List[int]] = {}
+                for raw_id, outcome in failed.items():
+                    failed_by_outcome.setdefault(outcome, []).append(job_ids[raw_id])
+                for outcome, failed_job_ids in failed_by_outcome.items():
+                    job_service.mark_failed(failed_job_ids, outcome)
+            elif failed:
+                # Without jobs there is no backoff; the products are simply pending again
+                self.set_processing_status(list(failed), "pending")
+            self.db.commit()
+            completed.extend(persisted_ids)
+
+            if failed:
+                logger.warning(
+                    f"{len(failed)} of {len(raw_ids)} products need another AI attempt")
+            logger.info(
+                f"Successfully processed {len(completed)} products with AI")
+            return {"completed": completed, "failed": failed}
 
         except Exception as e:
             logger.error(f"Error processing products with AI: {e}")
-            # Reset status to pending on error
-            for raw_product in raw_products:
-                raw_product.processing_status = "pending"
-            self.db.commit()
-            return False
+            self.db.rollback()
+            # Reset status to pending on error, except for results already saved
+            unsaved = [raw_id for raw_id in raw_ids if raw_id not in persisted_ids]
+            if job_ids:
+                job_service.fail([job_ids[raw_id] for raw_id in unsaved], str(e))
+            else:
+                self.set_processing_status(unsaved, "pending")
+                self.db.commit()
+            raise Exception(f"Failed to process products with AI: {str(e)}")
 
     def get_stats(self) -> Dict[str, Any]:
         """Get processing statistics"""
         try:
-            # Raw products stats
-            total_raw = self.db.query(RawProduct).count()
-            pending_raw = self.db.query(RawProduct).filter(
-                RawProduct.processing_status == "pending").count()
-            processing_raw = self.db.query(RawProduct).filter(
-                RawProduct.processing_status == "processing").count()
-            completed_raw = self.db.query(RawProduct).filter(
-                RawProduct.processing_status == "completed").count()
-            failed_raw = self.db.query(RawProduct).filter(
-                RawProduct.processing_status == "failed").count()
-
-            # Clean products stats
-            total_clean = self.db.query(CleanProduct).count()
-            pending_review = self.db.query(CleanProduct).filter(
-                CleanProduct.status == "pending").count()
-            approved = self.db.query(CleanProduct).filter(
-                CleanProduct.status == "approved").count()
-            rejected = self.db.query(CleanProduct).filter(
-                CleanProduct.status == "rejected").count()
-
-            return {
-                "raw_products": {
-                    "total": total_raw,
-                    "pending": pending_raw,
-                    "processing": processing_raw,
-                    "completed": completed_raw,
-                    "failed": failed_raw
-                },
-                "clean_products": {
-                    "total": total_clean,
-                    "pending_review": pending_review,
-                    "approved": approved,
-                    "rejected": rejected
-                }
-            }
+            return self._build_stats(self.status_counts())
 
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             raise Exception(f"Failed to get stats: {str(e)}")
+
+    def reconcile_counters(self) -> Dict[str, Dict[str, int]]:
+        """Recompute product counters from scratch and return any drift"""
+        if not counter_triggers_installed(self.db.connection()):
+            raise ValueError(
+                "Product counter triggers are not installed; run cli.py install-counters")
+        try:
+            # DELETE ... RETURNING takes the write lock before the recount,
+            # so no concurrent write can land between reading and rewriting
+            stored = {
+                name: value for name, value in self.db.execute(
+                    delete(ProductCounter).returning(
+                        ProductCounter.name, ProductCounter.value))
+            }
+            for statement in counter_seed_sql():
+                self.db.execute(text(statement))
+            actual = {
+                name: value for name, value in self.db.query(
+                    ProductCounter.name, ProductCounter.value)
+            }
+            self.db.commit()
+
+            drift = {}
+            for name in sorted(set(stored) | set(actual)):
+                counter, count = stored.get(name, 0), actual.get(name, 0)
+                if counter != count:
+                    drift[name] = {"counter": counter, "actual": count}
+
+            if drift:
+                logger.warning(f"Product counters drifted: {drift}")
+            return drift
+
+        except Exception as e:
+            logger.error(f"Error reconciling counters: {e}")
+            self.db.rollback()
+            raise Exception(f"Failed to reconcile counters: {str(e)}")
+
+    def status_counts(self) -> Dict[str, int]:
+        """
+        Products per "<table>:<status>", from the counters when configured and
+        their triggers are installed, otherwise with a GROUP BY
+        """
+        if get_stats_config()["use_counters"]:
+            if counter_triggers_installed(self.db.connection()):
+                return self._read_counters()
+            logger.warning(
+                "STATS_USE_COUNTERS is set but the counter triggers are not installed "
+                "(cli.py install-counters); counting the product tables instead")
+        return self._aggregate_counts()
+
+    def _aggregate_counts(self) -> Dict[str, int]:
+        """Count products per status with one GROUP BY per table"""
+        counts = {}
+        for model, column in (
+            (RawProduct, RawProduct.processing_status),
+            (CleanProduct, CleanProduct.status)
+        ):
+            rows = self.db.query(column, func.count()).group_by(column).all()
+            for status, count in rows:
+                counts[f"{model.__tablename__}:{status or ''}"] = count
+        return counts
+
+    def _read_counters(self) -> Dict[str, int]:
+        """Read the trigger-maintained product counters"""
+        return {
+            name: value for name, value in self.db.query(
+                ProductCounter.name, ProductCounter.value)
+        }
+
+    def _build_stats(self, counts: Dict[str, int]) -> Dict[str, Any]:
+        """Shape per-status counts into the stats response"""
+        def total(table: str) -> int:
+            return sum(value for name, value in counts.items()
+                       if name.startswith(f"{table}:"))
+
+        return {
+            "raw_products": {
+                "total": total("raw_products"),
+                "pending": counts.get("raw_products:pending", 0),
+                "processing": counts.get("raw_products:processing", 0),
+                "completed": counts.get("raw_products:completed", 0),
+                "failed": counts.get("raw_products:failed", 0)
+            },
+            "clean_products": {
+                "total": total("clean_products"),
+                "pending_review": counts.get("clean_products:pending", 0),
+                "approved": counts.get("clean_products:approved", 0),
+                "rejected": counts.get("clean_products:rejected", 0)
+            }
+        }
@@ -0,0 +1,57 @@
+"""
+Batch prompt formats for AI product processing
+"""
+import json
+from typing import Dict, Any, List, Tuple
+
+from config.ai_config import get_processing_config
+
+# Version of the current prompt format; bump when the prompts change so
+# cached AI results of the old prompts are no longer reused
+PROMPT_VERSION = "v3"
+
+# Instructions sent once per request as the system message
+BATCH_SYSTEM_PROMPT = (
+    "You are a software categorization expert. For each product in the input, "
+    "write a professional description of EXACTLY 2 sentences - no more, no less - "
+    "that preserves important context, without truncation or ellipsis, and choose "
+    "its category from: sales_marketing, devtools, data_analytics, productivity, "
+    "finance, other. Use \"other\" if the product doesn't fit clearly into the first 5 categories.\n"
+    "Input: one JSON object per line with id, name, site, cat (raw category) and desc (raw description). "
+    "A line with a set field is already categorized: only write its description.\n"
+    "Respond with JSON: {\"products\": {\"<id>\": {\"description\": \"...\", \"category\": \"...\"}}} "
+    "with one entry for every input id; omit category for lines with set."
+)
+
+
+def compact_text(text: str, max_chars: int = None) -> str:
+    """Collapse whitespace and cap the length at a word boundary"""
+    text = " ".join((text or "").split())
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0]
+    return text
+
+
+def build_batch_prompt(products_data: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """
+    Build the compact user prompt for a batch.
+    Returns the prompt and the products keyed by the short ids used in it.
+    """
+    max_chars = get_processing_config()["max_description_chars"]
+    products_by_key = {}
+    lines = []
+    for index, product in enumerate(products_data, start=1):
+        key = f"p{index}"
+        products_by_key[key] = product
+        line = {
+            "id": key,
+            "name": compact_text(product.get("name")),
+            "site": compact_text(product.get("website")),
+            "cat": compact_text(product.get("category")),
+            "desc": compact_text(product.get("description"), max_chars)
+        }
+        # Categorized locally; the model only writes the description
+        if product.get("fixed_category"):
+            line["set"] = product["fixed_category"]
+        lines.append(json.dumps(line, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines), products_by_key
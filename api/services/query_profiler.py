@@ -0,0 +1,119 @@
+"""
+Per-request SQL profiling: every statement executed while a profile is
+active is counted and timed, and structurally identical statements repeated
+within one request are flagged as probable N+1 queries.
+"""
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.db_config import get_profiler_config
+
+# Profile of the request being served; copied into the threadpool that runs
+# sync endpoints, so statements from there land in the same profile
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar(
+    "query_profile", default=None)
+
+# Process-wide profiles (query_budget), for code running outside the request's context
+_captures: List["QueryProfile"] = []
+_captures_lock = threading.Lock()
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_ROWS = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement with literals and IN/VALUES list lengths collapsed, for grouping"""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("(?)", statement)
+    statement = _VALUES_ROWS.sub(r"\1", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryProfile:
+    """Statements executed while the profile was active, with their durations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.statements.append((statement, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    def slowest(self, limit: int) -> List[Tuple[str, float]]:
+        """The slowest statements, slowest first"""
+        return sorted(self.statements, key=lambda item: item[1], reverse=True)[:limit]
+
+    def repeated(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """Normalized statements executed at least threshold times (probable N+1)"""
+        if threshold is None:
+            threshold = get_profiler_config()["repeat_threshold"]
+        counts = Counter(normalize_statement(statement) for statement, _ in self.statements)
+        return {statement: count for statement, count in counts.most_common() if count >= threshold}
+
+
+def record_statement(statement: str, seconds: float) -> None:
+    """Add an executed statement to the active profiles, if any"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, seconds)
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.record(statement, seconds)
+
+
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    """Profile the statements executed in the current context"""
+    profile = QueryProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, allow_repeated: bool = False) -> Iterator[QueryProfile]:
+    """
+    Assert that the statements executed in this process while the block runs
+    stay within max_queries and, unless allow_repeated, contain no N+1 pattern.
+    Works from tests with FastAPI's TestClient, whose app runs in another thread:
+
+        with query_budget(3):
+            client.get("/products/")
+    """
+    profile = QueryProfile()
+    with _captures_lock:
+        _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        with _captures_lock:
+            _captures.remove(profile)
+
+    if profile.count > max_queries:
+        statements = "\n".join(f"  {statement}" for statement, _ in profile.statements)
+        raise AssertionError(
+            f"{profile.count} queries executed, budget is {max_queries}:\n{statements}")
+    repeated = profile.repeated()
+    if repeated and not allow_repeated:
+        patterns = "\n".join(f"  {count}x {statement}" for statement, count in repeated.items())
+        raise AssertionError(f"Probable N+1 queries:\n{patterns}")
@@ -0,0 +1,183 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+from loguru import logger
+
+from config.ai_config import get_rate_limit_config
+from services import metrics
+
+
+class RateLimitTimeout(Exception):
+    """Raised when capacity does not free up within the caller's timeout"""
+
+
+class TokenBucketLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every
+    thread and process that points at the same SQLite store file.
+    """
+
+    def __init__(self, store_path: str, requests_per_minute: int, tokens_per_minute: int):
+        self.store_path = store_path
+        self.limits = {
+            "requests": float(requests_per_minute),
+            "tokens": float(tokens_per_minute)
+        }
+        self._create_store()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Plain sqlite3 so each acquire can take the write lock up front with
+        # BEGIN IMMEDIATE; a connection per call keeps it thread safe
+        return sqlite3.connect(self.store_path, timeout=30, isolation_level=None)
+
+    def _create_store(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "name TEXT PRIMARY KEY, available REAL NOT NULL, updated_at REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _refill(self, conn: sqlite3.Connection, now: float) -> Dict[str, float]:
+        """Read both buckets and top them up for the time elapsed since the last update"""
+        rows = dict(
+            (name, (available, updated_at)) for name, available, updated_at in
+            conn.execute("SELECT name, available, updated_at FROM rate_limit_buckets"))
+
+        buckets = {}
+        for name, capacity in self.limits.items():
+            available, updated_at = rows.get(name, (capacity, now))
+            refill = (now - updated_at) * capacity / 60
+            buckets[name] = min(capacity, available + refill)
+        return buckets
+
+    def _store(self, conn: sqlite3.Connection, buckets: Dict[str, float], now: float):
+        conn.executemany(
+            "INSERT INTO rate_limit_buckets (name, available, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET available = excluded.available, updated_at = excluded.updated_at",
+            [(name, available, now) for name, available in buckets.items()])
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """
+        Take one request and `tokens` tokens if both buckets allow it.
+        Returns 0 on success, otherwise the seconds until enough capacity refills.
+        """
+        # A request larger than the whole minute budget can never fit; cap it
+        # so it waits for a full bucket instead of forever
+        needed = {"requests": 1.0, "tokens": min(float(tokens), self.limits["tokens"])}
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            buckets = self._refill(conn, now)
+
+            wait = 0.0
+            for name, amount in needed.items():
+                shortfall = amount - buckets[name]
+                if shortfall > 0:
+                    wait = max(wait, shortfall * 60 / self.limits[name])
+
+            if wait == 0:
+                for name, amount in needed.items():
+                    buckets[name] -= amount
+            self._store(conn, buckets, now)
+            conn.execute("COMMIT")
+            return wait
+
+        except Exception:
+            # BEGIN IMMEDIATE itself may have failed (e.g. "database is locked")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Block until capacity is available; returns the seconds spent waiting"""
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens)
+            waited = time.monotonic() - started
+            if wait == 0:
+                metrics.AI_RATE_LIMIT_WAIT.observe(waited)
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise RateLimitTimeout(
+                    f"Rate limit capacity not available within {timeout}s")
+            logger.info(f"Rate limit reached, waiting {wait:.1f} seconds")
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Await capacity without blocking the event loop"""
+        started = time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, tokens)
+            waited = time.monotonic() - started
+            if wait == 0:
+                metrics.AI_RATE_LIMIT_WAIT.observe(waited)
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise RateLimitTimeout(
+                    f"Rate limit capacity not available within {timeout}s")
+            await asyncio.sleep(wait)
+
+    def adjust_tokens(self, delta: int):
+        """Return over-estimated tokens (positive) or charge extra tokens (negative)"""
+        if not delta:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            buckets = self._refill(conn, now)
+            buckets["tokens"] = min(
+                self.limits["tokens"], buckets["tokens"] + delta)
+            self._store(conn, buckets, now)
+            conn.execute("COMMIT")
+        except Exception:
+            # BEGIN IMMEDIATE itself may have failed (e.g. "database is locked")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def saturation(self) -> Dict[str, Any]:
+        """Current fill level of each bucket"""
+        conn = self._connect()
+        try:
+            buckets = self._refill(conn, time.time())
+        finally:
+            conn.close()
+
+        return {
+            name: {
+                "limit_per_minute": self.limits[name],
+                "available": round(buckets[name], 2),
+                "saturation": round(1 - buckets[name] / self.limits[name], 4)
+            }
+            for name in self.limits
+        }
+
+
+_limiter: Optional[TokenBucketLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucketLimiter:
+    """Get the process-wide limiter backed by the shared store"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                config = get_rate_limit_config()
+                _limiter = TokenBucketLimiter(
+                    config["store_path"],
+                    config["max_requests_per_minute"],
+                    config["max_tokens_per_minute"]
+                )
+    return _limiter
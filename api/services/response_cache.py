@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
+
+from config.db_config import get_response_cache_config
+
+if TYPE_CHECKING:
+    from fastapi import Request, Response
+
+# Tables whose writes change the cached responses
+CACHED_TABLES = ("raw_products", "clean_products")
+
+
+class ResponseCache:
+    """
+    JSON responses of read endpoints, keyed by path and query string and
+    served until the product data version changes. The version combines an
+    in-process counter with the mtime of a shared file, so writes committed
+    by worker or CLI processes invalidate the cache as well. Every response
+    carries a strong ETag; a matching If-None-Match gets a 304 without
+    touching the database.
+    """
+
+    def __init__(self):
+        self.config = get_response_cache_config()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._local_version = 0
+
+    def bump_version(self) -> None:
+        """Invalidate cached responses here and, through the version file, in other processes"""
+        with self._lock:
+            self._local_version += 1
+        try:
+            with open(self.config["version_file"], "a"):
+                os.utime(self.config["version_file"])
+        except OSError:
+            pass
+
+    def version(self) -> Tuple[int, int]:
+        try:
+            file_version = os.stat(self.config["version_file"]).st_mtime_ns
+        except OSError:
+            file_version = 0
+        return file_version, self._local_version
+
+    def respond(self, request: "Request", build: Callable[[], Any]) -> "Response":
+        """Serve a read endpoint's response from the cache, building it on a miss"""
+        if not self.config["enabled"]:
+            return self._response(request, self._encode(build()))
+
+        key = request.url.path + "?" + "&".join(sorted(
+            f"{name}={value}" for name, value in request.query_params.multi_items()))
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+
+        if entry is None:
+            body = self._encode(build())
+            entry = (version, self._etag(body), body)
+            if len(body) <= self.config["max_bytes"]:
+                self._store(key, entry)
+
+        return self._response(request, entry[2], entry[1])
+
+    def _store(self, key: str, entry: Tuple[Tuple[int, int], str, bytes]) -> None:
+        """Cache an entry, evicting the least recently used ones beyond max_bytes"""
+        with self._lock:
+            replaced = self._entries.pop(key, None)
+            if replaced:
+                self._bytes -= len(replaced[2])
+            self._entries[key] = entry
+            self._bytes += len(entry[2])
+            while self._bytes > self.config["max_bytes"]:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[2])
+
+    @staticmethod
+    def _encode(content: Any) -> bytes:
+        # fastapi is imported here so worker processes, which only bump the
+        # version, do not load it
+        from fastapi.encoders import jsonable_encoder
+        return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+
+    @staticmethod
+    def _etag(body: bytes) -> str:
+        return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def _response(self, request: "Request", body: bytes, etag: Optional[str] = None) -> "Response":
+        from fastapi import Response
+        etag = etag or self._etag(body)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self._matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in (
+            tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
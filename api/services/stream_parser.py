@@ -0,0 +1,60 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class ProductStreamParser:
+    """
+    Incremental parser for streamed batch responses of the form
+    {"products": {"<id>": {...}, "<id>": {...}}}.
+    feed() yields each (id, product) pair as soon as its object is complete.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._keys: Dict[int, Optional[str]] = {}
+        self._item_key: Optional[str] = None
+
+    def feed(self, chunk: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for char in chunk:
+            if self._item_key is not None:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                else:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char == ":":
+                # The string just closed was the key of the value that follows
+                self._keys[self._depth] = self._last_string
+            elif char == "{":
+                self._depth += 1
+                # A product object opens inside the top-level "products" object
+                if self._depth == 3 and self._keys.get(1) == "products":
+                    self._item_key = self._keys.get(2)
+                    self._buffer = ["{"]
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 2 and self._item_key is not None:
+                    key, text = self._item_key, "".join(self._buffer)
+                    self._item_key = None
+                    self._buffer = []
+                    try:
+                        yield key, json.loads(text)
+                    except ValueError:
+                        continue
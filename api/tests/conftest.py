@@ -0,0 +1,204 @@
+"""
+Tests run against a scratch SQLite database in the production (WAL) profile,
+with the files the services share between processes kept out of the working
+tree. The environment is set before any application module is imported,
+since the configuration is read at import time.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="zoftware-tests-")
+os.environ["DATABASE_PROFILE"] = "production"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["RATE_LIMIT_STORE"] = os.path.join(_scratch, "ratelimit.db")
+os.environ["RESPONSE_CACHE_VERSION_FILE"] = os.path.join(_scratch, "response_cache.version")
+os.environ["CLASSIFIER_MODEL_PATH"] = os.path.join(_scratch, "category_model.json")
+os.environ["AI_BATCH_FILE_DIR"] = os.path.join(_scratch, "batch_files")
+os.environ["AI_WORKER_EMBEDDED"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from config.ai_config import OPENAI_CONFIG  # noqa: E402
+from database import Base, CleanProduct, RawProduct, SessionLocal, create_tables, engine  # noqa: E402
+from main import app  # noqa: E402
+from schemas.product import RawProduct as RawProductModel  # noqa: E402
+from services.rate_limiter import get_rate_limiter  # noqa: E402
+from services.response_cache import get_response_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def tables():
+    create_tables()
+    yield
+    engine.dispose()
+    shutil.rmtree(_scratch, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def full_rate_limits():
+    """Start every test with full rate limit buckets, as after an idle minute"""
+    conn = sqlite3.connect(get_rate_limiter().store_path)
+    try:
+        conn.execute("DELETE FROM rate_limit_buckets")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db():
+    """Write session; every table is emptied after the test"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """API client with the response cache off, so every request reaches the database"""
+    monkeypatch.setitem(get_response_cache().config, "enabled", False)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def add_raw_products(db):
+    """
+    Insert raw products by name and return their ids; fields override the
+    defaults. With session, rows are only flushed into that session's
+    open transaction
+    """
+    def add(names, session=None, **fields):
+        rows = [RawProduct(**{"name": name, "description": f"{name} software.",
+                              "website": f"https://{name}.example", "category": "Software",
+                              **fields})
+                for name in names]
+        target = session or db
+        target.add_all(rows)
+        target.flush()
+        if session is None:
+            db.commit()
+        return [row.id for row in rows]
+
+    return add
+
+
+@pytest.fixture
+def catalog(db, add_raw_products):
+    """120 raw products: 40 pending, 40 awaiting review and 40 approved"""
+    pending = add_raw_products([f"product-{index:03}" for index in range(40)])
+    processed = add_raw_products([f"product-{index:03}" for index in range(40, 120)],
+                                 processing_status="completed")
+    db.add_all([CleanProduct(raw_product_id=raw_id, description="Software. Really.", category="other",
+                             status="pending" if index < 40 else "approved")
+                for index, raw_id in enumerate(processed)])
+    db.commit()
+    return {"pending": pending, "processed": processed}
+
+
+@pytest.fixture
+def raw_product_payload():
+    """Ingest request body of one raw product"""
+    def payload(name, **fields):
+        return RawProductModel(**{"name": name, "description": f"{name} software.",
+                                  "website": f"https://{name}.example", **fields})
+
+    return payload
+
+
+def answer_every_product(messages):
+    """Response content describing every product of a batch prompt"""
+    lines = [json.loads(line) for line in messages[-1]["content"].splitlines()]
+    return json.dumps({"products": {
+        line["id"]: {"description": f"{line['name']} is software. It helps teams.",
+                     "category": "other"}
+        for line in lines
+    }})
+
+
+class FakeStream:
+    """Streamed chat completion that reports the products stored so far before each chunk"""
+
+    def __init__(self, content, size, truncated=False):
+        self.chunks = [content[start:start + size] for start in range(0, len(content), size)]
+        self.truncated = truncated
+        self.completed_before_chunk = []
+
+    def __iter__(self):
+        for index, text in enumerate(self.chunks):
+            self.completed_before_chunk.append(self._completed())
+            last = index == len(self.chunks) - 1
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(
+                    delta=SimpleNamespace(content=text),
+                    finish_reason=("length" if self.truncated else "stop") if last else None)],
+                usage=None)
+        self.completed_before_chunk.append(self._completed())
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(
+            prompt_tokens=100, completion_tokens=100, total_tokens=200))
+
+    @staticmethod
+    def _completed():
+        # Separate session: only committed results are visible
+        db = SessionLocal()
+        try:
+            return {name for name, in db.query(RawProduct.name)
+                    .filter(RawProduct.processing_status == "completed")}
+        finally:
+            db.close()
+
+
+class FakeOpenAI:
+    """
+    Chat completions client recording every request. Plain requests are
+    answered by respond_with (messages -> content, or an exception to raise),
+    by default describing every product; stream() switches to streaming
+    """
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.requests = []
+        self.respond_with = answer_every_product
+        self.finish_reason = "stop"
+        self._stream = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def stream(self, content, size, truncated=False):
+        self.monkeypatch.setitem(OPENAI_CONFIG, "stream", True)
+        self._stream = FakeStream(content, size, truncated)
+        return self._stream
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        if kwargs.get("stream"):
+            return self._stream
+        content = self.respond_with(kwargs["messages"])
+        if isinstance(content, Exception):
+            raise content
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                     finish_reason=self.finish_reason)],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=100, total_tokens=200))
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Route AI requests to a FakeOpenAI instead of the API"""
+    fake = FakeOpenAI(monkeypatch)
+    monkeypatch.setitem(OPENAI_CONFIG, "stream", False)
+    monkeypatch.setattr("services.ai_service.get_openai_client", lambda: fake)
+    return fake
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from database import AIResultCache as AIResultCacheModel
+from services.ai_cache import AIResultCache
+from services.prompts import PROMPT_VERSION
+
+
+def product(index, **fields):
+    return {"id": index, "name": f"product-{index}", "description": f"product-{index} software.",
+            "category": "Software", **fields}
+
+
+def result(index):
+    return {"product_id": index, "description": f"Product {index}. Cached.", "category": "other"}
+
+
+@pytest.fixture
+def cache(db):
+    return AIResultCache()
+
+
+def cached_keys(db):
+    return {key for key, in db.query(AIResultCacheModel.key)}
+
+
+def test_identical_listings_share_a_result(cache):
+    cache.put_many([product(1)], [result(1)])
+
+    # Whitespace and case do not change the content address
+    hits = cache.get_many([product(2, name="  PRODUCT-1 ", description="product-1   software."),
+                           product(3)])
+
+    assert hits == {2: {"description": "Product 1. Cached.", "category": "other"}}
+
+
+def test_results_of_another_model_are_not_reused(cache, monkeypatch):
+    cache.put_many([product(1)], [result(1)])
+
+    monkeypatch.setitem(cache.ai_config, "model", "another-model")
+
+    assert cache.get_many([product(1)]) == {}
+
+
+def test_expired_results_are_ignored_and_evicted(cache, db):
+    cache.put_many([product(1), product(2)], [result(1), result(2)])
+    expired = datetime.utcnow() - timedelta(seconds=cache.cache_config["ttl_seconds"] + 60)
+    db.execute(update(AIResultCacheModel)
+               .where(AIResultCacheModel.key == cache.key_for(product(1))).values(created_at=expired))
+    db.commit()
+
+    assert set(cache.get_many([product(1), product(2)])) == {2}
+
+    cache.put_many([product(3)], [result(3)])
+    assert cached_keys(db) == {cache.key_for(product(2)), cache.key_for(product(3))}
+
+
+def test_least_recently_used_results_are_evicted_beyond_max_entries(cache, db, monkeypatch):
+    monkeypatch.setitem(cache.cache_config, "max_entries", 2)
+    cache.put_many([product(1), product(2)], [result(1), result(2)])
+    # product-2 was stored last, but product-1 was looked up since
+    db.execute(update(AIResultCacheModel).values(last_used_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.commit()
+    cache.get_many([product(1)])
+
+    cache.put_many([product(3)], [result(3)])
+
+    assert cached_keys(db) == {cache.key_for(product(1)), cache.key_for(product(3))}
+
+
+def test_invalidate_deletes_one_prompt_version(cache, db):
+    cache.put_many([product(1), product(2)], [result(1), result(2)])
+    db.execute(update(AIResultCacheModel)
+               .where(AIResultCacheModel.key == cache.key_for(product(1))).values(prompt_version="v0"))
+    db.commit()
+
+    assert cache.invalidate("v0") == 1
+    assert cache.stats()["entries"] == {PROMPT_VERSION: 1}
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import event
+
+from database import AIJob, CleanProduct, RawProduct
+from services.ai_cache import AIResultCache
+from services.job_service import JobService
+from services.product_service import ProductService
+
+NAMES = [f"product-{index}" for index in range(10)]
+
+
+@pytest.fixture
+def commits(db):
+    """Commits of the test's write session"""
+    counted = []
+    event.listen(db, "after_commit", lambda session: counted.append(1))
+    return counted
+
+
+def cache_results(db, raw_ids):
+    """Cache a result for each raw product, as if an earlier identical listing was processed"""
+    rows = db.query(RawProduct.id, RawProduct.name, RawProduct.description, RawProduct.category) \
+        .filter(RawProduct.id.in_(raw_ids))
+    products = [{"id": raw_id, "name": name, "description": description, "category": category}
+                for raw_id, name, description, category in rows]
+    AIResultCache().put_many(products, [
+        {"product_id": product["id"], "description": "Cached. Twice.", "category": "finance"}
+        for product in products])
+
+
+def claim_all(db, raw_ids):
+    job_service = JobService(db)
+    job_service.enqueue(raw_ids)
+    db.commit()
+    return {job["raw_id"]: job["job_id"] for job in job_service.claim_batch("test", len(raw_ids))}
+
+
+def test_mixed_cached_and_requested_batch_is_written_in_one_commit(db, add_raw_products, fake_openai, commits):
+    raw_ids = add_raw_products(NAMES)
+    cache_results(db, raw_ids[:6])
+    job_ids = claim_all(db, raw_ids)
+    commits.clear()
+
+    result = ProductService(db).bulk_process_products_with_ai(raw_ids, job_ids)
+
+    assert sorted(result["completed"]) == sorted(raw_ids)
+    assert len(commits) == 1
+    # Only the uncached products were sent to the model
+    assert len(fake_openai.requests) == 1
+    assert len(fake_openai.requests[0]["messages"][-1]["content"].splitlines()) == 4
+    categories = dict(db.query(CleanProduct.raw_product_id, CleanProduct.category))
+    assert [categories[raw_id] for raw_id in raw_ids] == ["finance"] * 6 + ["other"] * 4
+    assert {status for status, in db.query(AIJob.status)} == {"done"}
+
+
+def test_batch_without_jobs_commits_the_claim_and_the_results(db, add_raw_products, fake_openai, commits):
+    raw_ids = add_raw_products(NAMES)
+    cache_results(db, raw_ids[:6])
+    commits.clear()
+
+    ProductService(db).bulk_process_products_with_ai(raw_ids)
+
+    assert len(commits) == 2
+    assert {status for status, in db.query(RawProduct.processing_status)} == {"completed"}
@@ -0,0 +1,141 @@
+import httpx
+import pytest
+from openai import RateLimitError
+
+from database import AIBatchingState
+from services import batch_controller
+from services.batch_controller import AdaptiveBatchController
+from services.product_service import ProductService
+
+from conftest import answer_every_product
+
+MAX_BATCH = 25
+MAX_CONCURRENCY = 8
+
+
+@pytest.fixture
+def controller(db, monkeypatch):
+    """A fresh controller at the default bounds, also used by the AI service"""
+    controller = AdaptiveBatchController()
+    monkeypatch.setitem(controller.config, "max_batch_size", MAX_BATCH)
+    monkeypatch.setattr(batch_controller, "_controller", controller)
+    return controller
+
+
+def stored(db):
+    state = db.query(AIBatchingState).populate_existing().one()
+    return state.batch_size, state.concurrency, state.last_decision
+
+
+def clean(controller, requests):
+    for _ in range(requests):
+        controller.record(products=10, latency=1.0)
+
+
+def test_starts_at_the_maximum_without_stored_state(controller, db):
+    assert (controller.batch_size(), controller.concurrency()) == (MAX_BATCH, MAX_CONCURRENCY)
+    assert db.query(AIBatchingState).count() == 0
+
+
+@pytest.mark.parametrize("failure, reason", [({"truncated": True}, "truncated response"),
+                                             ({"parse_failed": True}, "unparseable response")])
+def test_truncation_and_parse_failures_halve_the_batch(controller, db, failure, reason):
+    controller.record(products=MAX_BATCH, latency=1.0, **failure)
+    assert controller.batch_size() == 12
+
+    controller.record(products=12, latency=1.0, **failure)
+
+    assert stored(db) == (6, MAX_CONCURRENCY, f"{reason}: batch size 12 -> 6, concurrency 8 -> 8")
+
+
+def test_rate_limits_halve_concurrency_only(controller, db):
+    controller.record(products=MAX_BATCH, latency=0.0, rate_limited=True)
+
+    assert stored(db)[:2] == (MAX_BATCH, 4)
+    assert controller.concurrency() == 4
+
+
+@pytest.mark.parametrize("observation", [{"latency": 61.0}, {"latency": 1.0, "missing": 5}])
+def test_slow_or_incomplete_responses_shrink_the_batch_by_a_quarter(controller, db, observation):
+    controller.record(products=MAX_BATCH, **observation)
+
+    assert stored(db)[:2] == (19, MAX_CONCURRENCY)
+
+
+def test_failures_never_shrink_below_the_minimums(controller, db):
+    for _ in range(10):
+        controller.record(products=2, latency=1.0, truncated=True)
+        controller.record(products=2, latency=0.0, rate_limited=True)
+
+    assert stored(db)[:2] == (2, 1)
+
+
+def test_clean_requests_grow_batch_and_concurrency_back(controller, db):
+    controller.record(products=MAX_BATCH, latency=1.0, truncated=True)
+    controller.record(products=12, latency=0.0, rate_limited=True)
+
+    clean(controller, 4)
+    assert stored(db)[:2] == (12, 4)
+    clean(controller, 1)
+    assert stored(db) == (14, 5, "clean requests: batch size 12 -> 14, concurrency 4 -> 5")
+
+    clean(controller, 30)
+    assert stored(db)[:2] == (MAX_BATCH, MAX_CONCURRENCY)
+
+
+def test_limit_concurrency_caps_at_the_worker_threads(controller, db):
+    controller.limit_concurrency(3)
+    assert (controller.concurrency(), stored(db)[1]) == (3, 3)
+
+    clean(controller, 5)
+    assert controller.concurrency() == 3
+    # Raising the limit does not raise the current concurrency by itself
+    controller.limit_concurrency(20)
+    assert controller.max_concurrency == MAX_CONCURRENCY and controller.concurrency() == 3
+    controller.limit_concurrency(0)
+    assert controller.concurrency() == 1
+
+
+def test_processes_work_from_the_stored_decision(controller, db, monkeypatch):
+    other = AdaptiveBatchController()
+    monkeypatch.setattr(AdaptiveBatchController, "REFRESH_SECONDS", 0)
+
+    controller.record(products=MAX_BATCH, latency=1.0, truncated=True)
+    assert other.batch_size() == 12
+
+    other.record(products=12, latency=1.0, truncated=True)
+    assert (controller.batch_size(), stored(db)[0]) == (6, 6)
+
+
+def test_disabled_controller_keeps_the_maximum(controller, db, monkeypatch):
+    monkeypatch.setitem(controller.config, "enabled", False)
+
+    controller.record(products=MAX_BATCH, latency=1.0, truncated=True)
+
+    assert controller.batch_size() == MAX_BATCH
+    assert db.query(AIBatchingState).count() == 0
+
+
+def test_ai_requests_feed_the_controller(controller, db, add_raw_products, fake_openai, monkeypatch):
+    names = (f"product-{index}" for index in range(100))
+    # Three requests, which fit in one minute of the configured rate limit
+    monkeypatch.setitem(controller.config, "grow_after_requests", 1)
+
+    def process():
+        # New products every time, so no result comes from the AI cache
+        ProductService(db).bulk_process_products_with_ai(add_raw_products([next(names) for _ in range(4)]))
+
+    fake_openai.finish_reason = "length"
+    process()
+    assert stored(db)[:2] == (12, MAX_CONCURRENCY)
+
+    fake_openai.finish_reason = "stop"
+    fake_openai.respond_with = lambda messages: RateLimitError(
+        "Rate limit reached", body=None,
+        response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1")))
+    process()
+    assert stored(db)[:2] == (12, 4)
+
+    fake_openai.respond_with = answer_every_product
+    process()
+    assert stored(db)[:2] == (14, 5)
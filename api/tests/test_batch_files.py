@@ -0,0 +1,165 @@
+import json
+
+import pytest
+from sqlalchemy import update
+
+from config.ai_config import BATCH_CONFIG
+from database import AIBatchFile, AIBatchItem, AIJob, CleanProduct, RawProduct
+from services.ai_cache import AIResultCache
+from services.batch_file_service import BatchFileService
+from services.job_service import JobService
+
+from conftest import answer_every_product
+
+NAMES = [f"product-{index}" for index in range(6)]
+
+
+@pytest.fixture
+def queued(db, add_raw_products):
+    raw_ids = add_raw_products(NAMES)
+    JobService(db).enqueue(raw_ids)
+    db.commit()
+    return raw_ids
+
+
+def read_jsonl(path):
+    with open(path) as jsonl:
+        return [json.loads(line) for line in jsonl if line.strip()]
+
+
+def response_line(request, content=None, status_code=200):
+    """Batch output line answering an input line, by default describing every product"""
+    return {
+        "custom_id": request["custom_id"],
+        "response": {"status_code": status_code, "body": {"choices": [{
+            "message": {"content": content or answer_every_product(request["body"]["messages"])},
+            "finish_reason": "stop"}]}}
+    }
+
+
+def write_output(tmp_path, lines):
+    path = tmp_path / "output.jsonl"
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return str(path)
+
+
+def statuses(db, model, column, raw_ids):
+    return {raw_id: status for raw_id, status in db.query(model.raw_product_id, column)
+            .filter(model.raw_product_id.in_(raw_ids)).populate_existing()}
+
+
+def test_export_then_import_completes_every_product(db, queued, tmp_path):
+    exported = BatchFileService(db).export()
+
+    requests = read_jsonl(exported["input_path"])
+    assert exported["products"] == len(NAMES) and exported["requests"] == len(requests)
+    assert {request["url"] for request in requests} == {"/v1/chat/completions"}
+    # Exported jobs stay leased to the file
+    owner = BatchFileService.owner_for(exported["batch_file_id"])
+    assert {owner} == {lease_owner for lease_owner, in db.query(AIJob.lease_owner)}
+
+    imported = BatchFileService(db).import_results(
+        write_output(tmp_path, [response_line(request) for request in requests]))
+
+    assert imported == {"batch_file_id": exported["batch_file_id"], "applied": len(NAMES), "failed": 0}
+    assert set(statuses(db, AIJob, AIJob.status, queued).values()) == {"done"}
+    assert set(statuses(db, AIBatchItem, AIBatchItem.status, queued).values()) == {"applied"}
+    assert {status for status, in db.query(RawProduct.processing_status)} == {"completed"}
+    assert db.query(CleanProduct).count() == len(NAMES)
+    assert db.query(AIBatchFile.status).scalar() == "imported"
+    # Imported results are cached for identical listings
+    assert len(AIResultCache().get_many(
+        [{"id": raw_id, "name": name, "description": f"{name} software.", "category": "Software"}
+         for raw_id, name in zip(queued, NAMES)])) == len(NAMES)
+
+
+def test_export_with_nothing_queued_creates_no_file(db):
+    assert BatchFileService(db).export() is None
+    assert db.query(AIBatchFile).count() == 0
+
+
+def test_products_whose_lease_was_lost_are_left_to_the_worker(db, queued, tmp_path):
+    exported = BatchFileService(db).export()
+    requests = read_jsonl(exported["input_path"])
+    # The file's lease on one job expired and a worker reclaimed it
+    db.execute(update(AIJob).where(AIJob.raw_product_id == queued[0]).values(lease_owner="worker:1"))
+    db.commit()
+
+    imported = BatchFileService(db).import_results(
+        write_output(tmp_path, [response_line(request) for request in requests]))
+
+    assert (imported["applied"], imported["failed"]) == (len(NAMES) - 1, 0)
+    assert statuses(db, AIBatchItem, AIBatchItem.status, [queued[0]]) == {queued[0]: "failed"}
+    job = db.query(AIJob).filter(AIJob.raw_product_id == queued[0]).one()
+    assert (job.status, job.lease_owner) == ("leased", "worker:1")
+    assert db.query(CleanProduct).filter(CleanProduct.raw_product_id == queued[0]).count() == 0
+
+
+@pytest.mark.parametrize("unusable", [
+    lambda request: None,
+    lambda request: {"custom_id": request["custom_id"], "error": {"message": "server error"}},
+    lambda request: response_line(request, status_code=500),
+    lambda request: response_line(request, content="{not json")
+])
+def test_unusable_response_lines_requeue_their_products(db, queued, tmp_path, monkeypatch, unusable):
+    # One request per product, so each line covers one product
+    monkeypatch.setitem(BATCH_CONFIG, "max_products_per_request", 1)
+    exported = BatchFileService(db).export()
+    requests = read_jsonl(exported["input_path"])
+    lines = [unusable(requests[0])] + [response_line(request) for request in requests[1:]]
+
+    imported = BatchFileService(db).import_results(
+        write_output(tmp_path, [line for line in lines if line]), exported["batch_file_id"])
+
+    assert (imported["applied"], imported["failed"]) == (len(NAMES) - 1, 1)
+    failed_id = db.query(AIBatchItem.raw_product_id).filter(AIBatchItem.status == "failed").scalar()
+    job = db.query(AIJob).filter(AIJob.raw_product_id == failed_id).one()
+    assert job.status == "queued" and job.last_error.startswith("placeholder: batch response")
+    assert statuses(db, AIJob, AIJob.status, [failed_id]) == {failed_id: "queued"}
+    assert db.query(RawProduct.processing_status).filter(RawProduct.id == failed_id).scalar() == "pending"
+
+
+def test_products_missing_from_a_response_are_requeued(db, queued, tmp_path):
+    exported = BatchFileService(db).export()
+    requests = read_jsonl(exported["input_path"])
+    content = json.loads(answer_every_product(requests[0]["body"]["messages"]))
+    dropped = sorted(content["products"])[0]
+    del content["products"][dropped]
+    lines = [response_line(requests[0], json.dumps(content))] + \
+        [response_line(request) for request in requests[1:]]
+
+    imported = BatchFileService(db).import_results(write_output(tmp_path, lines))
+
+    assert (imported["applied"], imported["failed"]) == (len(NAMES) - 1, 1)
+    assert db.query(AIJob.last_error).filter(AIJob.status == "queued").scalar().startswith(
+        "missing: not in batch response")
+
+
+def test_an_imported_file_is_not_imported_again(db, queued, tmp_path):
+    exported = BatchFileService(db).export()
+    output = write_output(tmp_path, [response_line(request)
+                                     for request in read_jsonl(exported["input_path"])])
+    BatchFileService(db).import_results(output)
+
+    with pytest.raises(ValueError, match="already imported"):
+        BatchFileService(db).import_results(output)
+    assert db.query(CleanProduct).count() == len(NAMES)
+
+
+def test_output_without_a_file_id_is_refused(db, tmp_path):
+    with pytest.raises(ValueError, match="pass its id"):
+        BatchFileService(db).import_results(write_output(tmp_path, [{"custom_id": "unknown"}]))
+
+
+def test_results_of_a_file_from_an_older_prompt_are_not_cached(db, queued, tmp_path):
+    exported = BatchFileService(db).export()
+    db.execute(update(AIBatchFile).values(prompt_version="v0"))
+    db.commit()
+
+    BatchFileService(db).import_results(write_output(
+        tmp_path, [response_line(request) for request in read_jsonl(exported["input_path"])]))
+
+    assert db.query(CleanProduct).count() == len(NAMES)
+    assert AIResultCache().get_many(
+        [{"id": raw_id, "name": name, "description": f"{name} software.", "category": "Software"}
+         for raw_id, name in zip(queued, NAMES)]) == {}
@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from config.ai_config import CLASSIFIER_CONFIG
+from database import CleanProduct
+from services import category_classifier
+from services.category_classifier import CategoryClassifier, get_classifier
+from services.product_service import ProductService
+
+SAMPLES = [
+    ({"name": "Ledgerly", "description": "Ledger reconciliation and month end close for finance teams."},
+     "finance"),
+    ({"name": "Closebook", "description": "Month end close and ledger reconciliation, automated."},
+     "finance"),
+    ({"name": "Shipyard", "description": "Container builds and deploy pipelines for engineering teams."},
+     "devtools"),
+    ({"name": "Dockhand", "description": "Deploy pipelines and container builds in one place."},
+     "devtools"),
+]
+
+
+@pytest.fixture
+def model_path(tmp_path, monkeypatch):
+    """An empty model path and no loaded classifier"""
+    path = tmp_path / "category_model.json"
+    monkeypatch.setitem(CLASSIFIER_CONFIG, "model_path", str(path))
+    monkeypatch.setattr(category_classifier, "_classifier", None)
+    return path
+
+
+@pytest.mark.parametrize("product, scores", [
+    ({"category": "CRM"}, {"sales_marketing": 3.0}),
+    ({"name": "Rapid Ledger"}, {}),
+    ({"description": "Runs your CI/CD and code review."}, {"devtools": 2.0}),
+    ({"name": "Payroll API", "description": "Payroll for startups."},
+     {"finance": 3.0, "devtools": 2.0}),
+])
+def test_keywords_match_whole_phrases_weighted_by_field(product, scores):
+    assert dict(CategoryClassifier().rule_scores(product)) == scores
+
+
+@pytest.mark.parametrize("product, category, confidence", [
+    ({"category": "Accounting"}, "finance", 1.0),
+    ({"description": "Sends every invoice."}, "finance", 1 / 3),
+    ({"category": "Accounting", "description": "An API for developers."}, "finance", 0.75),
+    ({"name": "Nothing relevant"}, None, 0.0),
+])
+def test_rule_confidence_needs_a_strong_uncontested_hit(product, category, confidence):
+    predicted, rule_confidence = CategoryClassifier().predict_rules(product)
+
+    assert predicted == category
+    assert rule_confidence == pytest.approx(confidence)
+
+
+def test_trained_model_predicts_from_similar_products():
+    classifier = CategoryClassifier.train(SAMPLES)
+
+    category, confidence = classifier.predict_model(
+        {"name": "Tally", "description": "Ledger reconciliation for small teams."})
+
+    assert category == "finance" and 0.5 < confidence <= 1.0
+    # Terms of a single sample are left out of the vocabulary
+    assert "ledgerly" not in classifier.idf and "ledger" in classifier.idf
+    assert classifier.predict_model({"name": "Unrelated words only"}) == (None, 0.0)
+
+
+@pytest.mark.parametrize("rules, model, expected", [
+    (("finance", 0.9), (None, 0.0), ("finance", 0.9)),
+    ((None, 0.0), ("devtools", 0.7), ("devtools", 0.7)),
+    (("finance", 0.6), ("finance", 0.8), ("finance", 0.8)),
+    (("finance", 0.9), ("devtools", 0.8), ("finance", 0.45)),
+    (("finance", 0.5), ("devtools", 0.8), ("devtools", 0.4)),
+])
+def test_predict_takes_the_surer_signal_and_halves_disagreement(monkeypatch, rules, model, expected):
+    classifier = CategoryClassifier()
+    monkeypatch.setattr(classifier, "predict_rules", lambda product: rules)
+    monkeypatch.setattr(classifier, "predict_model", lambda product: model)
+
+    assert classifier.predict({}) == expected
+
+
+def test_only_confident_predictions_are_used(monkeypatch):
+    classifier = CategoryClassifier()
+    monkeypatch.setitem(classifier.config, "confidence_threshold", 0.8)
+
+    assert classifier.confident_category({"category": "Accounting"}) == "finance"
+    assert classifier.confident_category({"description": "Sends every invoice."}) is None
+
+
+def test_shared_classifier_reloads_a_retrained_model(model_path):
+    assert get_classifier().centroids == {}
+
+    CategoryClassifier.train(SAMPLES).save(str(model_path))
+    assert set(get_classifier().centroids) == {"finance", "devtools"}
+    assert get_classifier() is get_classifier()
+
+    model_path.write_text(json.dumps({"idf": {}, "centroids": {"other": {}}}))
+    os.utime(model_path, (0, 1))
+    assert get_classifier().centroids == {"other": {}}
+
+
+def test_unreadable_model_falls_back_to_the_rules(model_path):
+    model_path.write_text("{not json")
+
+    classifier = get_classifier()
+
+    assert classifier.centroids == {}
+    assert classifier.confident_category({"category": "Accounting"}) == "finance"
+
+
+def test_confident_products_only_ask_the_model_for_a_description(db, add_raw_products, fake_openai, model_path):
+    raw_ids = add_raw_products(["booksmith"], category="Accounting") + add_raw_products(["mystery"])
+
+    ProductService(db).bulk_process_products_with_ai(raw_ids)
+
+    lines = [json.loads(line) for line in fake_openai.requests[0]["messages"][-1]["content"].splitlines()]
+    assert [line.get("set") for line in lines] == ["finance", None]
+    # The model answers "other" for every product, which the preset category overrides
+    assert dict(db.query(CleanProduct.raw_product_id, CleanProduct.category)) == \
+        {raw_ids[0]: "finance", raw_ids[1]: "other"}
@@ -0,0 +1,108 @@
+import pytest
+
+from database import CategoryMapping, CleanProduct
+from services.ai_cache import AIResultCache
+from services.category_mapping import CategoryMappings
+
+MAPPED = "sales_marketing"
+
+
+@pytest.fixture
+def review(client, db, add_raw_products):
+    """Review one new product per name, categorized as category, from a site category"""
+    count = iter(range(1000))
+
+    def review(action, times, category=MAPPED, source="CRM"):
+        raw_ids = add_raw_products([f"{source}-{next(count)}" for _ in range(times)], category=source)
+        clean_products = [CleanProduct(raw_product_id=raw_id, description="CRM. Really.", category=category)
+                          for raw_id in raw_ids]
+        db.add_all(clean_products)
+        db.commit()
+        for clean_product in clean_products:
+            response = client.post(f"/products/review/{clean_product.id}",
+                                   json={"clean_product_id": clean_product.id, "action": action})
+            assert response.status_code == 200
+
+    return review
+
+
+def lookup(source="CRM"):
+    return CategoryMappings().lookup([{"id": 1, "category": source}]).get(1)
+
+
+def mapping(source="crm"):
+    return next(mapping for mapping in CategoryMappings().stats()["mappings"]
+                if mapping["source_category"] == source)
+
+
+def test_site_category_is_mapped_after_enough_approvals(review):
+    review("approve", 4)
+    assert lookup() is None
+
+    review("approve", 1)
+
+    assert lookup() == MAPPED
+    # Site categories are matched normalized
+    assert lookup("  crm ") == MAPPED
+    assert lookup("ERP") is None
+
+
+def test_disagreeing_approvals_keep_a_site_category_unmapped(review):
+    review("approve", 5)
+    review("approve", 1, category="devtools")
+
+    assert lookup() is None
+    assert (mapping()["approvals"], mapping()["disagreements"], mapping()["active"]) == (5, 1, False)
+
+
+def test_rejections_before_a_mapping_exists_are_not_counted(review):
+    review("reject", 3)
+    review("approve", 5)
+
+    assert lookup() == MAPPED
+    assert (mapping()["reviewed"], mapping()["rejections"]) == (0, 0)
+
+
+def test_rejected_mapped_products_retire_the_mapping(review):
+    review("approve", 5)
+    review("approve", 3)
+    review("reject", 1)
+    assert lookup() == MAPPED
+
+    review("reject", 1)
+
+    assert lookup() is None
+    stats = CategoryMappings().stats()
+    assert (stats["active_mappings"], stats["retired_mappings"]) == (0, 1)
+    assert mapping()["retired"] == [{"category": MAPPED, "reviewed": 5, "rejections": 2}]
+
+
+def test_retiring_a_mapping_drops_the_results_it_preset(review):
+    review("approve", 5)
+    products = [{"id": index, "name": f"cached-{index}", "description": "Cached.", "category": source}
+                for index, source in enumerate(["CRM", "CRM", "ERP"])]
+    AIResultCache().put_many(products, [
+        {"product_id": 0, "description": "Mapped. Twice.", "category": MAPPED},
+        {"product_id": 1, "description": "Not mapped. Twice.", "category": "devtools"},
+        {"product_id": 2, "description": "Other site. Twice.", "category": MAPPED}])
+
+    review("reject", 5)
+
+    assert lookup() is None
+    assert set(AIResultCache().get_many(products)) == {1, 2}
+
+
+def test_rebuild_recounts_approvals_and_can_reset_retirement(review, db):
+    review("approve", 5)
+    review("reject", 5)
+    db.query(CategoryMapping).update({"approvals": 0})
+    db.commit()
+
+    assert CategoryMappings().rebuild(db) == 1
+    db.commit()
+    # Review counts are kept, so the mapping stays retired
+    assert lookup() is None and mapping()["retired"]
+
+    CategoryMappings().rebuild(db, reset_reviews=True)
+    db.commit()
+    assert lookup() == MAPPED
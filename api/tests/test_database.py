@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from database import ReadSessionLocal, RawProduct, SessionLocal, db_config, engine, read_engine
+
+# Well under the profile's 5 s busy_timeout, which a blocked statement would wait out
+NOT_BLOCKED_SECONDS = 1.0
+
+
+def count_raw_products():
+    read_db = ReadSessionLocal()
+    try:
+        return read_db.query(func.count(RawProduct.id)).scalar()
+    finally:
+        read_db.close()
+
+
+def timed(call):
+    """Run call in another thread; (result, seconds), failing if it waits on a lock"""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        started = time.monotonic()
+        result = executor.submit(call).result(timeout=NOT_BLOCKED_SECONDS)
+        return result, time.monotonic() - started
+
+
+@pytest.mark.parametrize("bound", [engine, read_engine])
+def test_engines_run_in_wal_mode(bound):
+    with bound.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+def test_reader_is_not_blocked_by_an_open_write_transaction(db, add_raw_products):
+    add_raw_products(["committed"])
+
+    # A write larger than the page cache spills to the database file, which
+    # takes an exclusive lock under a rollback journal but not under WAL
+    db.execute(text("PRAGMA cache_size = 10"))
+    try:
+        add_raw_products([f"uncommitted-{index}" for index in range(2000)],
+                         session=db, description="Software. " * 50)
+
+        count, seconds = timed(count_raw_products)
+
+        # The reader sees the last committed snapshot without waiting for the writer
+        assert count == 1
+        assert seconds < NOT_BLOCKED_SECONDS
+        db.commit()
+    finally:
+        db.execute(text(f"PRAGMA cache_size = {db_config['pragmas']['cache_size']}"))
+        db.commit()
+    assert count_raw_products() == 2001
+
+
+def test_writer_commits_while_a_streaming_read_is_open(db, add_raw_products):
+    add_raw_products([f"before-{index}" for index in range(100)])
+
+    # A partly consumed cursor, like the catalog export's, holds a read lock
+    with read_engine.connect() as conn:
+        rows = conn.execution_options(yield_per=10).execute(select(RawProduct.id))
+        first = rows.fetchmany(10)
+
+        def write():
+            writer = SessionLocal()
+            try:
+                add_raw_products(["during"], session=writer)
+                writer.commit()
+            finally:
+                writer.close()
+
+        _, seconds = timed(write)
+
+        assert seconds < NOT_BLOCKED_SECONDS
+        # The open cursor keeps reading the snapshot it started from
+        assert len(first) + len(rows.fetchall()) == 100
+    assert count_raw_products() == 101
+
+
+def test_read_engine_rejects_writes(db, add_raw_products):
+    read_db = ReadSessionLocal()
+    try:
+        with pytest.raises(OperationalError, match="readonly"):
+            add_raw_products(["written-through-reader"], session=read_db)
+    finally:
+        read_db.rollback()
+        read_db.close()
+
+    assert count_raw_products() == 0
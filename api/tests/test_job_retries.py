@@ -0,0 +1,148 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from config.ai_config import WORKER_CONFIG
+from database import AIJob, RawProduct
+from services.job_service import JobService
+from services.product_service import ProductService
+
+RETRY_DELAY = WORKER_CONFIG["retry_delay_seconds"]
+MAX_ATTEMPTS = WORKER_CONFIG["max_attempts"]
+
+
+def make_due(db):
+    """Move every queued job's retry time to now"""
+    db.execute(update(AIJob).where(AIJob.status == "queued").values(available_at=datetime.utcnow()))
+    db.commit()
+
+
+def job_of(db, raw_id):
+    return db.query(AIJob).filter(AIJob.raw_product_id == raw_id).populate_existing().one()
+
+
+def raw_status(db, raw_id):
+    return db.query(RawProduct.processing_status).filter(RawProduct.id == raw_id).scalar()
+
+
+def seconds_until(moment):
+    return (moment - datetime.utcnow()).total_seconds()
+
+
+def claim_and_fail(db, raw_ids, error="missing"):
+    job_service = JobService(db)
+    claimed = job_service.claim_batch("test", len(raw_ids))
+    job_service.fail([job["job_id"] for job in claimed], error)
+    return claimed
+
+
+@pytest.fixture
+def queued(db, add_raw_products):
+    """Two raw products with queued jobs"""
+    raw_ids = add_raw_products(["alpha", "beta"])
+    JobService(db).enqueue(raw_ids)
+    db.commit()
+    return raw_ids
+
+
+@pytest.mark.parametrize("attempts, delay", [
+    (1, RETRY_DELAY), (2, RETRY_DELAY * 2), (3, RETRY_DELAY * 4),
+    (20, WORKER_CONFIG["max_retry_delay_seconds"])
+])
+def test_retry_delay_doubles_per_attempt_up_to_the_cap(db, attempts, delay):
+    assert JobService(db).retry_delay(attempts) == delay
+
+
+def test_claiming_counts_an_attempt(db, queued):
+    claimed = JobService(db).claim_batch("test", 10)
+
+    assert sorted(job["raw_id"] for job in claimed) == sorted(queued)
+    job = job_of(db, queued[0])
+    assert (job.status, job.attempts, job.lease_owner) == ("leased", 1, "test")
+    assert raw_status(db, queued[0]) == "processing"
+
+
+def test_failed_job_is_requeued_with_backoff(db, queued):
+    claim_and_fail(db, queued)
+
+    job = job_of(db, queued[0])
+    assert (job.status, job.attempts, job.last_error) == ("queued", 1, "missing")
+    assert seconds_until(job.available_at) == pytest.approx(RETRY_DELAY, abs=5)
+    assert raw_status(db, queued[0]) == "pending"
+    # Not claimable until the delay has passed
+    assert JobService(db).claim_batch("test", 10) == []
+
+    make_due(db)
+    claim_and_fail(db, queued)
+
+    job = job_of(db, queued[0])
+    assert job.attempts == 2
+    assert seconds_until(job.available_at) == pytest.approx(RETRY_DELAY * 2, abs=5)
+
+
+def test_job_is_dead_lettered_after_max_attempts(db, queued):
+    for _ in range(MAX_ATTEMPTS):
+        make_due(db)
+        assert len(claim_and_fail(db, queued, "placeholder")) == len(queued)
+
+    job = job_of(db, queued[0])
+    assert (job.status, job.attempts, job.last_error) == ("failed", MAX_ATTEMPTS, "placeholder")
+    assert {raw_status(db, raw_id) for raw_id in queued} == {"failed"}
+    make_due(db)
+    assert JobService(db).claim_batch("test", 10) == []
+
+
+def test_products_missing_from_the_response_fail_their_jobs(db, queued, fake_openai):
+    fake_openai.respond_with = lambda messages: json.dumps({"products": {}})
+    job_ids = {job["raw_id"]: job["job_id"] for job in JobService(db).claim_batch("test", 10)}
+
+    result = ProductService(db).bulk_process_products_with_ai(queued, job_ids)
+
+    assert result == {"completed": [], "failed": {raw_id: "missing" for raw_id in queued}}
+    job = job_of(db, queued[0])
+    assert (job.status, job.attempts, job.last_error) == ("queued", 1, "missing")
+    assert {raw_status(db, raw_id) for raw_id in queued} == {"pending"}
+
+
+def test_requeue_resets_dead_jobs_with_a_fresh_attempt_budget(client, db, queued):
+    for _ in range(MAX_ATTEMPTS):
+        make_due(db)
+        claim_and_fail(db, queued)
+
+    response = client.post("/products/requeue", params={"include_stuck": False})
+
+    assert response.status_code == 200
+    assert response.json() == {"failed": 2, "stuck": 0, "requeued": 2}
+    job = job_of(db, queued[0])
+    assert (job.status, job.attempts, job.last_error) == ("queued", 0, None)
+    assert {raw_status(db, raw_id) for raw_id in queued} == {"pending"}
+    assert len(JobService(db).claim_batch("test", 10)) == 2
+
+
+def test_requeue_only_takes_stuck_products_without_a_live_lease(client, db, add_raw_products):
+    leased, legacy = add_raw_products(["leased", "legacy"])
+    job_service = JobService(db)
+    job_service.enqueue([leased])
+    db.commit()
+    job_service.claim_batch("test", 10)
+    # Both rows have sat in processing for an hour; only one is still leased
+    db.execute(update(RawProduct).values(processing_status="processing",
+                                         updated_at=datetime.utcnow() - timedelta(hours=1)))
+    db.commit()
+
+    response = client.post("/products/requeue", params={"stuck_after_seconds": 60})
+
+    assert response.json() == {"failed": 0, "stuck": 1, "requeued": 1}
+    assert raw_status(db, legacy) == "pending"
+    # Rows from before the job queue get a job
+    assert job_of(db, legacy).status == "queued"
+    assert raw_status(db, leased) == "processing"
+
+
+@pytest.mark.parametrize("stuck_after_seconds", [0, -1])
+def test_requeue_rejects_a_non_positive_stuck_age(client, stuck_after_seconds):
+    response = client.post("/products/requeue", params={"stuck_after_seconds": stuck_after_seconds})
+
+    assert response.status_code == 422
@@ -0,0 +1,188 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from config.ai_config import WORKER_CONFIG
+from database import AIJob, RawProduct, SessionLocal
+from services.job_service import JobService
+
+
+def test_enqueue_skips_products_that_already_have_a_job(db, add_raw_products):
+    raw_ids = add_raw_products(["alpha", "beta", "gamma"])
+    JobService(db).enqueue(raw_ids[:1])
+
+    assert JobService(db).enqueue(raw_ids) == 2
+    db.commit()
+    assert sorted(raw_id for raw_id, in db.query(AIJob.raw_product_id)) == raw_ids
+
+
+def test_concurrent_backfills_queue_every_product_once(db, add_raw_products):
+    add_raw_products([f"product-{index}" for index in range(1200)])
+
+    def backfill(_):
+        session = SessionLocal()
+        try:
+            return JobService(session).backfill()
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        queued = list(executor.map(backfill, range(4)))
+
+    assert sum(queued) == 1200
+    assert db.query(AIJob).count() == 1200
+
+
+def expire_leases(db, **filters):
+    db.execute(update(AIJob).filter_by(status="leased", **filters)
+               .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+
+
+def jobs(db):
+    return {job.raw_product_id: job for job in db.query(AIJob).populate_existing()}
+
+
+@pytest.fixture
+def queued(db, add_raw_products):
+    """Five raw products with queued jobs"""
+    raw_ids = add_raw_products([f"product-{index}" for index in range(5)])
+    JobService(db).enqueue(raw_ids)
+    db.commit()
+    return raw_ids
+
+
+def test_claim_leases_the_oldest_jobs(db, queued):
+    claimed = JobService(db).claim_batch("worker:1", 3)
+
+    assert [job["raw_id"] for job in claimed] == queued[:3]
+    leased = jobs(db)
+    for raw_id in queued[:3]:
+        assert (leased[raw_id].status, leased[raw_id].lease_owner, leased[raw_id].attempts) == \
+            ("leased", "worker:1", 1)
+        assert (leased[raw_id].lease_expires_at - datetime.utcnow()).total_seconds() == \
+            pytest.approx(WORKER_CONFIG["lease_seconds"], abs=5)
+    assert {status for status, in db.query(RawProduct.processing_status)
+            .filter(RawProduct.id.in_(queued[:3]))} == {"processing"}
+    assert [job["raw_id"] for job in JobService(db).claim_batch("worker:2", 3)] == queued[3:]
+    assert JobService(db).claim_batch("worker:3", 3) == []
+
+
+def test_concurrent_claims_never_share_a_job(db, add_raw_products):
+    JobService(db).enqueue(add_raw_products([f"product-{index}" for index in range(40)]))
+    db.commit()
+
+    def claim(worker):
+        session = SessionLocal()
+        try:
+            return [job["job_id"] for job in JobService(session).claim_batch(f"worker:{worker}", 10)]
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        claimed = list(executor.map(claim, range(4)))
+
+    job_ids = [job_id for worker_jobs in claimed for job_id in worker_jobs]
+    assert len(job_ids) == len(set(job_ids)) == 40
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(db, queued):
+    JobService(db).claim_batch("worker:1", 2)
+    expire_leases(db, raw_product_id=queued[0])
+
+    claimed = JobService(db).claim_batch("worker:2", 5)
+
+    # The live lease on the second job is left alone
+    assert [job["raw_id"] for job in claimed] == [queued[0]] + queued[2:]
+    assert (jobs(db)[queued[0]].lease_owner, jobs(db)[queued[0]].attempts) == ("worker:2", 2)
+    assert jobs(db)[queued[1]].lease_owner == "worker:1"
+
+
+def test_heartbeat_extends_only_its_own_leases(db, queued):
+    JobService(db).claim_batch("worker-a:1", 1)
+    JobService(db).claim_batch("worker-b:1", 1)
+    expire_leases(db)
+
+    assert JobService(db).heartbeat("worker-a:") == 1
+
+    assert jobs(db)[queued[0]].lease_expires_at > datetime.utcnow()
+    assert jobs(db)[queued[1]].lease_expires_at < datetime.utcnow()
+    assert [job["raw_id"] for job in JobService(db).claim_batch("worker-c:1", 5)] == queued[1:]
+
+
+def test_completed_jobs_are_not_claimed_again(db, queued):
+    claimed = JobService(db).claim_batch("worker:1", 2)
+
+    JobService(db).complete([job["job_id"] for job in claimed])
+    expire_leases(db)
+
+    assert {jobs(db)[raw_id].status for raw_id in queued[:2]} == {"done"}
+    assert [job["raw_id"] for job in JobService(db).claim_batch("worker:2", 5)] == queued[2:]
+
+
+def test_lease_expiring_on_the_last_attempt_fails_the_job(db, queued):
+    db.execute(update(AIJob).values(attempts=WORKER_CONFIG["max_attempts"] - 1))
+    db.commit()
+    JobService(db).claim_batch("worker:1", 1)
+    expire_leases(db)
+
+    # Out of attempts, so another worker takes the next job instead
+    assert JobService(db).claim_batch("worker:2", 1)[0]["raw_id"] == queued[1]
+    assert JobService(db).fail_expired() == 1
+
+    assert jobs(db)[queued[0]].status == "failed"
+    assert db.query(RawProduct.processing_status).filter(RawProduct.id == queued[0]).scalar() == "failed"
+
+
+def test_backfill_only_queues_unfinished_products(db, add_raw_products):
+    pending = add_raw_products(["alpha", "beta"])
+    add_raw_products(["gamma"], processing_status="completed")
+    add_raw_products(["delta"], processing_status="failed")
+
+    assert JobService(db).backfill() == 2
+    assert sorted(raw_id for raw_id, in db.query(AIJob.raw_product_id)) == pending
+
+
+def make_available_in(db, seconds, **filters):
+    """Move the retry time of jobs by seconds from now"""
+    db.execute(update(AIJob).filter_by(**filters)
+               .values(available_at=datetime.utcnow() + timedelta(seconds=seconds)))
+    db.commit()
+
+
+def test_partial_batch_waits_for_more_jobs(db, queued):
+    assert JobService(db).claim_batch("worker:1", 10, max_wait_seconds=30) == []
+    assert {status for status, in db.query(AIJob.status)} == {"queued"}
+
+
+def test_partial_batch_is_claimed_once_its_oldest_job_has_waited(db, queued):
+    make_available_in(db, -31, raw_product_id=queued[0])
+
+    claimed = JobService(db).claim_batch("worker:1", 10, max_wait_seconds=30)
+
+    assert [job["raw_id"] for job in claimed] == queued
+
+
+def test_full_batch_is_claimed_without_waiting(db, queued):
+    claimed = JobService(db).claim_batch("worker:1", 4, max_wait_seconds=30)
+
+    assert [job["raw_id"] for job in claimed] == queued[:4]
+
+
+def test_jobs_backing_off_do_not_fill_a_batch(db, queued):
+    make_available_in(db, 60, raw_product_id=queued[0])
+
+    assert JobService(db).claim_batch("worker:1", 5, max_wait_seconds=30) == []
+    make_available_in(db, -60, raw_product_id=queued[0])
+    assert len(JobService(db).claim_batch("worker:1", 5, max_wait_seconds=30)) == 5
+
+
+def test_abandoned_lease_is_reclaimed_without_waiting(db, queued):
+    JobService(db).claim_batch("worker:1", 1)
+    expire_leases(db)
+
+    claimed = JobService(db).claim_batch("worker:2", 10, max_wait_seconds=30)
+
+    assert queued[0] in [job["raw_id"] for job in claimed]
@@ -0,0 +1,82 @@
+import urllib.request
+
+import pytest
+
+from services import metrics
+from services.ai_service import AIService
+
+
+def samples(text):
+    """Sample name with labels -> value, for every sample line of an exposition"""
+    parsed = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            parsed[name] = float(value)
+    return parsed
+
+
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return samples(response.text)
+
+
+@pytest.fixture
+def worker_metrics():
+    """A worker's metrics server on a free port; returns its /metrics URL"""
+    server = metrics.serve(0, "127.0.0.1")
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_requests_are_counted_and_timed_per_route_template(client, db, add_raw_products):
+    raw_id, = add_raw_products(["alpha"])
+    before = scrape(client)
+
+    for _ in range(3):
+        client.get("/products/pending", params={"limit": 5})
+    client.post("/products/review/999999", json={"approved": True})
+    client.get("/no-such-route")
+    after = scrape(client)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    pending = 'method="GET",route="/products/pending"'
+    assert delta(f'http_requests_total{{{pending},status="200"}}') == 3
+    assert delta(f"http_request_duration_seconds_count{{{pending}}}") == 3
+    assert delta(f'http_request_duration_seconds_bucket{{{pending},le="+Inf"}}') == 3
+    assert delta(f"http_request_duration_seconds_sum{{{pending}}}") > 0
+    # Path parameters are labelled by template, and unknown paths share one label
+    assert delta('http_request_duration_seconds_count{method="POST",route="/products/review/{clean_product_id}"}') == 1
+    assert delta('http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert delta('db_statements_total{engine="read",operation="SELECT"}') >= 3
+    assert after["http_requests_in_flight"] == 1
+    assert after['raw_products{processing_status="pending"}'] == 1
+
+
+def test_worker_serves_its_ai_metrics(worker_metrics, db, fake_openai):
+    before = samples(urllib.request.urlopen(worker_metrics).read().decode())
+
+    AIService().process_multiple_products([
+        {"id": 1, "name": "alpha", "website": "https://alpha.example",
+         "category": "Software", "description": "Alpha software."}])
+    with urllib.request.urlopen(worker_metrics) as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        after = samples(response.read().decode())
+
+    assert after['ai_requests_total{result="ok"}'] - before.get('ai_requests_total{result="ok"}', 0) == 1
+    assert after['ai_tokens_total{kind="completion"}'] - before.get('ai_tokens_total{kind="completion"}', 0) == 100
+    assert after["ai_request_duration_seconds_count"] - before.get("ai_request_duration_seconds_count", 0) == 1
+
+
+def test_worker_metrics_server_only_serves_metrics(worker_metrics):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(worker_metrics.replace("/metrics", "/health"))
+
+    assert error.value.code == 404
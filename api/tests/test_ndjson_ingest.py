@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from controllers.product_controller import ProductController
+from database import AIJob, RawProduct
+from services import ndjson_ingest
+from services.ndjson_ingest import iter_lines
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+@pytest.fixture
+def small_lines(monkeypatch):
+    """A 256 byte line limit"""
+    monkeypatch.setattr(ndjson_ingest, "MAX_LINE_BYTES", 256)
+    return 256
+
+
+def pieces(data, size):
+    """data as it might arrive from a client, size bytes at a time"""
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def lines_of(body_pieces):
+    async def body():
+        for piece in body_pieces:
+            yield piece
+
+    async def collect():
+        return [pair async for pair in iter_lines(body())]
+
+    return asyncio.run(collect())
+
+
+def ndjson(payloads):
+    return b"".join(payload.model_dump_json().encode() + b"\n" for payload in payloads)
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_lines_split_across_pieces_are_reassembled(size):
+    data = b'{"a": 1}\n\n{"b": 2}\r\n{"c": 3}'
+
+    assert lines_of(pieces(data, size)) == [(1, b'{"a": 1}'), (3, b'{"b": 2}\r'), (4, b'{"c": 3}')]
+
+
+@pytest.mark.parametrize("size", [1, 10, 1000])
+def test_oversized_lines_are_marked_wherever_they_end(small_lines, size):
+    data = b"short\n" + b"x" * (small_lines + 1) + b"\nafter\n" + b"y" * (small_lines * 3)
+
+    assert lines_of(pieces(data, size)) == [(1, b"short"), (2, None), (3, b"after"), (4, None)]
+
+
+def test_line_at_the_limit_is_kept(small_lines):
+    line = b"x" * small_lines
+
+    assert lines_of([line + b"\n", line]) == [(1, line), (2, line)]
+
+
+def test_ndjson_route_ingests_in_chunks(client, db, raw_product_payload):
+    body = ndjson(raw_product_payload(f"product-{index}") for index in range(5))
+
+    response = client.post("/products/ingest/ndjson", params={"chunk_size": 2},
+                           content=pieces(body, 50), headers=NDJSON)
+
+    assert response.status_code == 202
+    summary = response.json()
+    assert (summary["total_processed"], summary["created"], summary["invalid"]) == (5, 5, 0)
+    assert [chunk["created"] for chunk in summary["chunks"]] == [2, 2, 1]
+    assert db.query(AIJob).count() == 5
+
+
+def test_invalid_lines_are_reported_by_line_number(client, db, raw_product_payload, small_lines):
+    body = b"\n".join([
+        raw_product_payload("alpha").model_dump_json().encode(),
+        b"{not json",
+        b"",
+        b'{"name": "no description"}',
+        b'{"name": "' + b"x" * small_lines + b'"}',
+        raw_product_payload("alpha").model_dump_json().encode()
+    ])
+
+    response = client.post("/products/ingest/ndjson", content=body, headers=NDJSON)
+
+    summary = response.json()
+    assert (summary["created"], summary["skipped"], summary["invalid"]) == (1, 1, 3)
+    assert [error["line"] for error in summary["errors"]] == [2, 4, 5]
+    assert "longer than 256 bytes" in summary["errors"][2]["error"]
+    assert summary["chunks"] == [{"chunk": 1, "created": 1, "skipped": 1, "invalid": 3}]
+    assert db.query(RawProduct).count() == 1
+
+
+def test_failed_chunk_reports_what_was_committed(client, db, raw_product_payload, monkeypatch):
+    ingest = ProductController.bulk_ingest_products
+    calls = []
+
+    def fail_second_chunk(self, products):
+        calls.append(len(products))
+        if len(calls) == 2:
+            raise Exception("disk full")
+        return ingest(self, products)
+    monkeypatch.setattr(ProductController, "bulk_ingest_products", fail_second_chunk)
+
+    response = client.post("/products/ingest/ndjson", params={"chunk_size": 2}, headers=NDJSON,
+                           content=ndjson(raw_product_payload(f"product-{index}") for index in range(5)))
+
+    assert response.status_code == 500
+    assert "chunk 2 (2 products from earlier chunks are committed): disk full" in response.json()["detail"]
+    assert db.query(RawProduct).count() == 2
+
+
+def test_other_content_types_are_refused(client, raw_product_payload):
+    response = client.post("/products/ingest/ndjson", content=ndjson([raw_product_payload("alpha")]),
+                           headers={"content-type": "application/json"})
+
+    assert response.status_code == 415
@@ -0,0 +1,94 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from cli import live_packing_stats, packing_report
+from services.batch_packer import BatchPacker
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "products.jsonl")
+
+
+def product(index, description="Short."):
+    return {"id": index, "name": f"product-{index}", "website": f"https://product-{index}.example",
+            "category": "Software", "description": description}
+
+
+@pytest.fixture
+def packer(monkeypatch):
+    packer = BatchPacker()
+    monkeypatch.setitem(packer.batch_config, "max_products_per_request", 5)
+    return packer
+
+
+def test_short_products_are_closed_by_the_product_cap(packer):
+    packed = packer.pack_with_limits([product(index) for index in range(12)])
+
+    assert [(len(batch), limit) for batch, limit in packed] == [
+        (5, "max_products"), (5, "max_products"), (2, None)]
+    assert packer.pack([product(index) for index in range(12)]) == [batch for batch, _ in packed]
+
+
+def test_long_products_are_closed_by_a_token_budget(packer, monkeypatch):
+    monkeypatch.setitem(packer.batch_config, "max_input_tokens_per_request", 500)
+    monkeypatch.setitem(packer.batch_config, "max_output_tokens_per_request", 10000)
+    long_input = [product(index, "Word " * 600) for index in range(4)]
+
+    assert [limit for _, limit in packer.pack_with_limits(long_input)] == ["input_tokens"] * 3 + [None]
+
+    monkeypatch.setitem(packer.batch_config, "max_input_tokens_per_request", 100000)
+    monkeypatch.setitem(packer.batch_config, "max_output_tokens_per_request", 400)
+    assert {limit for _, limit in packer.pack_with_limits(long_input)} == {"output_tokens", None}
+
+
+def report(capsys, **args):
+    packing_report(SimpleNamespace(**{"fixture": FIXTURE, "limit": 200, "live": False, "requests": 10, **args}))
+    return json.loads(capsys.readouterr().out)
+
+
+def test_report_describes_how_the_corpus_packs(capsys):
+    with open(FIXTURE) as fixture:
+        products = [json.loads(line) for line in fixture]
+    packed = BatchPacker().pack_with_limits(products)
+
+    result = report(capsys)
+
+    assert result["products"] == len(products)
+    assert result["requests"] == len(packed)
+    assert result["products_per_request"]["max"] == max(len(batch) for batch, _ in packed)
+    assert sum(result["closed_by"].values()) == len(packed)
+    assert result["closed_by"]["end_of_input"] == 1
+    assert "live" not in result
+
+
+def test_live_report_counts_truncated_completions(capsys, fake_openai):
+    answers = iter(["length", "stop", "length"])
+
+    def respond(messages):
+        fake_openai.finish_reason = next(answers)
+        return "{}"
+
+    fake_openai.respond_with = respond
+
+    result = report(capsys, live=True, requests=2)
+
+    assert len(fake_openai.requests) == 2
+    assert result["live"]["requests"] == 2
+    assert result["live"]["length_finish_rate"] == 0.5
+
+
+def test_live_stats_shift_the_estimate_by_the_mean_error_and_cover_the_worst_request():
+    measured = [
+        {"products": 10, "estimated_output_tokens": 1000, "finish_reason": "stop", "completion_tokens": 800},
+        {"products": 10, "estimated_output_tokens": 1000, "finish_reason": "stop", "completion_tokens": 1000}
+    ]
+
+    stats = live_packing_stats(measured, {"output_tokens_per_product": 90})
+
+    assert stats["completion_tokens_per_product"] == 90
+    assert stats["completion_to_estimate"] == 0.9
+    # 10 tokens per product fewer than estimated on average
+    assert stats["suggested_output_tokens_per_product"] == 80
+    # The larger request used 1000 of the 900 now estimated: 1.11, rounded up
+    assert stats["suggested_output_safety_margin"] == 1.15
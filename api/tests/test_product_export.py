@@ -0,0 +1,118 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from schemas.product import ExportFormat
+from services import product_export
+from services.product_export import stream_products
+from services.product_service import EXPORT_FIELDS
+from services.query_profiler import query_budget
+
+
+def ndjson_rows(body):
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+def csv_rows(body):
+    return list(csv.DictReader(io.StringIO(body.decode(), newline="")))
+
+
+def test_ndjson_export_streams_every_product(client, catalog):
+    with query_budget(1):
+        response = client.get("/products/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="products-all.ndjson"'
+    rows = ndjson_rows(response.content)
+    assert len(rows) == 120 and all(list(row) == EXPORT_FIELDS for row in rows)
+    by_id = {row["id"]: row for row in rows}
+    pending = by_id[catalog["pending"][0]]
+    assert (pending["status"], pending["category"], pending["description"]) == \
+        ("pending", None, "product-000 software.")
+    approved = by_id[catalog["processed"][-1]]
+    assert (approved["status"], approved["category"], approved["description"]) == \
+        ("approved", "other", "Software. Really.")
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"status": "approved"}, 40),
+    ({"status": "pending"}, 40),
+    ({"processing_status": "pending"}, 40),
+    ({"processing_status": "completed"}, 80),
+    ({"status": "rejected"}, 0)
+])
+def test_export_filters(client, catalog, params, expected):
+    response = client.get("/products/export", params=params)
+
+    rows = ndjson_rows(response.content)
+    assert len(rows) == expected
+    for field, value in params.items():
+        assert {row["status" if field == "status" else field] for row in rows} <= {value}
+
+
+def test_csv_export_has_a_header_and_every_product(client, catalog):
+    response = client.get("/products/export", params={"format": "csv", "status": "pending"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="products-pending.csv"'
+    assert response.content.decode().splitlines()[0] == ",".join(EXPORT_FIELDS)
+    rows = csv_rows(response.content)
+    assert len(rows) == 40
+    # The review status filter only matches products with a clean product
+    assert {(row["status"], row["category"]) for row in rows} == {("pending", "other")}
+
+
+def test_non_ascii_and_multiline_values_round_trip(client, add_raw_products):
+    name = "café, \"quoted\"\nname"
+    add_raw_products([name])
+
+    ndjson = client.get("/products/export")
+    as_csv = client.get("/products/export", params={"format": "csv"})
+
+    assert "café".encode() in ndjson.content
+    assert [row["name"] for row in ndjson_rows(ndjson.content)] == [name]
+    assert [row["name"] for row in csv_rows(as_csv.content)] == [name]
+    assert csv_rows(as_csv.content)[0]["category"] == ""
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_gzip_export_is_compressed_on_the_wire(client, catalog, export_format):
+    plain = client.get("/products/export", params={"format": export_format}).content
+
+    with client.stream("GET", "/products/export",
+                       params={"format": export_format, "gzip": True}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        compressed = b"".join(response.iter_raw())
+
+    assert len(compressed) < len(plain)
+    assert gzip.decompress(compressed) == plain
+
+
+@pytest.mark.parametrize("export_format", [ExportFormat.NDJSON, ExportFormat.CSV])
+@pytest.mark.parametrize("compress", [False, True])
+def test_export_is_sent_in_bounded_chunks(catalog, monkeypatch, export_format, compress):
+    monkeypatch.setattr(product_export, "CHUNK_SIZE", 1024)
+
+    chunks = list(stream_products(export_format, compress=compress))
+
+    body = gzip.decompress(b"".join(chunks)) if compress else b"".join(chunks)
+    rows = ndjson_rows(body) if export_format == ExportFormat.NDJSON else csv_rows(body)
+    assert len(rows) == 120
+    if not compress:
+        # Each chunk closes on a row once it reaches CHUNK_SIZE
+        assert len(chunks) > 5
+        assert all(len(chunk) < 2048 for chunk in chunks)
+        assert all(chunk.endswith(b"\n") for chunk in chunks)
+
+
+def test_empty_export_is_empty_or_only_the_csv_header(db):
+    assert list(stream_products(ExportFormat.NDJSON)) == []
+    assert list(stream_products(ExportFormat.CSV)) == [",".join(EXPORT_FIELDS).encode() + b"\r\n"]
+
+
+def test_unknown_export_format_is_rejected(client):
+    assert client.get("/products/export", params={"format": "xml"}).status_code == 422
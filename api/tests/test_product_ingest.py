@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from database import AIJob, RawProduct, SessionLocal
+from routes import product_routes
+from services.product_service import ProductService
+
+
+def test_create_raw_product_queues_a_job(db, raw_product_payload):
+    result = ProductService(db).create_raw_product(raw_product_payload("alpha"))
+
+    assert result["message"] == "Product created successfully"
+    assert db.query(AIJob.raw_product_id).scalar() == result["raw_id"]
+
+
+def test_create_existing_raw_product_is_skipped(db, raw_product_payload):
+    created = ProductService(db).create_raw_product(raw_product_payload("alpha"))
+
+    result = ProductService(db).create_raw_product(raw_product_payload("alpha"))
+
+    assert result == {"message": "Product already exists", "raw_id": created["raw_id"]}
+    assert db.query(AIJob).count() == 1
+
+
+def test_concurrent_creates_of_one_name_all_succeed(db, raw_product_payload):
+    def create(_):
+        session = SessionLocal()
+        try:
+            return ProductService(session).create_raw_product(raw_product_payload("raced"))
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(create, range(8)))
+
+    raw_id = db.query(RawProduct.id).filter(RawProduct.name == "raced").scalar()
+    assert [result["message"] for result in results].count("Product created successfully") == 1
+    assert {result["raw_id"] for result in results} == {raw_id}
+    assert db.query(AIJob).count() == 1
+
+
+def test_bulk_ingest_route_creates_and_skips(client, db, raw_product_payload):
+    body = [raw_product_payload(name).model_dump() for name in ["alpha", "beta", "alpha"]]
+
+    response = client.post("/products/ingest/bulk", json=body)
+
+    assert response.status_code == 202
+    assert (response.json()["created"], response.json()["skipped"]) == (2, 1)
+    assert db.query(AIJob).count() == 2
+
+
+def test_bulk_ingest_body_is_parsed_off_the_event_loop(client, db, raw_product_payload, monkeypatch):
+    loop_running = []
+
+    def validate_json(body):
+        try:
+            asyncio.get_running_loop()
+            loop_running.append(True)
+        except RuntimeError:
+            loop_running.append(False)
+        return adapter.validate_json(body)
+
+    adapter = product_routes.RAW_PRODUCTS_ADAPTER
+    monkeypatch.setattr(product_routes, "RAW_PRODUCTS_ADAPTER", SimpleNamespace(validate_json=validate_json))
+
+    response = client.post("/products/ingest/bulk", json=[raw_product_payload("alpha").model_dump()])
+
+    assert response.status_code == 202
+    assert loop_running == [False]
+
+
+@pytest.mark.parametrize("path, body, loc", [
+    ("/products/ingest", {"name": "alpha", "description": "Alpha."}, ["body", "website"]),
+    ("/products/ingest/bulk", [{"name": "alpha", "description": "Alpha.", "website": "https://a.example"},
+                               {"name": "beta", "description": "Beta."}], ["body", 1, "website"]),
+    ("/products/ingest/bulk", {"name": "alpha"}, ["body"])
+])
+def test_invalid_ingest_bodies_are_rejected_like_declared_bodies(client, db, path, body, loc):
+    response = client.post(path, json=body)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == loc
+    assert db.query(RawProduct).count() == 0
+
+
+@pytest.mark.parametrize("path", ["/products/ingest", "/products/ingest/bulk"])
+def test_malformed_json_is_rejected(client, path):
+    response = client.post(path, content=b'[{"name": ', headers={"content-type": "application/json"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+
+def test_ingest_routes_document_their_request_bodies(client):
+    paths = client.get("/openapi.json").json()["paths"]
+
+    bulk = paths["/products/ingest/bulk"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    single = paths["/products/ingest"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert bulk["type"] == "array"
+    assert set(bulk["items"]["required"]) == set(single["required"]) == {"name", "description", "website"}
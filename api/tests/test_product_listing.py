@@ -0,0 +1,54 @@
+import pytest
+
+from services.query_profiler import query_budget
+
+# Listings are one joined SELECT, whatever the page size
+MAX_LISTING_QUERIES = 1
+
+# (path, filters, matching products in the catalog)
+LISTINGS = [
+    ("/products/", {}, 120),
+    ("/products/", {"processing_status": "pending"}, 40),
+    ("/products/", {"status_filter": "pending"}, 40),
+    ("/products/pending", {}, 40),
+    ("/products/approved", {}, 40)
+]
+
+
+@pytest.mark.parametrize("path, filters, total", LISTINGS)
+@pytest.mark.parametrize("paging", ["offset", "cursor"])
+def test_listing_runs_the_same_statements_for_any_page_size(client, catalog, path, filters, total, paging):
+    counts = {}
+    for limit in (1, 10, 100):
+        params = {**filters, "limit": limit}
+        if paging == "cursor":
+            params["cursor"] = ""
+        with query_budget(MAX_LISTING_QUERIES) as profile:
+            response = client.get(path, params=params)
+
+        assert response.status_code == 200
+        items = response.json()["items"] if paging == "cursor" else response.json()
+        assert len(items) == min(limit, total)
+        counts[limit] = profile.count
+
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_next_cursor_page_runs_the_same_statements(client, catalog):
+    with query_budget(MAX_LISTING_QUERIES) as first:
+        page = client.get("/products/pending", params={"limit": 25, "cursor": ""}).json()
+    with query_budget(MAX_LISTING_QUERIES) as second:
+        rest = client.get("/products/pending", params={"limit": 25, "cursor": page["next_cursor"]}).json()
+
+    assert len(page["items"]) == 25 and len(rest["items"]) == 15
+    assert rest["next_cursor"] is None
+    assert first.count == second.count
+
+
+@pytest.mark.parametrize("path", ["/products/", "/products/pending", "/products/approved"])
+@pytest.mark.parametrize("params", [
+    {"limit": 0}, {"limit": -1}, {"limit": 1001}, {"offset": -1},
+    {"limit": 0, "cursor": ""}, {"limit": -5, "cursor": ""}
+])
+def test_out_of_range_paging_is_rejected(client, catalog, path, params):
+    assert client.get(path, params=params).status_code == 422
@@ -0,0 +1,51 @@
+import json
+import sys
+from types import SimpleNamespace
+
+from benchmarks.legacy_prompt import build_legacy_batch_prompt
+from benchmarks.prompt_report import DEFAULT_FIXTURE, prompt_report, token_counter
+from services.batch_packer import estimate_tokens
+from services.prompts import build_batch_prompt
+
+
+def load_fixture():
+    with open(DEFAULT_FIXTURE) as fixture:
+        return [json.loads(line) for line in fixture]
+
+
+def test_current_prompt_is_smaller_than_the_legacy_one_on_the_fixture_corpus():
+    report = prompt_report(load_fixture(), estimate_tokens)
+
+    assert report["products"] == len(load_fixture())
+    assert report["current_tokens_per_product"] < report["legacy_tokens_per_product"]
+    assert report["reduction"] > 0.3
+
+
+def test_both_formats_carry_every_product():
+    products = load_fixture()[:3]
+
+    prompt, products_by_key = build_batch_prompt(products)
+    legacy = build_legacy_batch_prompt(products)
+
+    assert list(products_by_key.values()) == products
+    for product in products:
+        assert product["name"] in prompt and product["name"] in legacy
+
+
+def test_tokens_are_estimated_without_tiktoken(monkeypatch):
+    # A None entry makes the import fail
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+
+    name, count = token_counter("gpt-4o-mini")
+
+    assert (name, count) == ("chars/4", estimate_tokens)
+
+
+def test_tiktoken_counts_with_the_models_encoding(monkeypatch):
+    encoding = SimpleNamespace(name="o200k_base", encode=lambda text: text.split())
+    monkeypatch.setitem(sys.modules, "tiktoken", SimpleNamespace(encoding_for_model=lambda model: encoding))
+
+    name, count = token_counter("gpt-4o-mini")
+
+    assert name == "tiktoken:o200k_base"
+    assert count("three short words") == 3
@@ -0,0 +1,115 @@
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+from sqlalchemy import text
+
+from database import SessionLocal
+from main import app
+from middleware.query_profiler import QueryProfilerMiddleware
+from services.query_profiler import QueryProfile, normalize_statement, profile_queries, query_budget
+
+
+@pytest.fixture
+def profiled_client(client, monkeypatch):
+    """The API behind the profiler middleware, whatever SQL_PROFILER says"""
+    middleware = QueryProfilerMiddleware(app)
+    monkeypatch.setitem(middleware.config, "log_min_ms", 0)
+    with TestClient(middleware) as profiled:
+        yield profiled
+
+
+@pytest.fixture
+def logged():
+    messages = []
+    sink = logger.add(lambda message: messages.append(message.record["message"]), level="INFO")
+    yield messages
+    logger.remove(sink)
+
+
+def run(statements):
+    session = SessionLocal()
+    try:
+        for statement in statements:
+            session.execute(text(statement))
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("statement, normalized", [
+    ("SELECT * FROM t WHERE name = 'it''s' AND id = 42", "SELECT * FROM t WHERE name = ? AND id = ?"),
+    ("SELECT * FROM t WHERE id IN (?, ?, ?)", "SELECT * FROM t WHERE id IN (?)"),
+    ("SELECT * FROM t WHERE id IN ( ? )", "SELECT * FROM t WHERE id IN (?)"),
+    ("INSERT INTO t (id) VALUES (?), (?),\n  (?)", "INSERT INTO t (id) VALUES (?)"),
+    ("SELECT t1.id FROM t AS t1 LIMIT 10 OFFSET 2.5", "SELECT t1.id FROM t AS t1 LIMIT ? OFFSET ?"),
+    ("SELECT  *\n FROM   t ", "SELECT * FROM t"),
+])
+def test_normalize_statement_collapses_literals_and_list_lengths(statement, normalized):
+    assert normalize_statement(statement) == normalized
+
+
+def test_repeated_statements_are_grouped_after_normalizing():
+    profile = QueryProfile()
+    for raw_id in range(5):
+        profile.record(f"SELECT * FROM clean_products WHERE raw_product_id = {raw_id}", 0.001)
+    profile.record("SELECT count(*) FROM raw_products", 0.5)
+
+    assert profile.repeated(5) == {"SELECT * FROM clean_products WHERE raw_product_id = ?": 5}
+    assert profile.repeated(6) == {}
+    assert profile.count == 6 and profile.total_seconds == pytest.approx(0.505)
+    assert profile.slowest(1) == [("SELECT count(*) FROM raw_products", 0.5)]
+
+
+def test_profile_only_sees_statements_of_its_own_context(db):
+    run(["SELECT 1"])
+    with profile_queries() as outer:
+        run(["SELECT 2"])
+        with profile_queries() as inner:
+            run(["SELECT 3", "SELECT 4"])
+        run(["SELECT 5"])
+
+    assert [statement for statement, _ in outer.statements] == ["SELECT 2", "SELECT 5"]
+    assert [statement for statement, _ in inner.statements] == ["SELECT 3", "SELECT 4"]
+    assert all(seconds >= 0 for _, seconds in outer.statements)
+
+
+def test_query_budget_fails_over_budget_and_on_repeats(db):
+    with query_budget(2) as profile:
+        run(["SELECT 1", "SELECT 2"])
+    assert profile.count == 2
+
+    with pytest.raises(AssertionError, match="3 queries executed, budget is 2"):
+        with query_budget(2):
+            run(["SELECT 1", "SELECT 2", "SELECT 3"])
+    with pytest.raises(AssertionError, match="Probable N\\+1 queries:\n  5x SELECT \\?"):
+        with query_budget(10):
+            run([f"SELECT {value}" for value in range(5)])
+    with query_budget(10, allow_repeated=True):
+        run([f"SELECT {value}" for value in range(5)])
+
+
+def test_middleware_adds_query_headers(profiled_client, catalog, logged):
+    with query_budget(100) as profile:
+        response = profiled_client.get("/products/stats")
+
+    assert response.status_code == 200
+    assert int(response.headers["x-query-count"]) == profile.count > 0
+    assert float(response.headers["x-query-time"]) >= 0
+    assert any(message.startswith(f"GET /products/stats: {profile.count} queries in")
+               for message in logged)
+
+
+def test_middleware_warns_about_probable_n_plus_one(profiled_client, monkeypatch, logged):
+    monkeypatch.setattr(
+        "controllers.product_controller.ProductController.get_stats",
+        lambda self: {"counts": [self.db.execute(text(f"SELECT {value}")).scalar() for value in range(6)]})
+
+    response = profiled_client.get("/products/stats")
+
+    assert response.json() == {"counts": list(range(6))}
+    assert "GET /products/stats: probable N+1, 6x SELECT ?" in logged
+
+
+def test_requests_without_queries_report_zero(profiled_client):
+    response = profiled_client.get("/health")
+
+    assert response.headers["x-query-count"] == "0"
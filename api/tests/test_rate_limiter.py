@@ -0,0 +1,153 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import RateLimitTimeout, TokenBucketLimiter
+
+RPM = 60
+TPM = 600
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping advances the clock instead of waiting"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "ratelimit.db")
+
+
+@pytest.fixture
+def limiter(store, clock):
+    return TokenBucketLimiter(store, RPM, TPM)
+
+
+def drain(limiter, requests):
+    return [limiter.try_acquire() for _ in range(requests)]
+
+
+def test_full_buckets_allow_a_minute_of_requests(limiter):
+    assert drain(limiter, RPM) == [0] * RPM
+    # One request refills every 60 / RPM seconds
+    assert limiter.try_acquire() == pytest.approx(60 / RPM)
+
+
+def test_token_shortfall_sets_the_wait(limiter):
+    assert limiter.try_acquire(TPM - 100) == 0
+
+    assert limiter.try_acquire(160) == pytest.approx(60 * 60 / TPM)
+    # A refused request takes nothing
+    assert limiter.saturation()["tokens"]["available"] == pytest.approx(100)
+
+
+def test_buckets_refill_with_elapsed_time(limiter, clock):
+    drain(limiter, RPM)
+
+    clock.now += 30
+
+    assert limiter.saturation()["requests"]["available"] == pytest.approx(RPM / 2)
+    assert drain(limiter, RPM // 2) == [0] * (RPM // 2)
+    assert limiter.try_acquire() > 0
+    # Never beyond capacity, however long it was idle
+    clock.now += 3600
+    assert limiter.saturation()["requests"]["available"] == RPM
+
+
+def test_request_larger_than_the_budget_waits_for_a_full_bucket(limiter):
+    assert limiter.try_acquire(TPM * 10) == 0
+    assert limiter.try_acquire(TPM * 10) == pytest.approx(60)
+
+
+def test_acquire_blocks_until_capacity_refills(limiter, clock):
+    drain(limiter, RPM)
+
+    waited = limiter.acquire()
+
+    assert waited == pytest.approx(60 / RPM)
+    assert clock.slept == [pytest.approx(60 / RPM)]
+
+
+def test_acquire_gives_up_after_its_timeout(limiter, clock):
+    drain(limiter, RPM)
+
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0.5)
+    assert clock.slept == []
+
+
+def test_adjust_tokens_returns_and_charges_tokens(limiter):
+    limiter.try_acquire(500)
+
+    limiter.adjust_tokens(300)
+    assert limiter.saturation()["tokens"]["available"] == pytest.approx(400)
+    limiter.adjust_tokens(-350)
+    assert limiter.saturation()["tokens"]["available"] == pytest.approx(50)
+    limiter.adjust_tokens(10_000)
+    assert limiter.saturation()["tokens"]["available"] == TPM
+
+
+def test_limiters_on_one_store_share_the_budget(store, clock):
+    api, worker = TokenBucketLimiter(store, RPM, TPM), TokenBucketLimiter(store, RPM, TPM)
+
+    drain(api, RPM // 2)
+    drain(worker, RPM // 2)
+
+    assert api.try_acquire() > 0
+    assert worker.try_acquire() > 0
+
+
+def test_concurrent_acquires_never_overspend(store, clock):
+    limiters = [TokenBucketLimiter(store, RPM, TPM) for _ in range(2)]
+    barrier = threading.Barrier(8)
+
+    def attempt(index):
+        barrier.wait()
+        return sum(limiters[index % 2].try_acquire() == 0 for _ in range(20))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        granted = sum(executor.map(attempt, range(8)))
+
+    # 160 attempts against a 60 request budget, with the clock standing still
+    assert granted == RPM
+
+
+@pytest.mark.parametrize("call", [lambda limiter: limiter.try_acquire(),
+                                  lambda limiter: limiter.adjust_tokens(10)])
+def test_lock_timeout_is_raised_as_is(limiter, store, monkeypatch, call):
+    monkeypatch.setattr(limiter, "_connect",
+                        lambda: sqlite3.connect(store, timeout=0.1, isolation_level=None))
+    holder = sqlite3.connect(store, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        # BEGIN IMMEDIATE fails, so there is no transaction to roll back
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            call(limiter)
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+    assert limiter.try_acquire() == 0
@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import CleanProduct
+from main import app
+from services import response_cache
+from services.query_profiler import query_budget
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh, enabled response cache for the process"""
+    cache = response_cache.ResponseCache()
+    cache.config["enabled"] = True
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def cached_client(cache):
+    with TestClient(app) as client:
+        yield client
+
+
+def pending_total(client):
+    return client.get("/products/stats").json()["raw_products"]["pending"]
+
+
+def test_repeated_request_is_served_without_queries(cached_client, catalog):
+    first = cached_client.get("/products/pending", params={"limit": 10})
+
+    with query_budget(0):
+        second = cached_client.get("/products/pending", params={"limit": 10})
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.parametrize("if_none_match", ['{etag}', 'W/{etag}', '"other", {etag}', "*"])
+def test_matching_etag_gets_a_304(cached_client, catalog, if_none_match):
+    etag = cached_client.get("/products/stats").headers["etag"]
+
+    with query_budget(0):
+        response = cached_client.get(
+            "/products/stats", headers={"If-None-Match": if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_stale_etag_gets_the_new_body(cached_client, catalog, raw_product_payload):
+    etag = cached_client.get("/products/stats").headers["etag"]
+    cached_client.post("/products/ingest", json=raw_product_payload("new").model_dump())
+
+    response = cached_client.get("/products/stats", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_ingest_invalidates_cached_responses(cached_client, catalog, raw_product_payload):
+    before = pending_total(cached_client)
+
+    cached_client.post("/products/ingest/bulk", json=[
+        raw_product_payload(name).model_dump() for name in ("new-1", "new-2")])
+
+    assert pending_total(cached_client) == before + 2
+
+
+def test_review_invalidates_cached_responses(cached_client, db, catalog):
+    listing = cached_client.get("/products/approved", params={"limit": 1000}).json()
+    clean_id = db.query(CleanProduct.id).filter(CleanProduct.status == "pending").first()[0]
+
+    response = cached_client.post(f"/products/review/{clean_id}",
+                                  json={"clean_product_id": clean_id, "action": "approve"})
+
+    assert response.status_code == 200
+    assert len(cached_client.get("/products/approved", params={"limit": 1000}).json()) == len(listing) + 1
+
+
+def test_write_committed_by_another_process_invalidates_the_cache(cached_client, catalog):
+    before = pending_total(cached_client)
+
+    # Same scratch database and version file, which the conftest environment points at
+    subprocess.run([sys.executable, "-c", (
+        "from database import SessionLocal\n"
+        "from schemas.product import RawProduct\n"
+        "from services.product_service import ProductService\n"
+        "db = SessionLocal()\n"
+        "ProductService(db).create_raw_product(RawProduct(name='from-worker', "
+        "description='Worker.', website='https://worker.example'))\n"
+        "db.close()\n"
+    )], cwd=API_DIR, env=os.environ.copy(), check=True, capture_output=True)
+
+    assert pending_total(cached_client) == before + 1
+
+
+def test_cache_is_capped_by_total_body_size(cached_client, catalog, monkeypatch):
+    sizes = {limit: len(cached_client.get("/products/", params={"limit": limit}).content)
+             for limit in (5, 6, 7)}
+    # An empty cache with room for the two most recent bodies only
+    capped = response_cache.ResponseCache()
+    capped.config.update(enabled=True, max_bytes=sizes[6] + sizes[7])
+    monkeypatch.setattr(response_cache, "_cache", capped)
+    for limit in (5, 6, 7):
+        cached_client.get("/products/", params={"limit": limit})
+
+    with query_budget(0):
+        cached_client.get("/products/", params={"limit": 6})
+        cached_client.get("/products/", params={"limit": 7})
+    with query_budget(1) as profile:
+        cached_client.get("/products/", params={"limit": 5})
+    assert profile.count == 1
+
+
+def test_response_larger_than_the_cap_is_served_uncached(cached_client, cache, catalog):
+    cache.config["max_bytes"] = 10
+
+    first = cached_client.get("/products/", params={"limit": 5})
+    with query_budget(1) as profile:
+        second = cached_client.get("/products/", params={"limit": 5})
+
+    assert second.content == first.content
+    assert profile.count == 1
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from database import CleanProduct, RawProduct
+from services.product_service import ProductService
+from services.stream_parser import ProductStreamParser
+
+PRODUCTS = {
+    "p1": {"description": "Tracks leads. Sends {templated} emails.", "category": "sales_marketing"},
+    "p2": {"description": "Runs \"CI\" pipelines. Caches builds \\ artifacts.", "category": "devtools"},
+    "p3": {"description": "Builds dashboards. Exports reports.", "category": "data_analytics"}
+}
+RESPONSE = json.dumps({"products": PRODUCTS})
+
+
+def feed_all(parser, chunks):
+    """(chunk index, id, product) for every product the parser emits"""
+    return [(index, key, product)
+            for index, chunk in enumerate(chunks)
+            for key, product in parser.feed(chunk)]
+
+
+def test_whole_response_in_one_chunk():
+    emitted = feed_all(ProductStreamParser(), [RESPONSE])
+
+    assert [(key, product) for _, key, product in emitted] == list(PRODUCTS.items())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_split_chunks_emit_each_product_when_its_object_closes(size):
+    chunks = [RESPONSE[start:start + size] for start in range(0, len(RESPONSE), size)]
+
+    emitted = feed_all(ProductStreamParser(), chunks)
+
+    assert [(key, product) for _, key, product in emitted] == list(PRODUCTS.items())
+    # Each product is emitted by the chunk holding its closing brace, not later
+    for index, key, product in emitted:
+        end = RESPONSE.index(json.dumps(product)) + len(json.dumps(product))
+        assert index == (end - 1) // size, key
+
+
+def test_braces_and_quotes_inside_strings_do_not_split_products():
+    response = json.dumps({"products": {
+        "p1": {"description": "Uses } and { and \"}\" in text.", "category": "other"},
+        "p2": {"description": "Ends with a backslash \\", "category": "finance"}
+    }})
+
+    emitted = feed_all(ProductStreamParser(), list(response))
+
+    assert [key for _, key, _ in emitted] == ["p1", "p2"]
+    assert emitted[0][2]["description"] == "Uses } and { and \"}\" in text."
+    assert emitted[1][2]["description"] == "Ends with a backslash \\"
+
+
+def test_nested_objects_stay_inside_their_product():
+    response = '{"products": {"p1": {"description": "A.", "meta": {"tags": {"a": 1}}, "category": "other"}}}'
+
+    emitted = feed_all(ProductStreamParser(), list(response))
+
+    assert [(key, product) for _, key, product in emitted] == [
+        ("p1", {"description": "A.", "meta": {"tags": {"a": 1}}, "category": "other"})]
+
+
+def test_objects_outside_products_are_ignored():
+    response = '{"meta": {"p0": {"description": "No."}}, "products": {"p1": {"description": "Yes.", "category": "other"}}}'
+
+    emitted = feed_all(ProductStreamParser(), [response])
+
+    assert [key for _, key, _ in emitted] == ["p1"]
+
+
+def test_malformed_item_is_skipped_and_later_items_still_emitted():
+    response = ('{"products": {'
+                '"p1": {"description": "Good.", "category": "other"}, '
+                '"p2": {"description": "Bad.", "category": }, '
+                '"p3": {"description": "Also good.", "category": "finance"}}}')
+
+    emitted = feed_all(ProductStreamParser(), [response[i:i + 5] for i in range(0, len(response), 5)])
+
+    assert [key for _, key, _ in emitted] == ["p1", "p3"]
+
+
+def test_early_termination_keeps_completed_products_only():
+    cut = RESPONSE.index('"p3"') + 20
+    chunks = [RESPONSE[start:min(start + 4, cut)] for start in range(0, cut, 4)]
+
+    parser = ProductStreamParser()
+    emitted = feed_all(parser, chunks)
+
+    assert [key for _, key, _ in emitted] == ["p1", "p2"]
+    # A truncated item is never emitted, even once the stream stops
+    assert list(parser.feed("")) == []
+
+
+def test_products_are_completed_as_their_items_stream_in(db, add_raw_products, fake_openai):
+    raw_ids = add_raw_products(["alpha", "beta", "gamma"])
+    stream = fake_openai.stream(RESPONSE, 8)
+
+    result = ProductService(db).bulk_process_products_with_ai(raw_ids)
+
+    assert sorted(result["completed"]) == sorted(raw_ids)
+    assert result["failed"] == {}
+    # Every product is committed as soon as the chunk closing its item is parsed
+    for key, name in zip(PRODUCTS, ["alpha", "beta", "gamma"]):
+        product_end = RESPONSE.index(json.dumps(PRODUCTS[key])) + len(json.dumps(PRODUCTS[key]))
+        closing_chunk = (product_end - 1) // 8
+        assert name not in stream.completed_before_chunk[closing_chunk]
+        assert name in stream.completed_before_chunk[closing_chunk + 1]
+    assert {category for category, in db.query(CleanProduct.category)} == {
+        "sales_marketing", "devtools", "data_analytics"}
+
+
+def test_truncated_stream_completes_finished_items_and_fails_the_rest(db, add_raw_products, fake_openai):
+    raw_ids = add_raw_products(["alpha", "beta", "gamma"])
+    fake_openai.stream(RESPONSE[:RESPONSE.index('"p2"') + 30], 8, truncated=True)
+
+    result = ProductService(db).bulk_process_products_with_ai(raw_ids)
+
+    assert result["completed"] == [raw_ids[0]]
+    assert result["failed"] == {raw_ids[1]: "missing", raw_ids[2]: "missing"}
+    statuses = dict(db.query(RawProduct.name, RawProduct.processing_status))
+    assert statuses == {"alpha": "completed", "beta": "pending", "gamma": "pending"}
+    assert db.query(CleanProduct).count() == 1
+
+
+def test_malformed_streamed_item_is_failed_without_blocking_the_others(db, add_raw_products, fake_openai):
+    raw_ids = add_raw_products(["alpha", "beta", "gamma"])
+    content = ('{"products": {'
+               '"p1": {"description": "Good. Really.", "category": "other"}, '
+               '"p2": {"description": "Bad.", "category": }, '
+               '"p3": {"description": "Fine. Also.", "category": "finance"}}}')
+    fake_openai.stream(content, 6)
+
+    result = ProductService(db).bulk_process_products_with_ai(raw_ids)
+
+    assert sorted(result["completed"]) == [raw_ids[0], raw_ids[2]]
+    assert result["failed"] == {raw_ids[1]: "missing"}
@@ -0,0 +1,132 @@
+import argparse
+import os
+import socket
+import threading
+from typing import List, Dict, Optional
+from loguru import logger
+
+from config.ai_config import get_batch_config, get_worker_config
+from database import create_tables, SessionLocal
+from services import metrics
+from services.batch_controller import get_batch_controller
+from services.job_service import JobService
+from services.product_service import ProductService
+
+
+class AIWorkerPool:
+    """Worker threads that claim AI jobs from the queue and process them in batches"""
+
+    def __init__(self, concurrency: Optional[int] = None, batch_size: Optional[int] = None):
+        self.worker_config = get_worker_config()
+        self.concurrency = concurrency or self.worker_config["concurrency"]
+        self.batch_config = get_batch_config()
+        self.batch_size = batch_size or self.batch_config["max_products_per_request"]
+
+        # Leases are owned per thread; the heartbeat renews all of this process's
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}:"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the worker and heartbeat threads"""
+        db = SessionLocal()
+        try:
+            JobService(db).backfill()
+        finally:
+            db.close()
+
+        # Adaptive concurrency can only scale between 1 and the threads started here
+        get_batch_controller().limit_concurrency(self.concurrency)
+
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, args=(index,),
+                             name=f"ai-worker-{index}", daemon=True)
+            for index in range(self.concurrency)
+        ]
+        self._threads.append(threading.Thread(
+            target=self._heartbeat, name="ai-worker-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        logger.info(
+            f"Started {self.concurrency} AI workers (batch size {self.batch_size})")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Signal the threads to stop after their current batch and wait for them"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        logger.info("AI workers stopped")
+
+    def run_forever(self):
+        """Run until interrupted"""
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Shutting down AI workers")
+        finally:
+            self.stop()
+
+    def _work(self, index: int):
+        owner = f"{self.owner_prefix}{index}"
+        batch_controller = get_batch_controller()
+        while not self._stop.is_set():
+            # Threads beyond the adapted concurrency sit out until it grows again
+            if index >= batch_controller.concurrency():
+                self._stop.wait(self.worker_config["poll_interval_seconds"])
+                continue
+
+            db = SessionLocal()
+            try:
+                jobs = JobService(db).claim_batch(
+                    owner, self.batch_size, self.batch_config["max_wait_seconds"])
+                if not jobs:
+                    self._stop.wait(self.worker_config["poll_interval_seconds"])
+                    continue
+                self._process(db, jobs)
+            except Exception as e:
+                logger.error(f"AI worker {owner} error: {e}")
+                self._stop.wait(self.worker_config["poll_interval_seconds"])
+            finally:
+                db.close()
+
+    def _process(self, db, jobs: List[Dict[str, int]]):
+        job_ids = {job["raw_id"]: job["job_id"] for job in jobs}
+
+        # Jobs are completed, or failed for a retry, in the same transaction
+        # as the products' results
+        try:
+            ProductService(db).bulk_process_products_with_ai(list(job_ids), job_ids)
+        except Exception as e:
+            logger.error(f"AI batch of {len(jobs)} jobs failed: {e}")
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.worker_config["heartbeat_seconds"]):
+            db = SessionLocal()
+            try:
+                job_service = JobService(db)
+                job_service.heartbeat(self.owner_prefix)
+                job_service.fail_expired()
+            finally:
+                db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run AI processing workers for queued products.")
+    parser.add_argument("--concurrency", type=int,
+                        help="Number of worker threads.")
+    parser.add_argument("--batch-size", type=int,
+                        help="Maximum products claimed per AI request.")
+    parser.add_argument("--metrics-port", type=int, default=get_worker_config()["metrics_port"],
+                        help="Port to serve this worker's /metrics on; 0 disables it.")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        logger.info(f"Serving worker metrics on port {args.metrics_port}")
+    AIWorkerPool(args.concurrency, args.batch_size).run_forever()